@@ -0,0 +1 @@
+"""Benchmarks do pipeline NFSe Campinas (executar a partir da raiz do repositório)"""
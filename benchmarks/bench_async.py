@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark de consultas em alta concorrência: threads vs asyncio
+
+Consulta N períodos contra o servidor ABRASF asyncio local com latência
+injetada, comparando NfseClient em ThreadPoolExecutor com AsyncNfseClient
+(semáforo de concorrência, um único event loop).
+
+Uso (na raiz do repositório):
+    python -m benchmarks.bench_async --periodos 300 --latencia 0.5
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from tests.stubs.abrasf_stub import ServidorAbrasfAsync
+from src.api.async_client import AsyncNfseClient
+from src.api.nfse_client import NfseClient
+
+
+def _config(url, concorrencia):
+    return {
+        'cliente': {'cnpj': '10425636000139', 'inscricao_municipal': '001557548'},
+        'nfse': {'endpoint': url, 'max_concorrencia': concorrencia, 'pool_max': concorrencia}
+    }
+
+
+def _threads(url, periodos, concorrencia):
+    client = NfseClient(_config(url, concorrencia))
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        list(executor.map(lambda p: list(client.iterar_paginas(*p)), periodos))
+        pico_threads = threading.active_count()
+    client.fechar()
+    return pico_threads
+
+
+def _async(url, periodos, concorrencia):
+    async def executar():
+        async with AsyncNfseClient(_config(url, concorrencia)) as client:
+            resultados = await client.consultar_periodos(periodos)
+        erros = [r for r in resultados if isinstance(r, BaseException)]
+        assert not erros, erros[0]
+        return threading.active_count()
+    return asyncio.run(executar())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark threads vs asyncio')
+    parser.add_argument('--periodos', type=int, default=300)
+    parser.add_argument('--latencia', type=float, default=0.5)
+    parser.add_argument('--concorrencia', default='8,32,64')
+    args = parser.parse_args()
+    
+    inicio = date(2020, 1, 1)
+    periodos = [((inicio + timedelta(days=i)).isoformat(),) * 2 for i in range(args.periodos)]
+    
+    print(f"{args.periodos} períodos, latência {args.latencia}s")
+    print(f"{'modo':>7} {'concorrência':>12} {'tempo (s)':>10} {'req/s':>8} {'em voo':>7} {'threads':>8}")
+    for concorrencia in [int(c) for c in args.concorrencia.split(',')]:
+        for modo, funcao in (('threads', _threads), ('asyncio', _async)):
+            with ServidorAbrasfAsync(latencia=args.latencia, notas_por_janela=10) as servidor:
+                t0 = time.perf_counter()
+                threads = funcao(servidor.url, periodos, concorrencia)
+                decorrido = time.perf_counter() - t0
+            print(f"{modo:>7} {concorrencia:>12} {decorrido:>10.2f} {args.periodos / decorrido:>8.1f} "
+                  f"{servidor.pico_em_voo:>7} {threads:>8}")
+
+
+if __name__ == "__main__":
+    main()
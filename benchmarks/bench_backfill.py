@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark da carga histórica por janelas paralelas
+
+Uso (na raiz do repositório):
+    python -m benchmarks.bench_backfill --meses 24 --latencia 0.3
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from tests.stubs.abrasf_stub import ServidorAbrasfLocal
+from scripts.nfse_campinas_integration import NFSeCampinasIntegration
+from src.utils.window_planner import WindowPlanner
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de carga histórica paralela')
+    parser.add_argument('--meses', type=int, default=24)
+    parser.add_argument('--latencia', type=float, default=0.3, help='Latência simulada por janela (s)')
+    parser.add_argument('--notas', type=int, default=50, help='Notas por janela')
+    parser.add_argument('--workers', default='1,2,4,8', help='Lista de workers a medir')
+    args = parser.parse_args()
+    
+    data_fim = datetime(2025, 1, 1)
+    data_inicio = data_fim - timedelta(days=args.meses * 30)
+    
+    with ServidorAbrasfLocal(latencia=args.latencia, notas_por_janela=args.notas) as servidor:
+        integration = NFSeCampinasIntegration(config={
+            'WSDL_URL': servidor.url,
+            'CERT_PATH': None,
+            'CLIENTE_CNPJ': '10425636000139',
+            'CLIENTE_INSCRICAO': '001557548',
+        })
+        # Janelas fixas de 30 dias (sem densidade aprendida): mesma carga em cada medição
+        janelas = WindowPlanner(dias_base=30, dias_max=30).planejar(data_inicio, data_fim)
+        
+        print(f"{len(janelas)} janelas, latência {args.latencia}s, {args.notas} notas/janela")
+        print(f"{'workers':>8} {'tempo (s)':>10} {'speedup':>8} {'nfses':>7}")
+        
+        referencia = None
+        hashes_referencia = None
+        for workers in [int(w) for w in args.workers.split(',')]:
+            inicio = time.perf_counter()
+            resultados = integration.consultar_janelas(janelas, workers)
+            decorrido = time.perf_counter() - inicio
+            
+            hashes = [n['hash_nfse'] for r in resultados for n in r['nfses']]
+            referencia = referencia or decorrido
+            hashes_referencia = hashes_referencia or hashes
+            assert hashes == hashes_referencia, "Saída não determinística entre execuções"
+            
+            print(f"{workers:>8} {decorrido:>10.2f} {referencia / decorrido:>7.1f}x {len(hashes):>7}")
+
+
+if __name__ == "__main__":
+    main()
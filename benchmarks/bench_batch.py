@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memória: lista de dicts vs NfseBatch colunar
+
+Mede com tracemalloc os bytes por nota das NFSe mantidas como dicionários
+(formato de NfseXmlParser.extrair_nfse) e como NfseBatch, e o tempo de
+exportar o lote para Arrow, Parquet e NDJSON.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.bench_batch --notas 10000,100000
+"""
+
+import argparse
+import gc
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.bench_parser import gravar_resposta
+from src.parsers.nfse_batch import NfseBatch
+from src.parsers.xml_parser import NfseXmlParser
+
+
+def _medir(funcao):
+    """Executa funcao() e retorna (resultado, bytes alocados que continuam vivos)"""
+    gc.collect()
+    tracemalloc.start()
+    resultado = funcao()
+    gc.collect()
+    atual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, atual
+
+
+def _cronometrar(funcao):
+    inicio = time.perf_counter()
+    funcao()
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de memória do NfseBatch')
+    parser.add_argument('--notas', default='10000,100000')
+    args = parser.parse_args()
+    
+    nfse_parser = NfseXmlParser()
+    with tempfile.TemporaryDirectory() as diretorio:
+        print(f"{'notas':>8} {'dicts B/nota':>13} {'lote B/nota':>12} {'redução':>8} "
+              f"{'arrow (s)':>10} {'parquet (s)':>12} {'ndjson (s)':>11}")
+        for quantidade in (int(n) for n in args.notas.split(',')):
+            caminho = os.path.join(diretorio, f'resposta_{quantidade}.xml')
+            gravar_resposta(caminho, quantidade)
+            
+            def registros():
+                with open(caminho, 'rb') as arquivo:
+                    return list(nfse_parser.iterar_nfse(arquivo))
+            
+            def lote():
+                with open(caminho, 'rb') as arquivo:
+                    return NfseBatch.de_registros(nfse_parser.iterar_nfse(arquivo))
+            
+            nfses, bytes_dicts = _medir(registros)
+            del nfses
+            batch, bytes_lote = _medir(lote)
+            
+            segundos_arrow = _cronometrar(batch.para_arrow)
+            segundos_parquet = _cronometrar(lambda: batch.gravar_parquet(io.BytesIO()))
+            segundos_ndjson = _cronometrar(lambda: batch.gravar_ndjson(io.BytesIO()))
+            print(
+                f"{quantidade:>8} {bytes_dicts / quantidade:>13.0f} {bytes_lote / quantidade:>12.0f} "
+                f"{bytes_dicts / bytes_lote:>7.1f}x {segundos_arrow:>10.3f} {segundos_parquet:>12.3f} "
+                f"{segundos_ndjson:>11.3f}"
+            )
+            del batch
+            os.remove(caminho)
+
+
+if __name__ == "__main__":
+    main()
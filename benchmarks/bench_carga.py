@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark da serialização para carga no BigQuery: Parquet vs NDJSON
+
+Para grupos do tamanho de processamento.lote_tamanho, mede o que
+BigQueryLoader.inserir_nfse_batch faz antes de cada envio (NfseBatch a
+partir dos dicionários + arquivo em memória), por formato:
+- bytes por nota enviados;
+- segundos e notas/s de serialização.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.bench_carga --notas 20000 --grupos 100,1000,10000
+"""
+
+import argparse
+import gzip
+import io
+import os
+import tempfile
+import time
+
+from benchmarks.bench_parser import gravar_resposta
+from src.parsers.nfse_batch import NfseBatch
+from src.parsers.xml_parser import NfseXmlParser
+
+
+def _parquet(compressao):
+    def serializar(grupo):
+        arquivo = io.BytesIO()
+        NfseBatch.de_registros(grupo).gravar_parquet(arquivo, compressao=compressao)
+        return arquivo.getbuffer().nbytes
+    return serializar
+
+
+def _ndjson(grupo):
+    arquivo = io.BytesIO()
+    NfseBatch.de_registros(grupo).gravar_ndjson(arquivo)
+    return arquivo.getbuffer().nbytes
+
+
+def _ndjson_gzip(grupo):
+    arquivo = io.BytesIO()
+    NfseBatch.de_registros(grupo).gravar_ndjson(arquivo)
+    return len(gzip.compress(arquivo.getvalue(), compresslevel=6))
+
+
+MODOS = (
+    ('parquet snappy', _parquet('snappy')),
+    ('parquet zstd', _parquet('zstd')),
+    ('ndjson', _ndjson),
+    ('ndjson gzip', _ndjson_gzip),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da serialização de carga no BigQuery')
+    parser.add_argument('--notas', type=int, default=20000)
+    parser.add_argument('--grupos', default='100,1000,10000', help='Notas por load job')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, 'resposta.xml')
+        gravar_resposta(caminho, args.notas)
+        with open(caminho, 'rb') as arquivo:
+            nfses = list(NfseXmlParser().iterar_nfse(arquivo))
+    
+    print(f"{len(nfses)} notas")
+    print(f"{'grupo':>6} {'modo':>17} {'envios':>7} {'B/nota':>8} {'segundos':>9} {'notas/s':>9}")
+    for tamanho in (int(g) for g in args.grupos.split(',')):
+        grupos = [nfses[i:i + tamanho] for i in range(0, len(nfses), tamanho)]
+        for nome, serializar in MODOS:
+            inicio = time.perf_counter()
+            total_bytes = sum(serializar(grupo) for grupo in grupos)
+            segundos = time.perf_counter() - inicio
+            print(
+                f"{tamanho:>6} {nome:>17} {len(grupos):>7} {total_bytes / len(nfses):>8.0f} "
+                f"{segundos:>9.3f} {len(nfses) / segundos:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
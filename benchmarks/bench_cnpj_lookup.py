@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark da situação cadastral: consulta um a um vs lote com cache e pool
+
+Contra o servidor local no formato da BrasilAPI (latência simulada), mede
+para uma base com CNPJs repetidos:
+- sequencial: uma requisição por linha, sem cache (fluxo anterior);
+- lote frio: deduplicado, cache vazio, N workers;
+- lote quente: mesmo lote de novo, respondido pelo cache SQLite.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.bench_cnpj_lookup --cnpjs 732 --repeticao 0.2 --latencia 0.35 --workers 1,4,8
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from tests.stubs.cnpj_stub import ServidorCnpjLocal
+from src.parsers.cnpj_lookup import CnpjStatusLookup, HttpCnpjBackend, SqliteCnpjCache
+from src.parsers.validators import calcular_dv_cnpj
+
+
+def _base(quantidade, repeticao, aleatorio):
+    """CNPJs distintos mais uma fração de linhas repetidas, embaralhados"""
+    raizes = [f"{aleatorio.randrange(10 ** 12):012d}" for _ in range(quantidade)]
+    cnpjs = [raiz + calcular_dv_cnpj(raiz) for raiz in raizes]
+    linhas = cnpjs + [aleatorio.choice(cnpjs) for _ in range(int(quantidade * repeticao))]
+    aleatorio.shuffle(linhas)
+    return linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da consulta de situação cadastral')
+    parser.add_argument('--cnpjs', type=int, default=732, help='CNPJs distintos')
+    parser.add_argument('--repeticao', type=float, default=0.2, help='Fração de linhas repetidas')
+    parser.add_argument('--latencia', type=float, default=0.35, help='Segundos por consulta no servidor')
+    parser.add_argument('--workers', default='1,4,8')
+    parser.add_argument('--sequencial', type=int, default=50, help='Linhas medidas no modo sequencial')
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+    
+    linhas = _base(args.cnpjs, args.repeticao, random.Random(args.semente))
+    print(f"{len(linhas)} linhas, {len(set(linhas))} CNPJs distintos, latência {args.latencia}s")
+    print(f"{'modo':>22} {'linhas':>7} {'remotas':>8} {'segundos':>9} {'linhas/s':>10}")
+    
+    with ServidorCnpjLocal(latencia=args.latencia) as servidor, tempfile.TemporaryDirectory() as diretorio:
+        backend = HttpCnpjBackend(url=servidor.url, pool_conexoes=max(map(int, args.workers.split(','))))
+        
+        amostra = linhas[:args.sequencial]
+        inicio = time.perf_counter()
+        for cnpj in amostra:
+            backend.consultar(cnpj)
+        segundos = time.perf_counter() - inicio
+        print(f"{'sequencial sem cache':>22} {len(amostra):>7} {len(amostra):>8} {segundos:>9.2f} {len(amostra) / segundos:>10.1f}")
+        
+        for workers in map(int, args.workers.split(',')):
+            cache = SqliteCnpjCache(os.path.join(diretorio, f'cnpj_{workers}.sqlite3'))
+            consulta = CnpjStatusLookup(backend, cache, workers=workers)
+            for modo in ('frio', 'quente'):
+                remotas_antes = consulta.consultas_remotas
+                inicio = time.perf_counter()
+                consulta.consultar_lote(linhas)
+                segundos = time.perf_counter() - inicio
+                remotas = consulta.consultas_remotas - remotas_antes
+                nome = f"lote {modo} ({workers}w)"
+                print(f"{nome:>22} {len(linhas):>7} {remotas:>8} {segundos:>9.2f} {len(linhas) / segundos:>10.1f}")
+            cache.fechar()
+
+
+if __name__ == "__main__":
+    main()
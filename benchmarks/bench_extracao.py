@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark da extração de campos por NFSe: find() por coluna vs mapeamento
+
+Compara a extração anterior (um find('.//nfse:...') por coluna, cada um
+varrendo a subárvore do InfNfse) com NfseXmlParser.extrair_nfse, que
+percorre o InfNfse uma única vez guiado por CAMPOS_NFSE. As notas são
+parseadas antes da medição: só a extração é cronometrada.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.bench_extracao --notas 20000
+"""
+
+import argparse
+import time
+
+from lxml import etree
+
+from tests.stubs.abrasf_stub import gerar_resposta_consulta
+from src.parsers.xml_parser import NfseXmlParser, NS, CAMPOS_NFSE
+
+# Colunas da extração anterior (script), com o caminho './/' usado em cada find
+_CAMPOS_FIND = (
+    ('numero_nfse', './/nfse:Numero'),
+    ('codigo_verificacao', './/nfse:CodigoVerificacao'),
+    ('data_emissao', './/nfse:DataEmissao'),
+    ('data_competencia', './/nfse:Competencia'),
+    ('prestador_cnpj', './/nfse:PrestadorServico//nfse:Cnpj'),
+    ('prestador_razao_social', './/nfse:PrestadorServico//nfse:RazaoSocial'),
+    ('tomador_cnpj', './/nfse:TomadorServico//nfse:Cnpj'),
+    ('tomador_cpf', './/nfse:TomadorServico//nfse:Cpf'),
+    ('tomador_razao_social', './/nfse:TomadorServico//nfse:RazaoSocial'),
+    ('tomador_endereco', './/nfse:TomadorServico//nfse:Endereco'),
+    ('tomador_municipio', './/nfse:TomadorServico//nfse:Municipio'),
+    ('tomador_uf', './/nfse:TomadorServico//nfse:Uf'),
+    ('tomador_cep', './/nfse:TomadorServico//nfse:Cep'),
+    ('discriminacao', './/nfse:Servico//nfse:Discriminacao'),
+    ('item_lista_servico', './/nfse:Servico//nfse:ItemListaServico'),
+)
+
+_VALORES_FIND = (
+    ('valor_servicos', './/nfse:Servico//nfse:ValorServicos'),
+    ('valor_deducoes', './/nfse:Servico//nfse:ValorDeducoes'),
+    ('valor_pis', './/nfse:Servico//nfse:ValorPis'),
+    ('valor_cofins', './/nfse:Servico//nfse:ValorCofins'),
+    ('valor_inss', './/nfse:Servico//nfse:ValorInss'),
+    ('valor_ir', './/nfse:Servico//nfse:ValorIr'),
+    ('valor_csll', './/nfse:Servico//nfse:ValorCsll'),
+    ('valor_iss', './/nfse:Servico//nfse:ValorIss'),
+    ('valor_liquido', './/nfse:Servico//nfse:ValorLiquidoNfse'),
+)
+
+
+def extrair_com_find(comp_nfse):
+    """Extração anterior: 24 find() com './/' por nota"""
+    inf_nfse = comp_nfse.find('.//nfse:Nfse', NS).find('.//nfse:InfNfse', NS)
+    data = {}
+    for coluna, xpath in _CAMPOS_FIND:
+        elemento = inf_nfse.find(xpath, NS)
+        data[coluna] = elemento.text if elemento is not None else None
+    for coluna, xpath in _VALORES_FIND:
+        elemento = inf_nfse.find(xpath, NS)
+        data[coluna] = float(elemento.text) if elemento is not None and elemento.text else 0.0
+    return data
+
+
+def _medir(funcao, notas):
+    inicio = time.perf_counter()
+    for comp_nfse in notas:
+        funcao(comp_nfse)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da extração de campos por NFSe')
+    parser.add_argument('--notas', type=int, default=20000)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+    
+    root = etree.fromstring(gerar_resposta_consulta(args.notas))
+    notas = root.findall('.//nfse:CompNfse', NS)
+    nfse_parser = NfseXmlParser()
+    colunas = len({coluna for coluna, _, _ in CAMPOS_NFSE})
+    
+    modos = (
+        (f'find ({len(_CAMPOS_FIND) + len(_VALORES_FIND)} colunas)', extrair_com_find),
+        (f'mapeamento ({colunas} colunas)', nfse_parser.extrair_nfse),
+    )
+    
+    print(f"{args.notas} notas, melhor de {args.repeticoes}")
+    print(f"{'modo':>28} {'µs/nota':>10} {'notas/s':>10}")
+    for nome, funcao in modos:
+        segundos = min(_medir(funcao, notas) for _ in range(args.repeticoes))
+        print(f"{nome:>28} {segundos / args.notas * 1e6:>10.1f} {args.notas / segundos:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark do índice local de hash_nfse (SQLite + filtro de Bloom)
+
+Com um índice de N hashes já carregados, simula execuções incrementais em
+que uma fração das notas recebidas (sobreposição) já foi carregada:
+- abertura: montar o filtro a partir do arquivo;
+- consulta: notas/s de filtrar_novas com o filtro e sem ele (filtro
+  degenerado que responde "talvez" para tudo, toda nota vai ao SQLite);
+- trabalho evitado: notas que não vão ao destino e lotes inteiros que
+  não geram nenhum job (4 por lote: staging + MERGE de notas e tributos).
+
+Uso (na raiz do repositório):
+    python -m benchmarks.bench_indice_hash --indexadas 1000000 --consultas 200000 --sobreposicao 0.8
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import tempfile
+import time
+
+from src.storage.hash_index import HashNfseIndex
+
+# Jobs no destino por lote carregado (staging + MERGE em nfse_campinas e nf_tributos)
+JOBS_POR_LOTE = 4
+
+
+def _hash(numero):
+    return hashlib.sha256(f"nfse-{numero}".encode()).hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do índice local de hash_nfse')
+    parser.add_argument('--indexadas', type=int, default=1000000, help='Hashes já no índice')
+    parser.add_argument('--consultas', type=int, default=200000, help='Notas recebidas nas execuções')
+    parser.add_argument('--sobreposicao', type=float, default=0.8, help='Fração das notas recebidas já carregada')
+    parser.add_argument('--lote', type=int, default=100, help='Notas por carga (processamento.lote_tamanho)')
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+    
+    aleatorio = random.Random(args.semente)
+    # Execuções sobrepostas: as repetidas vêm em sequência (janela já vista), depois as novas
+    repetidas = int(args.consultas * args.sobreposicao)
+    inicio_repetidas = aleatorio.randrange(max(1, args.indexadas - repetidas))
+    numeros = list(range(inicio_repetidas, inicio_repetidas + repetidas))
+    numeros += range(args.indexadas, args.indexadas + args.consultas - repetidas)
+    nfses = [{'hash_nfse': _hash(n)} for n in numeros]
+    lotes = [nfses[i:i + args.lote] for i in range(0, len(nfses), args.lote)]
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, 'hash_nfse.sqlite3')
+        inicio = time.perf_counter()
+        indice = HashNfseIndex(caminho)
+        for bloco in range(0, args.indexadas, 50000):
+            indice.registrar(_hash(n) for n in range(bloco, min(bloco + 50000, args.indexadas)))
+        indice.fechar()
+        print(f"índice com {args.indexadas} hashes montado em {time.perf_counter() - inicio:.1f}s "
+              f"({os.path.getsize(caminho) / 1e6:.1f} MB em disco)")
+        print(f"{len(nfses)} notas recebidas em {len(lotes)} lotes de {args.lote}, {args.sobreposicao:.0%} já carregadas")
+        print(f"{'modo':>12} {'abertura (s)':>13} {'notas/s':>10} {'disco':>9} {'falsos +':>9} "
+              f"{'acerto':>7} {'lotes evitados':>15} {'jobs evitados':>14} {'filtro KB':>10}")
+        
+        for nome, taxa in (('com filtro', 0.01), ('sem filtro', 0.999999)):
+            inicio = time.perf_counter()
+            indice = HashNfseIndex(caminho, capacidade=1, taxa_falso_positivo=taxa)
+            abertura = time.perf_counter() - inicio
+            
+            inicio = time.perf_counter()
+            enviadas = sum(len(indice.filtrar_novas(lote)) for lote in lotes)
+            segundos = time.perf_counter() - inicio
+            
+            metricas = indice.metricas()
+            assert enviadas == len(nfses) - repetidas
+            print(
+                f"{nome:>12} {abertura:>13.2f} {len(nfses) / segundos:>10.0f} {metricas['consultas_disco']:>9} "
+                f"{metricas['falsos_positivos']:>9} {metricas['taxa_acerto']:>7.1%} {metricas['lotes_evitados']:>15} "
+                f"{metricas['lotes_evitados'] * JOBS_POR_LOTE:>14} {metricas['filtro_kb']:>10.0f}"
+            )
+            indice.fechar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark do pico de memória da carga histórica por tamanho do período
+
+Cada medição roda em um subprocesso novo para que o pico de RSS reflita
+apenas aquela carga. Compara o pipeline em lotes (consultar_historico)
+com o acúmulo de todas as NFSes em uma lista antes da carga.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.bench_memoria_backfill --meses 6,12,24,48
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+from tests.stubs.abrasf_stub import ServidorAbrasfLocal
+
+
+def _executar_filho(url, meses, modo, workers):
+    """Executa a carga no processo atual e imprime o resultado em JSON"""
+    from datetime import datetime, timedelta
+    from scripts.nfse_campinas_integration import NFSeCampinasIntegration
+    from src.utils.helpers import pico_memoria_mb
+    
+    class IntegracaoSemSink(NFSeCampinasIntegration):
+        carregadas = 0
+        
+        def load_to_bigquery(self, nfse_data):
+            self.carregadas += len(nfse_data)
+            return True
+    
+    integration = IntegracaoSemSink(config={
+        'WSDL_URL': url,
+        'CERT_PATH': None,
+        'CLIENTE_CNPJ': '10425636000139',
+        'CLIENTE_INSCRICAO': '001557548',
+        'DIRETORIO_ESTADO': None,
+    })
+    
+    if modo == 'lotes':
+        total = integration.consultar_historico(meses, workers=workers)
+    else:
+        data_fim = datetime.now()
+        janelas = integration.planejador.planejar(data_fim - timedelta(days=meses * 30), data_fim)
+        todas = [n for r in integration.consultar_janelas(janelas, workers) for n in r['nfses']]
+        integration.load_to_bigquery(todas)
+        total = len(todas)
+    
+    print(json.dumps({'nfses': total, 'pico_mb': pico_memoria_mb()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de memória da carga histórica')
+    parser.add_argument('--meses', default='6,12,24,48')
+    parser.add_argument('--notas', type=int, default=2000, help='Notas por janela')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--filho', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--url', help=argparse.SUPPRESS)
+    parser.add_argument('--modo', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.filho:
+        _executar_filho(args.url, int(args.meses), args.modo, args.workers)
+        return
+    
+    with ServidorAbrasfLocal(notas_por_janela=args.notas) as servidor:
+        print(f"{args.notas} notas/janela, {args.workers} workers")
+        print(f"{'meses':>6} {'modo':>10} {'nfses':>8} {'pico RSS (MB)':>14}")
+        for meses in args.meses.split(','):
+            for modo in ('acumulado', 'lotes'):
+                saida = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.bench_memoria_backfill', '--filho',
+                     '--url', servidor.url, '--meses', meses, '--modo', modo,
+                     '--workers', str(args.workers)],
+                    capture_output=True, text=True, check=True
+                ).stdout.strip().splitlines()[-1]
+                resultado = json.loads(saida)
+                print(f"{meses:>6} {modo:>10} {resultado['nfses']:>8} {resultado['pico_mb']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark da conversão de valores monetários: float legado vs conversão exata
+
+Compara, sobre N textos no formato do XML ('1234.56'), a conversão anterior
+(float() com erro virando 0.0) com os conversores de src.parsers.money:
+float validado, inteiro em centavos (um a um) e centavos em lote (NumPy).
+Mostra também a deriva da soma em float frente à soma exata em centavos.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.bench_money --valores 1000000
+"""
+
+import argparse
+import gc
+import random
+import time
+
+from src.parsers.money import conversor_float, inteiros_em_lote, parse_centavos
+
+
+def _float_legado(texto):
+    """Conversão anterior do parser (get_xml_float / _valor)"""
+    try:
+        return float(texto) if texto else 0.0
+    except ValueError:
+        return 0.0
+
+
+def _cronometrar(funcao, repeticoes=5):
+    """Melhor tempo de funcao() em repeticoes, sem coleta de lixo durante a medição"""
+    melhor = None
+    for _ in range(repeticoes):
+        gc.collect()
+        gc.disable()
+        try:
+            inicio = time.perf_counter()
+            resultado = funcao()
+            decorrido = time.perf_counter() - inicio
+        finally:
+            gc.enable()
+        melhor = decorrido if melhor is None else min(melhor, decorrido)
+    return resultado, melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da conversão de valores monetários')
+    parser.add_argument('--valores', type=int, default=1000000)
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+    
+    aleatorio = random.Random(args.semente)
+    textos = [f"{aleatorio.randint(0, 10 ** 8) / 100:.2f}" for _ in range(args.valores)]
+    converter_float = conversor_float(2)
+    
+    modos = (
+        ('float legado', lambda: [_float_legado(t) for t in textos]),
+        ('float validado', lambda: [converter_float(t) for t in textos]),
+        ('centavos (um a um)', lambda: [parse_centavos(t) for t in textos]),
+        ('centavos (lote)', lambda: inteiros_em_lote(textos)[0]),
+    )
+    
+    base = None
+    print(f"{'modo':>20} {'segundos':>9} {'ns/valor':>9} {'vs legado':>10}")
+    resultados = {}
+    for nome, funcao in modos:
+        resultados[nome], segundos = _cronometrar(funcao)
+        base = base or segundos
+        print(f"{nome:>20} {segundos:>9.3f} {segundos / args.valores * 1e9:>9.0f} {base / segundos:>9.2f}x")
+    
+    soma_float = sum(resultados['float legado'])
+    soma_exata = int(resultados['centavos (lote)'].sum())
+    print(f"\nSoma em float: {soma_float:.6f}")
+    print(f"Soma exata:    {soma_exata // 100}.{soma_exata % 100:02d}")
+    print(f"Deriva:        {soma_float - soma_exata / 100:+.6f}")
+
+
+if __name__ == "__main__":
+    main()
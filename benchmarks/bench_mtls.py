@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark de requisições/s com TLS mútuo: caminho antigo vs sessão em pool
+
+Caminho antigo: cada consulta decifra o .pfx e abre uma conexão nova
+(novo handshake TCP+TLS). Sessão em pool: NfseClient decifra o
+certificado uma vez e reutiliza as conexões (keep-alive).
+
+Uso (na raiz do repositório):
+    python -m benchmarks.bench_mtls --requisicoes 200
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from cryptography.hazmat.primitives.serialization import pkcs12
+
+from tests.stubs.abrasf_stub import ServidorAbrasfLocal
+from tests.stubs.certificados import gerar_certificados, contexto_servidor_mtls
+from src.api.auth import certificado_para_pem
+from src.api.nfse_client import NfseClient
+
+
+def _config(servidor, certificados):
+    return {
+        'cliente': {'cnpj': '10425636000139', 'inscricao_municipal': '001557548'},
+        'nfse': {
+            'endpoint': servidor.url,
+            'certificado_path': certificados['cliente_pfx'],
+            'certificado_senha': certificados['senha'],
+            'ca_bundle': certificados['ca'],
+            'pool_conexoes': 4,
+            'pool_max': 16,
+        }
+    }
+
+
+def _consulta_antiga(servidor, certificados, envelope):
+    """Reproduz o caminho anterior: decifra o .pfx e conecta a cada consulta"""
+    with open(certificados['cliente_pfx'], 'rb') as f:
+        chave, cert, cadeia = pkcs12.load_key_and_certificates(f.read(), certificados['senha'].encode())
+    fd, caminho = tempfile.mkstemp(suffix='.pem')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(certificado_para_pem(chave, cert, cadeia))
+        response = requests.post(
+            servidor.url, data=envelope, cert=caminho, verify=certificados['ca'],
+            headers={'Content-Type': 'text/xml; charset=utf-8', 'SOAPAction': 'ConsultarNfse'},
+            timeout=30
+        )
+    finally:
+        os.unlink(caminho)
+    response.raise_for_status()
+    return response.text
+
+
+def _medir(funcao, requisicoes, threads):
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda _: funcao(), range(requisicoes)))
+    return requisicoes / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de TLS mútuo em pool')
+    parser.add_argument('--requisicoes', type=int, default=200)
+    parser.add_argument('--threads', default='1,4')
+    parser.add_argument('--notas', type=int, default=10, help='Notas por resposta')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        certificados = gerar_certificados(diretorio)
+        contexto = contexto_servidor_mtls(certificados)
+        
+        with ServidorAbrasfLocal(notas_por_janela=args.notas, contexto_ssl=contexto) as servidor:
+            client = NfseClient(_config(servidor, certificados))
+            envelope = client.montar_envelope_consulta('2024-01-01', '2024-01-31').encode('utf-8')
+            
+            print(f"{args.requisicoes} consultas, {args.notas} notas/resposta")
+            print(f"{'threads':>8} {'caminho':>10} {'req/s':>8} {'conexões':>9}")
+            for threads in [int(t) for t in args.threads.split(',')]:
+                caminhos = {
+                    'antigo': lambda: _consulta_antiga(servidor, certificados, envelope),
+                    'pool': lambda: client.consultar_nfse_periodo('2024-01-01', '2024-01-31'),
+                }
+                for nome, funcao in caminhos.items():
+                    conexoes_antes = servidor.conexoes
+                    taxa = _medir(funcao, args.requisicoes, threads)
+                    print(f"{threads:>8} {nome:>10} {taxa:>8.1f} {servidor.conexoes - conexoes_antes:>9}")
+            client.fechar()
+
+
+if __name__ == "__main__":
+    main()
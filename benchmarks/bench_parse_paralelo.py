@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark do parse paralelo de respostas arquivadas por número de processos
+
+Gera um acervo sintético em disco (vários arquivos e um arquivo grande,
+dividido em trechos de CompNfse) e mede notas/s do parse sequencial no
+processo atual e do ParallelNfseParser com 1..N processos.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.bench_parse_paralelo --arquivos 20 --notas 2000 --workers 1,2,4,8
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.bench_parser import gravar_resposta
+from src.parsers.parallel_parser import ParallelNfseParser, listar_respostas
+from src.parsers.xml_parser import NfseXmlParser
+
+
+def _sequencial(caminhos):
+    parser = NfseXmlParser()
+    notas = 0
+    for caminho in caminhos:
+        with open(caminho, 'rb') as arquivo:
+            notas += sum(1 for _ in parser.iterar_nfse(arquivo))
+    return notas
+
+
+def _paralelo(caminhos, workers, bloco_bytes):
+    parser = ParallelNfseParser(workers, bloco_bytes=bloco_bytes)
+    return sum(len(linhas) for _, linhas in parser.iterar_lotes(caminhos))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do parse paralelo de respostas')
+    parser.add_argument('--arquivos', type=int, default=20)
+    parser.add_argument('--notas', type=int, default=2000, help='Notas por arquivo')
+    parser.add_argument('--workers', default=','.join(
+        str(w) for w in (1, 2, 4, 8, 16) if w <= (os.cpu_count() or 1)
+    ))
+    parser.add_argument('--bloco-mb', type=float, default=4.0, help='Trecho do arquivo grande')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        acervo = os.path.join(diretorio, 'acervo')
+        os.makedirs(acervo)
+        for i in range(args.arquivos):
+            gravar_resposta(os.path.join(acervo, f'resposta_{i:04d}.xml'), args.notas)
+        grande = os.path.join(diretorio, 'resposta_grande.xml')
+        gravar_resposta(grande, args.arquivos * args.notas)
+        caminhos = listar_respostas(acervo)
+        bloco_bytes = int(args.bloco_mb * 1024 * 1024)
+        
+        print(f"{os.cpu_count()} núcleos; acervo de {args.arquivos} x {args.notas} notas e 1 x {args.arquivos * args.notas}")
+        print(f"{'corpus':>10} {'modo':>14} {'notas/s':>10} {'speedup':>8}")
+        for nome, entrada in (('arquivos', caminhos), ('um arquivo', [grande])):
+            inicio = time.perf_counter()
+            notas = _sequencial(entrada)
+            base = notas / (time.perf_counter() - inicio)
+            print(f"{nome:>10} {'sequencial':>14} {base:>10.0f} {1.0:>8.2f}")
+            
+            for workers in (int(w) for w in args.workers.split(',')):
+                inicio = time.perf_counter()
+                notas = _paralelo(entrada, workers, bloco_bytes)
+                taxa = notas / (time.perf_counter() - inicio)
+                print(f"{nome:>10} {f'{workers} processos':>14} {taxa:>10.0f} {taxa / base:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
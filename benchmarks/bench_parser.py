@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark do parse de respostas ConsultarNfse: árvore inteira vs iterparse
+
+Compara o parser anterior do script (resposta decodificada para str,
+ET.fromstring e findall sobre a árvore completa) com o
+NfseXmlParser.iterar_nfse, que lê o arquivo em streaming e poda a árvore
+a cada CompNfse. Cada medição roda em um subprocesso novo para que o pico
+de RSS reflita apenas aquele parse.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.bench_parser --notas 1000,10000,100000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from tests.stubs.abrasf_stub import NAMESPACE_NFSE, gerar_comp_nfse
+
+
+def gravar_resposta(caminho: str, quantidade: int):
+    """Grava uma resposta sintética com quantidade notas, sem montá-la em memória"""
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        arquivo.write(
+            '<?xml version="1.0" encoding="utf-8"?>'
+            '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+            f'<ConsultarNfseResposta xmlns="{NAMESPACE_NFSE}"><ListaNfse>'
+        )
+        for numero in range(1, quantidade + 1):
+            arquivo.write(gerar_comp_nfse(numero, '2024-01-15'))
+        arquivo.write('</ListaNfse></ConsultarNfseResposta></soap:Body></soap:Envelope>')
+
+
+def _executar_filho(caminho: str, modo: str):
+    """Parseia o arquivo no processo atual e imprime o resultado em JSON"""
+    import time
+    import xml.etree.ElementTree as ET
+    from src.parsers.xml_parser import NfseXmlParser, NS
+    from src.utils.helpers import pico_memoria_mb
+    
+    parser = NfseXmlParser()
+    base_mb = pico_memoria_mb()
+    inicio = time.perf_counter()
+    
+    notas = 0
+    if modo == 'arvore':
+        with open(caminho, 'rb') as arquivo:
+            xml = arquivo.read().decode('utf-8')
+        root = ET.fromstring(xml)
+        for comp_nfse in root.findall('.//nfse:CompNfse', NS):
+            if parser.extrair_nfse(comp_nfse):
+                notas += 1
+    else:
+        with open(caminho, 'rb') as arquivo:
+            for _ in parser.iterar_nfse(arquivo):
+                notas += 1
+    
+    segundos = time.perf_counter() - inicio
+    print(json.dumps({
+        'notas': notas,
+        'segundos': segundos,
+        'pico_mb': pico_memoria_mb(),
+        'base_mb': base_mb
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do parser de respostas NFSe')
+    parser.add_argument('--notas', default='1000,10000,100000')
+    parser.add_argument('--filho', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--arquivo', help=argparse.SUPPRESS)
+    parser.add_argument('--modo', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.filho:
+        _executar_filho(args.arquivo, args.modo)
+        return
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        print(f"{'notas':>8} {'MB':>7} {'modo':>10} {'notas/s':>10} {'pico RSS (MB)':>14} {'acima da base':>14}")
+        for quantidade in (int(n) for n in args.notas.split(',')):
+            caminho = os.path.join(diretorio, f'resposta_{quantidade}.xml')
+            gravar_resposta(caminho, quantidade)
+            tamanho_mb = os.path.getsize(caminho) / 1024 / 1024
+            
+            for modo in ('arvore', 'iterparse'):
+                saida = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.bench_parser', '--filho',
+                     '--arquivo', caminho, '--modo', modo],
+                    capture_output=True, text=True, check=True
+                ).stdout.strip().splitlines()[-1]
+                r = json.loads(saida)
+                print(
+                    f"{r['notas']:>8} {tamanho_mb:>7.1f} {modo:>10} {r['notas'] / r['segundos']:>10.0f} "
+                    f"{r['pico_mb']:>14.1f} {r['pico_mb'] - r['base_mb']:>14.1f}"
+                )
+            os.remove(caminho)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark ponta a ponta sem rede: parse + carga nos destinos locais
+
+Gera respostas ABRASF sintéticas espalhadas por vários meses e mede, para
+cada destino local (SQLite e Parquet particionado), o caminho do script:
+parse iterparse -> lotes de lote_tamanho -> load_to_bigquery (notas e
+tributos com deduplicação pela chave). A segunda passada reenvia as mesmas
+notas (todas já carregadas), como numa execução incremental sobreposta.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.bench_sinks --notas 20000 --lote 100,1000
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from tests.stubs.abrasf_stub import gerar_resposta_consulta
+from scripts.nfse_campinas_integration import NFSeCampinasIntegration
+from src.storage.sink import criar_sink
+
+MESES = 12
+
+
+def _respostas(notas):
+    """Uma resposta por mês, numeração contínua"""
+    por_mes = max(1, notas // MESES)
+    return [
+        gerar_resposta_consulta(por_mes, primeiro_numero=1 + mes * por_mes, data_emissao=f'2024-{mes + 1:02d}-15')
+        for mes in range(MESES)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ponta a ponta nos destinos locais')
+    parser.add_argument('--notas', type=int, default=20000)
+    parser.add_argument('--lote', default='100,1000', help='Notas por carga (processamento.lote_tamanho)')
+    parser.add_argument('--destinos', default='sqlite,parquet')
+    args = parser.parse_args()
+    # Log por lote da integração fora da medição
+    logging.getLogger().setLevel(logging.WARNING)
+    
+    respostas = _respostas(args.notas)
+    print(f"{args.notas} notas em {MESES} meses")
+    print(f"{'destino':>8} {'lote':>6} {'passada':>8} {'segundos':>9} {'notas/s':>9} {'jobs':>6}")
+    
+    for destino in args.destinos.split(','):
+        for lote in (int(l) for l in args.lote.split(',')):
+            with tempfile.TemporaryDirectory() as diretorio:
+                sink = criar_sink({'armazenamento': {
+                    'destino': destino,
+                    'diretorio_parquet': os.path.join(diretorio, 'parquet'),
+                    'caminho_sqlite': os.path.join(diretorio, 'nfse.sqlite3')
+                }})
+                integracao = NFSeCampinasIntegration(
+                    config={'CERT_PATH': None, 'DIRETORIO_ESTADO': None}, loader=sink
+                )
+                for passada in ('nova', 'repetida'):
+                    jobs_antes = sink.jobs
+                    inicio = time.perf_counter()
+                    total = 0
+                    for resposta in respostas:
+                        nfses = integracao.parse_nfse_response(resposta)
+                        for i in range(0, len(nfses), lote):
+                            integracao.load_to_bigquery(nfses[i:i + lote])
+                        total += len(nfses)
+                    segundos = time.perf_counter() - inicio
+                    print(
+                        f"{destino:>8} {lote:>6} {passada:>8} {segundos:>9.2f} "
+                        f"{total / segundos:>9.0f} {sink.jobs - jobs_antes:>6}"
+                    )
+                sink.fechar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark da validação de CNPJ/CPF: escalar vs lote (NumPy)
+
+Gera N documentos (CNPJ numérico com e sem máscara, CNPJ alfanumérico,
+CPF e uma parte com dígito errado) e mede linhas/s de validar_cnpj/
+validar_cpf texto a texto contra validar_cnpj_lote/validar_cpf_lote sobre
+a coluna inteira (lista e Series do pandas). Os modos escalares rodam só
+sobre as primeiras --escalar linhas.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.bench_validadores --linhas 1000000
+"""
+
+import argparse
+import gc
+import random
+import string
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.parsers.validators import (
+    PESOS_CPF, calcular_dv_cnpj, validar_cnpj, validar_cnpj_lote, validar_cpf, validar_cpf_lote
+)
+
+
+def _dv_python(valores, pesos):
+    """Dígito verificador do CPF gerado"""
+    resto = sum(v * p for v, p in zip(valores, pesos)) % 11
+    return 0 if resto < 2 else 11 - resto
+
+
+def _gerar(linhas, aleatorio):
+    """CNPJs (1/3 alfanuméricos, 1/2 com máscara, ~10% inválidos) e CPFs"""
+    cnpjs, cpfs = [], []
+    alfabeto = string.digits + string.ascii_uppercase
+    for i in range(linhas):
+        if i % 3 == 0:
+            raiz = ''.join(aleatorio.choice(alfabeto) for _ in range(12))
+        else:
+            raiz = f"{aleatorio.randrange(10 ** 12):012d}"
+        cnpj = raiz + calcular_dv_cnpj(raiz)
+        if aleatorio.random() < 0.1:
+            cnpj = cnpj[:-1] + str((int(cnpj[-1]) + 1) % 10)
+        if i % 2:
+            cnpj = f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}"
+        cnpjs.append(cnpj)
+        
+        base = [aleatorio.randrange(10) for _ in range(9)]
+        base.append(_dv_python(base, PESOS_CPF[1:].tolist()))
+        base.append(_dv_python(base, PESOS_CPF.tolist()))
+        cpfs.append(''.join(map(str, base)))
+    return cnpjs, cpfs
+
+
+def _cronometrar(funcao, repeticoes=3):
+    """Melhor tempo de funcao() em repeticoes, sem coleta de lixo durante a medição"""
+    melhor = None
+    for _ in range(repeticoes):
+        gc.collect()
+        gc.disable()
+        try:
+            inicio = time.perf_counter()
+            resultado = funcao()
+            decorrido = time.perf_counter() - inicio
+        finally:
+            gc.enable()
+        melhor = decorrido if melhor is None else min(melhor, decorrido)
+    return resultado, melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da validação de CNPJ/CPF')
+    parser.add_argument('--linhas', type=int, default=1000000)
+    parser.add_argument('--escalar', type=int, default=50000, help='Linhas dos modos um a um')
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+    
+    cnpjs, cpfs = _gerar(args.linhas, random.Random(args.semente))
+    amostra_cnpj, amostra_cpf = cnpjs[:args.escalar], cpfs[:args.escalar]
+    serie_cnpj = pd.Series(cnpjs)
+    
+    modos = (
+        ('CNPJ', 'escalar', len(amostra_cnpj), lambda: [validar_cnpj(c) for c in amostra_cnpj]),
+        ('CNPJ', 'lote (lista)', len(cnpjs), lambda: validar_cnpj_lote(cnpjs)),
+        ('CNPJ', 'lote (Series)', len(cnpjs), lambda: validar_cnpj_lote(serie_cnpj).to_numpy()),
+        ('CPF', 'escalar', len(amostra_cpf), lambda: [validar_cpf(c) for c in amostra_cpf]),
+        ('CPF', 'lote (lista)', len(cpfs), lambda: validar_cpf_lote(cpfs)),
+    )
+    
+    print(f"{'doc':>5} {'modo':>14} {'linhas':>9} {'segundos':>9} {'linhas/s':>12}")
+    resultados = {}
+    for documento, nome, linhas, funcao in modos:
+        resultados[documento, nome], segundos = _cronometrar(funcao)
+        print(f"{documento:>5} {nome:>14} {linhas:>9} {segundos:>9.3f} {linhas / segundos:>12,.0f}")
+    
+    # Mesmo veredito no escalar e no lote (nas linhas em comum)
+    for documento in ('CNPJ', 'CPF'):
+        lote = np.asarray(resultados[documento, 'lote (lista)'][:args.escalar])
+        assert (lote == np.array(resultados[documento, 'escalar'])).all()
+    validos = int(np.count_nonzero(resultados['CNPJ', 'lote (lista)']))
+    print(f"\nCNPJs válidos: {validos} de {len(cnpjs)}")
+
+
+if __name__ == "__main__":
+    main()
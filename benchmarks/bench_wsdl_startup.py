@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark do tempo de inicialização do NfseClient / cliente Zeep
+
+Mede, contra um WSDL ABRASF sintético servido localmente:
+  - construção do NfseClient (Zeep adiado até o primeiro uso)
+  - Zeep sem cache (busca WSDL e XSD a cada processo)
+  - Zeep com cache em disco, com o servidor desligado (offline)
+
+Uso (na raiz do repositório):
+    python -m benchmarks.bench_wsdl_startup --latencia 0.15
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from tests.stubs.abrasf_stub import ServidorAbrasfLocal
+from src.api.nfse_client import NfseClient
+
+OPERACAO = 'ConsultarNfseServicoPrestado'
+
+
+def _config(url, cache=None):
+    nfse = {'endpoint': url}
+    if cache:
+        nfse['wsdl_cache'] = cache
+    return {'cliente': {'cnpj': '10425636000139', 'inscricao_municipal': '001557548'}, 'nfse': nfse}
+
+
+def _medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de inicialização do cliente SOAP')
+    parser.add_argument('--latencia', type=float, default=0.15, help='Latência por download de WSDL/XSD (s)')
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        cache = os.path.join(diretorio, 'wsdl_cache.sqlite3')
+        
+        with ServidorAbrasfLocal(latencia_wsdl=args.latencia) as servidor:
+            url = servidor.url
+            lazy = _medir(lambda: NfseClient(_config(url)), args.repeticoes)
+            sem_cache = _medir(lambda: NfseClient(_config(url)).operacao(OPERACAO), args.repeticoes)
+            # Aquecer o cache
+            NfseClient(_config(url, cache)).operacao(OPERACAO)
+        
+        # Servidor desligado: inicialização a partir do cache
+        com_cache = _medir(lambda: NfseClient(_config(url, cache)).operacao(OPERACAO), args.repeticoes)
+    
+    print(f"Latência simulada por documento: {args.latencia}s (mediana de {args.repeticoes})")
+    print(f"{'cenário':<38} {'tempo (ms)':>10}")
+    print(f"{'NfseClient (Zeep adiado)':<38} {lazy * 1000:>10.1f}")
+    print(f"{'1ª operação, sem cache (rede)':<38} {sem_cache * 1000:>10.1f}")
+    print(f"{'1ª operação, cache em disco (offline)':<38} {com_cache * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -160,8 +160,12 @@ WITH kpis_base AS (
     SUM(valor_liquido) as receita_liquida,
     AVG(valor_liquido) as ticket_medio,
     
-    -- Métricas de impostos recuperados
-    SUM(valor_pis + valor_cofins + valor_inss + valor_ir + valor_csll) as impostos_retidos,
+    -- Métricas de impostos recuperados (NUMERIC: soma exata mesmo com colunas FLOAT legadas;
+    -- somas por coluna para um valor inválido/nulo não descartar os demais tributos da nota,
+    -- e coluna toda nula no grupo conta como zero)
+    COALESCE(SUM(CAST(valor_pis AS NUMERIC)), 0) + COALESCE(SUM(CAST(valor_cofins AS NUMERIC)), 0)
+      + COALESCE(SUM(CAST(valor_inss AS NUMERIC)), 0) + COALESCE(SUM(CAST(valor_ir AS NUMERIC)), 0)
+      + COALESCE(SUM(CAST(valor_csll AS NUMERIC)), 0) as impostos_retidos,
     SUM(valor_iss) as iss_total,
     
     -- Análise de segmentos de serviço
@@ -302,17 +306,20 @@ WITH analise_tributaria AS (
     SUM(valor_servicos) as valor_servicos_total,
     SUM(valor_liquido) as valor_liquido_total,
     
-    -- Impostos e deduções
-    SUM(valor_pis) as total_pis,
-    SUM(valor_cofins) as total_cofins,
-    SUM(valor_inss) as total_inss,
-    SUM(valor_ir) as total_ir,
-    SUM(valor_csll) as total_csll,
-    SUM(valor_iss) as total_iss,
-    SUM(valor_deducoes) as total_deducoes,
-    
-    -- Métricas de recuperação
-    SUM(valor_pis + valor_cofins + valor_inss + valor_ir + valor_csll) as impostos_federais_retidos,
+    -- Impostos e deduções (NUMERIC: soma exata mesmo com colunas FLOAT legadas)
+    SUM(CAST(valor_pis AS NUMERIC)) as total_pis,
+    SUM(CAST(valor_cofins AS NUMERIC)) as total_cofins,
+    SUM(CAST(valor_inss AS NUMERIC)) as total_inss,
+    SUM(CAST(valor_ir AS NUMERIC)) as total_ir,
+    SUM(CAST(valor_csll AS NUMERIC)) as total_csll,
+    SUM(CAST(valor_iss AS NUMERIC)) as total_iss,
+    SUM(CAST(valor_deducoes AS NUMERIC)) as total_deducoes,
+    
+    -- Métricas de recuperação (somas por coluna: um valor inválido/nulo não descarta a nota;
+    -- coluna toda nula no grupo conta como zero)
+    COALESCE(SUM(CAST(valor_pis AS NUMERIC)), 0) + COALESCE(SUM(CAST(valor_cofins AS NUMERIC)), 0)
+      + COALESCE(SUM(CAST(valor_inss AS NUMERIC)), 0) + COALESCE(SUM(CAST(valor_ir AS NUMERIC)), 0)
+      + COALESCE(SUM(CAST(valor_csll AS NUMERIC)), 0) as impostos_federais_retidos,
     
     COUNT(*) as total_nfses,
     MAX(data_emissao) as ultima_nfse
@@ -349,4 +356,23 @@ SELECT *,
   END as score_prioridade_recuperacao
 
 FROM analise_tributaria
-ORDER BY impostos_federais_retidos DESC;
\ No newline at end of file
+ORDER BY impostos_federais_retidos DESC;
+-- ===================================================================
+-- VIEW 6: Tributos Retidos por Tomador (tabela estreita nf_tributos)
+-- ===================================================================
+-- Lê só as linhas de tributo (uma por tributo com valor, gravadas junto
+-- com cada NFS-e), sem varrer as colunas da tabela de NFS-e
+CREATE OR REPLACE VIEW `dados-ems-project.ems_analytics.v_tributos_retidos` AS
+SELECT 
+  tomador_cpf_cnpj,
+  tipo_tributo,
+  EXTRACT(YEAR FROM data_emissao) as ano,
+  
+  SUM(valor) as valor_total,
+  SUM(base_calculo) as base_calculo_total,
+  COUNT(DISTINCT hash_nfse) as total_nfses,
+  MAX(data_emissao) as ultima_nfse
+  
+FROM `dados-ems-project.ems_raw.nf_tributos`
+WHERE retido AND tomador_cpf_cnpj IS NOT NULL
+GROUP BY 1,2,3;
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Situação cadastral de CNPJs em lote (cache local + consulta remota)
+
+Uso:
+    python scripts/cnpj_situacao.py 10425636000139 12.ABC.345/01DE-35
+    python scripts/cnpj_situacao.py --arquivo cnpjs.txt --saida situacao.csv
+"""
+
+import os
+import sys
+import csv
+import argparse
+import logging
+
+# Permitir importar o pacote src ao executar como script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.parsers.cnpj_lookup import criar_consulta_cnpj
+from src.utils.helpers import load_config
+
+CONFIG_YAML = 'config/config.yaml'
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+COLUNAS_SAIDA = ('cnpj', 'situacao', 'razao_social', 'data_situacao', 'consultado_em', 'fonte', 'erro')
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description='Situação cadastral de CNPJs')
+    parser.add_argument('cnpjs', nargs='*', help='CNPJs, com ou sem máscara')
+    parser.add_argument('--arquivo', help='Arquivo com um CNPJ por linha')
+    parser.add_argument('--saida', help='CSV de saída (padrão: tela)')
+    parser.add_argument('--workers', type=int, help='Consultas remotas simultâneas (padrão: config.yaml)')
+    args = parser.parse_args()
+    
+    cnpjs = list(args.cnpjs)
+    if args.arquivo:
+        with open(args.arquivo, encoding='utf-8') as arquivo:
+            cnpjs.extend(linha.strip() for linha in arquivo if linha.strip())
+    if not cnpjs:
+        parser.error('informe CNPJs ou --arquivo')
+    
+    config = load_config(CONFIG_YAML) if os.path.exists(CONFIG_YAML) else {}
+    if args.workers:
+        config.setdefault('cnpj_situacao', {})['workers'] = args.workers
+    consulta = criar_consulta_cnpj(config)
+    resultados = consulta.consultar_lote(cnpjs)
+    
+    saida = open(args.saida, 'w', newline='', encoding='utf-8') if args.saida else sys.stdout
+    try:
+        escritor = csv.DictWriter(saida, fieldnames=COLUNAS_SAIDA, extrasaction='ignore')
+        escritor.writeheader()
+        escritor.writerows(resultados.values())
+    finally:
+        if args.saida:
+            saida.close()
+    
+    logger.info(f"Situação cadastral: {consulta.metricas()}")
+    if consulta.erros:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,10 @@ from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from dotenv import load_dotenv
 
+# Permitir importar o pacote src ao executar como script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.parsers.validators import validar_cnpj_lote, validar_cpf_lote
+
 # Configurar encoding UTF-8 para Windows
 if sys.platform.startswith('win'):
     import locale
@@ -31,18 +35,22 @@ if sys.platform.startswith('win'):
 # Carregar variáveis de ambiente
 load_dotenv('config/.env')
 
-# Configuração de logging sem emojis
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/ems_etl.log', encoding='utf-8'),
-        logging.StreamHandler(sys.stdout)
-    ],
-    encoding='utf-8'
-)
 logger = logging.getLogger(__name__)
 
+
+def configurar_logging():
+    """Configuração de logging sem emojis (só na execução como script)"""
+    os.makedirs('logs', exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('logs/ems_etl.log', encoding='utf-8'),
+            logging.StreamHandler(sys.stdout)
+        ],
+        encoding='utf-8'
+    )
+
 class Config:
     """Configurações específicas para EMS Project"""
     
@@ -258,6 +266,24 @@ class DataProcessor:
         
         return df
     
+    def validar_documentos(self, df):
+        """Marcar CNPJ/CPF válidos (coluna <coluna>_valido), validando a coluna inteira de uma vez"""
+        for col in [c for c in df.columns if 'cnpj' in c.lower() or 'cpf' in c.lower()]:
+            nome = col.lower()
+            if 'cnpj' in nome and 'cpf' in nome:
+                validos = validar_cnpj_lote(df[col]) | validar_cpf_lote(df[col])
+            elif 'cnpj' in nome:
+                validos = validar_cnpj_lote(df[col])
+            else:
+                validos = validar_cpf_lote(df[col])
+            
+            preenchidos = df[col].astype(str).str.strip() != ''
+            invalidos = int((preenchidos & ~validos).sum())
+            if invalidos:
+                logger.warning(f"Coluna {col}: {invalidos} de {int(preenchidos.sum())} documentos inválidos")
+            df[f'{col}_valido'] = validos
+        return df
+    
     def process_excel_file(self, file_buffer, file_name):
         """Processar arquivo Excel específico da EMS"""
         try:
@@ -281,6 +307,7 @@ class DataProcessor:
                     if not df.empty:
                         # Limpeza específica
                         df = self.clean_dataframe(df)
+                        df = self.validar_documentos(df)
                         
                         # Adicionar metadados da aba
                         df['nome_aba'] = sheet_name
@@ -539,10 +566,8 @@ class EMSETLPipeline:
 
 def main():
     """Função principal"""
+    configurar_logging()
     try:
-        # Criar diretório de logs se não existir
-        os.makedirs('logs', exist_ok=True)
-        
         # Executar pipeline
         pipeline = EMSETLPipeline()
         pipeline.run()
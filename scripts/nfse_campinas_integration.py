@@ -8,36 +8,97 @@ Específico para Recuperação Tributária
 import os
 import sys
 import logging
+import argparse
+import threading
+import time
+import contextlib
 import requests
-import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-import pandas as pd
 from google.cloud import bigquery
-from google.oauth2 import service_account
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.serialization import pkcs12
-import base64
-import hashlib
 from dotenv import load_dotenv
 
+# Permitir importar o pacote src ao executar como script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.api.nfse_client import NfseClient, LimitePaginasError
+from src.utils.helpers import load_config, pico_memoria_mb, formatar_memoria
+from src.storage.watermark import SqliteWatermarkStore, parse_data_emissao
+from src.utils.window_planner import WindowPlanner
+from src.parsers.xml_parser import NfseXmlParser
+from src.parsers.parallel_parser import ParallelNfseParser, listar_respostas
+from src.parsers.xsd_validator import XSD_NFSE, NfseXsdValidator
+from src.storage.bigquery_loader import schema_de_json
+from src.storage.sink import criar_sink
+from src.storage.hash_index import HashNfseIndex
+
 # Carregar configurações
 load_dotenv('config/.env')
+CONFIG_YAML = 'config/config.yaml'
+SCHEMA_TRIBUTOS = 'schemas/bigquery/nf_tributos.json'
+
+LOG_ARQUIVO = 'logs/nfse_integration.log'
 
-# Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/nfse_integration.log', encoding='utf-8'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
 logger = logging.getLogger(__name__)
 
+
+def configurar_logging():
+    """Log em arquivo e na saída padrão (só na execução como script: importar o módulo não cria arquivos)"""
+    os.makedirs(os.path.dirname(LOG_ARQUIVO), exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(LOG_ARQUIVO, encoding='utf-8'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+# Schema da tabela nfse_campinas criada pela integração (tabelas existentes mantêm o próprio)
+SCHEMA_NFSE_LEGADO = [
+    bigquery.SchemaField("numero_nfse", "STRING"),
+    bigquery.SchemaField("codigo_verificacao", "STRING"),
+    bigquery.SchemaField("data_emissao", "DATE"),
+    bigquery.SchemaField("data_competencia", "DATE"),
+    bigquery.SchemaField("prestador_cnpj", "STRING"),
+    bigquery.SchemaField("prestador_razao_social", "STRING"),
+    bigquery.SchemaField("tomador_cnpj", "STRING"),
+    bigquery.SchemaField("tomador_cpf", "STRING"),
+    bigquery.SchemaField("tomador_razao_social", "STRING"),
+    bigquery.SchemaField("tomador_endereco", "STRING"),
+    bigquery.SchemaField("tomador_municipio", "STRING"),
+    bigquery.SchemaField("tomador_uf", "STRING"),
+    bigquery.SchemaField("tomador_cep", "STRING"),
+    bigquery.SchemaField("valor_servicos", "NUMERIC"),
+    bigquery.SchemaField("valor_deducoes", "NUMERIC"),
+    bigquery.SchemaField("valor_pis", "NUMERIC"),
+    bigquery.SchemaField("valor_cofins", "NUMERIC"),
+    bigquery.SchemaField("valor_inss", "NUMERIC"),
+    bigquery.SchemaField("valor_ir", "NUMERIC"),
+    bigquery.SchemaField("valor_csll", "NUMERIC"),
+    bigquery.SchemaField("valor_iss", "NUMERIC"),
+    bigquery.SchemaField("valor_liquido", "NUMERIC"),
+    bigquery.SchemaField("discriminacao", "STRING"),
+    bigquery.SchemaField("item_lista_servico", "STRING"),
+    bigquery.SchemaField("data_processamento", "DATE"),
+    bigquery.SchemaField("origem_consulta", "STRING"),
+    bigquery.SchemaField("hash_nfse", "STRING")
+]
+
+# Janelas simultâneas na carga histórica (educado com o webservice municipal)
+WORKERS_PADRAO = 4
+
+# Consultas simultâneas ao webservice somando todos os clientes (--clientes)
+MAX_CONCORRENCIA_GLOBAL = 8
+
 class NFSeCampinasIntegration:
     """Integração com NFSe Campinas para EMS Project"""
     
-    def __init__(self):
+    def __init__(self, config=None, bq_client=None, watermarks=None, limite_global=None, loader=None,
+                 indice_hash=None):
+        config_yaml = load_config(CONFIG_YAML) if os.path.exists(CONFIG_YAML) else {}
+        processamento = config_yaml.get('processamento', {})
+        
         self.config = {
             'PROJECT_ID': os.getenv('PROJECT_ID', 'dados-ems-project'),
             'DATASET_RAW': os.getenv('DATASET_RAW', 'ems_raw'),
@@ -45,333 +106,776 @@ class NFSeCampinasIntegration:
             'CERT_PASSWORD': os.getenv('CERT_PASSWORD'),
             'CLIENTE_CNPJ': os.getenv('CLIENTE_CNPJ'),
             'CLIENTE_INSCRICAO': os.getenv('CLIENTE_INSCRICAO_MUNICIPAL'),
-            'WSDL_URL': 'https://issdigital.campinas.sp.gov.br/notafiscal-abrasfv203-ws/NotaFiscalSoap?wsdl'
+            'WSDL_URL': 'https://issdigital.campinas.sp.gov.br/notafiscal-abrasfv203-ws/NotaFiscalSoap?wsdl',
+            'LOTE_TAMANHO': processamento.get('lote_tamanho', 100),
+            'PERIODO_DIAS': processamento.get('consulta_periodo_dias', 7),
+            'JANELA_DIAS_MAX': processamento.get('janela_dias_max', 31),
+            'JANELA_ALVO_NFSES': processamento.get('janela_alvo_nfses', 500),
+            'DIRETORIO_ESTADO': processamento.get('diretorio_estado', 'state'),
+            'INCREMENTO_HORAS_INICIAL': processamento.get('incremento_horas_inicial', 72),
+            'INCREMENTO_SOBREPOSICAO_HORAS': processamento.get('incremento_sobreposicao_horas', 6),
+            # Cópia bruta de cada página recebida (vazio: não arquivar)
+            'DIRETORIO_RESPOSTAS': processamento.get('diretorio_respostas'),
+            'REPROCESSAMENTO_BLOCO_MB': processamento.get('reprocessamento_bloco_mb', 16),
+            # Validação das notas no XSD ABRASF (uma resposta a cada N ou fração aleatória)
+            'VALIDACAO_XSD': processamento.get('validacao_xsd', False),
+            'VALIDACAO_AMOSTRA_CADA': processamento.get('validacao_amostra_cada', 1),
+            'VALIDACAO_FRACAO': processamento.get('validacao_fracao'),
+            'DIRETORIO_QUARENTENA': processamento.get('diretorio_quarentena', 'quarantine'),
+            'XSD_NFSE': processamento.get('xsd_nfse') or XSD_NFSE,
+            # Destino das cargas: bigquery, parquet ou sqlite (seção armazenamento do config.yaml)
+            'ARMAZENAMENTO': config_yaml.get('armazenamento', {}),
+            # Índice local de hash_nfse já carregados, consultado antes de cada carga
+            'INDICE_HASH': processamento.get('indice_hash', True),
+            'INDICE_HASH_FALSO_POSITIVO': processamento.get('indice_hash_falso_positivo', 0.01),
+            # Pool de conexões, timeout e controle de vazão do webservice (seção nfse do config.yaml)
+            'NFSE': {
+                'retry_tentativas': processamento.get('retry_tentativas', 3),
+                **{
+                    chave: valor for chave, valor in config_yaml.get('nfse', {}).items()
+                    if chave in ('timeout', 'pool_conexoes', 'pool_max', 'ca_bundle', 'max_paginas',
+                                 'wsdl_cache', 'wsdl_cache_ttl_horas', 'wsdl_local',
+                                 'limite_requisicoes_segundo', 'limite_rajada', 'limite_estado',
+                                 'circuito_falhas', 'circuito_pausa_segundos',
+                                 'resposta_stream', 'resposta_spool_mb')
+                }
+            }
         }
+        if config:
+            self.config.update(config)
         
-        # Inicializar BigQuery
-        self.bq_client = bigquery.Client.from_service_account_json(
-            'config/gcp-credentials.json',
-            project=self.config['PROJECT_ID']
+        # Clientes criados sob demanda (consultas não dependem do BigQuery)
+        self._bq_client = bq_client
+        self._loader = loader
+        # Semáforo compartilhado entre clientes: teto global de consultas em voo
+        self.limite_global = limite_global
+        self._nfse_client = None
+        self._nfse_client_lock = threading.Lock()
+        self._tabela_tributos_ok = False
+        
+        # Tamanho das janelas aprendido entre execuções (densidade é de cada prestador)
+        arquivo_densidade = (
+            f"densidade_janelas_{self.config['CLIENTE_CNPJ']}.json"
+            if self.config['CLIENTE_CNPJ'] else 'densidade_janelas.json'
+        )
+        self.planejador = WindowPlanner(
+            caminho_estado=(
+                os.path.join(self.config['DIRETORIO_ESTADO'], arquivo_densidade)
+                if self.config['DIRETORIO_ESTADO'] else None
+            ),
+            dias_base=self.config['PERIODO_DIAS'],
+            dias_max=self.config['JANELA_DIAS_MAX'],
+            alvo_nfses=self.config['JANELA_ALVO_NFSES'],
+            alvo_latencia=self.config['NFSE'].get('timeout', 30) / 3
         )
         
+        # Marca d'água da última data_emissao carregada por prestador
+        self.watermarks = watermarks if watermarks is not None else SqliteWatermarkStore(
+            os.path.join(self.config['DIRETORIO_ESTADO'], 'watermarks.sqlite3')
+            if self.config['DIRETORIO_ESTADO'] else ':memory:'
+        )
+        self.ultimo_incremento = None
+        self.ultimo_historico = None
+        self.ultimo_reprocessamento = None
+        
+        # Hashes já carregados no destino (um arquivo por destino: trocar de destino não herda o índice)
+        self.indice_hash = indice_hash
+        if self.indice_hash is None and self.config['INDICE_HASH']:
+            destino = self.config['ARMAZENAMENTO'].get('destino', 'bigquery')
+            self.indice_hash = HashNfseIndex(
+                os.path.join(self.config['DIRETORIO_ESTADO'], f'hash_nfse_{destino}.sqlite3')
+                if self.config['DIRETORIO_ESTADO'] else ':memory:',
+                taxa_falso_positivo=self.config['INDICE_HASH_FALSO_POSITIVO']
+            )
+        
+        # Notas reprovadas no XSD ficam em quarentena, por prestador
+        validador = None
+        if self.config['VALIDACAO_XSD']:
+            validador = NfseXsdValidator(
+                quarentena=os.path.join(self.config['DIRETORIO_QUARENTENA'], self.config['CLIENTE_CNPJ'] or ''),
+                caminho_xsd=self.config['XSD_NFSE'],
+                amostra_cada=self.config['VALIDACAO_AMOSTRA_CADA'],
+                fracao=self.config['VALIDACAO_FRACAO']
+            )
+        
+        # Parser iterparse: memória constante por resposta
+        self.parser = NfseXmlParser(validador=validador)
+        
         logger.info("NFSe Campinas Integration inicializado")
     
-    def load_certificate(self):
-        """Carregar certificado digital"""
-        try:
-            with open(self.config['CERT_PATH'], 'rb') as cert_file:
-                cert_data = cert_file.read()
-            
-            private_key, certificate, additional_certificates = pkcs12.load_key_and_certificates(
-                cert_data, 
-                self.config['CERT_PASSWORD'].encode()
+    @property
+    def bq_client(self):
+        """Cliente BigQuery (inicializado no primeiro uso)"""
+        if self._bq_client is None:
+            self._bq_client = bigquery.Client.from_service_account_json(
+                'config/gcp-credentials.json',
+                project=self.config['PROJECT_ID']
             )
-            
-            logger.info("Certificado digital carregado com sucesso")
-            return private_key, certificate
-            
-        except Exception as e:
-            logger.error(f"Erro ao carregar certificado: {e}")
-            raise
-    
-    def create_soap_envelope(self, cnpj, data_inicio, data_fim):
-        """Criar envelope SOAP para consulta NFSe"""
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"
-                       xmlns:nfse="http://www.betha.com.br/e-nota-contribuinte-ws">
-            <soap:Header/>
-            <soap:Body>
-                <nfse:ConsultarNfseEnvio>
-                    <ConsultarNfseEnvio xmlns="http://www.betha.com.br/e-nota-contribuinte-ws">
-                        <Prestador>
-                            <CpfCnpj>
-                                <Cnpj>{cnpj}</Cnpj>
-                            </CpfCnpj>
-                            <InscricaoMunicipal>{self.config['CLIENTE_INSCRICAO']}</InscricaoMunicipal>
-                        </Prestador>
-                        <PeriodoEmissao>
-                            <DataInicial>{data_inicio}</DataInicial>
-                            <DataFinal>{data_fim}</DataFinal>
-                        </PeriodoEmissao>
-                    </ConsultarNfseEnvio>
-                </nfse:ConsultarNfseEnvio>
-            </soap:Body>
-        </soap:Envelope>"""
-        
-        return soap_body
+        return self._bq_client
     
-    def consultar_nfse_periodo(self, data_inicio, data_fim):
-        """Consultar NFSe por período"""
-        try:
-            # Criar envelope SOAP
-            soap_envelope = self.create_soap_envelope(
-                self.config['CLIENTE_CNPJ'], 
-                data_inicio.strftime('%Y-%m-%d'),
-                data_fim.strftime('%Y-%m-%d')
+    @property
+    def loader(self):
+        """Destino das cargas (NfseSink do config.yaml: BigQuery, Parquet ou SQLite local)"""
+        if self._loader is None:
+            armazenamento = self.config['ARMAZENAMENTO']
+            self._loader = criar_sink(
+                {'armazenamento': armazenamento, 'gcp': {'project_id': self.config['PROJECT_ID']}},
+                client=self.bq_client if armazenamento.get('destino', 'bigquery') == 'bigquery' else None
             )
-            
-            # Carregar certificado
-            private_key, certificate = self.load_certificate()
-            
-            # Headers da requisição
-            headers = {
-                'Content-Type': 'text/xml; charset=utf-8',
-                'SOAPAction': 'ConsultarNfse'
-            }
-            
-            # Fazer requisição SOAP
-            response = requests.post(
-                self.config['WSDL_URL'],
-                data=soap_envelope,
-                headers=headers,
-                cert=(certificate, private_key),
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                return self.parse_nfse_response(response.text)
-            else:
-                logger.error(f"Erro na consulta NFSe: {response.status_code} - {response.text}")
-                return []
-                
-        except Exception as e:
-            logger.error(f"Erro ao consultar NFSe: {e}")
-            return []
+        return self._loader
     
-    def parse_nfse_response(self, xml_response):
-        """Parsear resposta XML da NFSe"""
-        try:
-            root = ET.fromstring(xml_response)
-            nfses = []
-            
-            # Namespace para NFSe
-            ns = {'nfse': 'http://www.betha.com.br/e-nota-contribuinte-ws'}
-            
-            # Procurar por CompNfse (NFSe completa)
-            for comp_nfse in root.findall('.//nfse:CompNfse', ns):
-                nfse_data = self.extract_nfse_data(comp_nfse, ns)
-                if nfse_data:
-                    nfses.append(nfse_data)
-            
-            logger.info(f"Processadas {len(nfses)} NFSes")
-            return nfses
-            
-        except Exception as e:
-            logger.error(f"Erro ao parsear XML NFSe: {e}")
-            return []
+    @property
+    def nfse_client(self):
+        """Cliente SOAP com certificado e pool de conexões (um por processo)"""
+        with self._nfse_client_lock:
+            if self._nfse_client is None:
+                self._nfse_client = NfseClient({
+                    'cliente': {
+                        'cnpj': self.config['CLIENTE_CNPJ'],
+                        'inscricao_municipal': self.config['CLIENTE_INSCRICAO']
+                    },
+                    'nfse': {
+                        **self.config['NFSE'],
+                        'endpoint': self.config['WSDL_URL'],
+                        'certificado_path': self.config['CERT_PATH'],
+                        'certificado_senha': self.config['CERT_PASSWORD']
+                    }
+                })
+        return self._nfse_client
     
-    def extract_nfse_data(self, comp_nfse, ns):
-        """Extrair dados estruturados da NFSe"""
-        try:
-            nfse = comp_nfse.find('.//nfse:Nfse', ns)
-            if nfse is None:
-                return None
-            
-            # Dados da NFSe
-            inf_nfse = nfse.find('.//nfse:InfNfse', ns)
-            
-            data = {
-                'numero_nfse': self.get_xml_text(inf_nfse, './/nfse:Numero', ns),
-                'codigo_verificacao': self.get_xml_text(inf_nfse, './/nfse:CodigoVerificacao', ns),
-                'data_emissao': self.get_xml_text(inf_nfse, './/nfse:DataEmissao', ns),
-                'data_competencia': self.get_xml_text(inf_nfse, './/nfse:Competencia', ns),
-                
-                # Prestador de serviço (EMS Project)
-                'prestador_cnpj': self.get_xml_text(inf_nfse, './/nfse:PrestadorServico//nfse:Cnpj', ns),
-                'prestador_razao_social': self.get_xml_text(inf_nfse, './/nfse:PrestadorServico//nfse:RazaoSocial', ns),
-                
-                # Tomador do serviço (Cliente da EMS)
-                'tomador_cnpj': self.get_xml_text(inf_nfse, './/nfse:TomadorServico//nfse:Cnpj', ns),
-                'tomador_cpf': self.get_xml_text(inf_nfse, './/nfse:TomadorServico//nfse:Cpf', ns),
-                'tomador_razao_social': self.get_xml_text(inf_nfse, './/nfse:TomadorServico//nfse:RazaoSocial', ns),
-                'tomador_endereco': self.get_xml_text(inf_nfse, './/nfse:TomadorServico//nfse:Endereco', ns),
-                'tomador_municipio': self.get_xml_text(inf_nfse, './/nfse:TomadorServico//nfse:Municipio', ns),
-                'tomador_uf': self.get_xml_text(inf_nfse, './/nfse:TomadorServico//nfse:Uf', ns),
-                'tomador_cep': self.get_xml_text(inf_nfse, './/nfse:TomadorServico//nfse:Cep', ns),
-                
-                # Dados do serviço
-                'valor_servicos': self.get_xml_float(inf_nfse, './/nfse:Servico//nfse:ValorServicos', ns),
-                'valor_deducoes': self.get_xml_float(inf_nfse, './/nfse:Servico//nfse:ValorDeducoes', ns),
-                'valor_pis': self.get_xml_float(inf_nfse, './/nfse:Servico//nfse:ValorPis', ns),
-                'valor_cofins': self.get_xml_float(inf_nfse, './/nfse:Servico//nfse:ValorCofins', ns),
-                'valor_inss': self.get_xml_float(inf_nfse, './/nfse:Servico//nfse:ValorInss', ns),
-                'valor_ir': self.get_xml_float(inf_nfse, './/nfse:Servico//nfse:ValorIr', ns),
-                'valor_csll': self.get_xml_float(inf_nfse, './/nfse:Servico//nfse:ValorCsll', ns),
-                'valor_iss': self.get_xml_float(inf_nfse, './/nfse:Servico//nfse:ValorIss', ns),
-                'valor_liquido': self.get_xml_float(inf_nfse, './/nfse:Servico//nfse:ValorLiquidoNfse', ns),
-                
-                'discriminacao': self.get_xml_text(inf_nfse, './/nfse:Servico//nfse:Discriminacao', ns),
-                'item_lista_servico': self.get_xml_text(inf_nfse, './/nfse:Servico//nfse:ItemListaServico', ns),
-                
-                # Metadados de processamento
-                'data_processamento': datetime.now().strftime('%Y-%m-%d'),
-                'origem_consulta': 'nfse_campinas_api',
-                'hash_nfse': None  # Será calculado
-            }
-            
-            # Calcular hash da NFSe para controle de duplicatas
-            hash_string = f"{data['numero_nfse']}{data['codigo_verificacao']}{data['data_emissao']}"
-            data['hash_nfse'] = hashlib.sha256(hash_string.encode()).hexdigest()
-            
-            return data
-            
-        except Exception as e:
-            logger.error(f"Erro ao extrair dados da NFSe: {e}")
-            return None
+    def consultar_nfse_periodo(self, data_inicio, data_fim):
+        """
+        Consultar NFSe por período
+        
+        Erros são propagados (após as novas tentativas do cliente): uma lista
+        vazia significaria período sem notas e a janela seria perdida.
+        """
+        return self.requisitar_nfse_periodo(data_inicio, data_fim)
     
-    def get_xml_text(self, parent, xpath, ns):
-        """Extrair texto de elemento XML"""
-        element = parent.find(xpath, ns)
-        return element.text if element is not None else None
+    def requisitar_nfse_periodo(self, data_inicio, data_fim):
+        """Consultar NFSe por período, propagando erros de comunicação"""
+        nfses = []
+        stream = self.config['NFSE'].get('resposta_stream', False)
+        
+        # Próxima página é baixada enquanto a atual é parseada
+        for numero, pagina in enumerate(self.nfse_client.iterar_paginas(
+            data_inicio.strftime('%Y-%m-%d'),
+            data_fim.strftime('%Y-%m-%d'),
+            stream=stream
+        ), start=1):
+            if self.config['DIRETORIO_RESPOSTAS']:
+                self.arquivar_resposta(pagina, data_inicio, data_fim, numero)
+            # Em stream, o parser lê direto do arquivo temporário
+            nfses.extend(self.parse_nfse_response(pagina.abrir() if stream else pagina))
+        
+        return nfses
     
-    def get_xml_float(self, parent, xpath, ns):
-        """Extrair valor float de elemento XML"""
-        text = self.get_xml_text(parent, xpath, ns)
-        try:
-            return float(text) if text else 0.0
-        except ValueError:
-            return 0.0
+    def arquivar_resposta(self, pagina, data_inicio, data_fim, numero):
+        """Gravar a página recebida, sem decodificar, no diretório de respostas"""
+        diretorio = self.config['DIRETORIO_RESPOSTAS']
+        os.makedirs(diretorio, exist_ok=True)
+        nome = (
+            f"{self.config['CLIENTE_CNPJ']}_{data_inicio.strftime('%Y%m%d')}_"
+            f"{data_fim.strftime('%Y%m%d')}_p{numero:04d}.xml"
+        )
+        
+        if isinstance(pagina, str):
+            with open(os.path.join(diretorio, nome), 'w', encoding='utf-8') as arquivo:
+                arquivo.write(pagina)
+        else:
+            pagina.salvar(os.path.join(diretorio, nome + ('.gz' if pagina.comprimido else '')))
+    
+    def parse_nfse_response(self, xml_response):
+        """
+        Parsear resposta XML da NFSe (str/bytes ou arquivo binário), em streaming
+        
+        Erros de parse são propagados: a janela fica com erro e a marca
+        d'água não avança, em vez de parecer um período sem notas.
+        """
+        return self.parser.parse_nfse_response(xml_response)
     
     def load_to_bigquery(self, nfse_data):
-        """Carregar dados NFSe no BigQuery"""
+        """
+        Carregar dados NFSe no BigQuery
+        
+        Cada tabela recebe o lote inteiro numa staging e um único MERGE pela
+        chave (hash_nfse nas notas, id nos tributos): número fixo de jobs
+        por lote, e notas já carregadas não entram de novo. Antes disso, o
+        índice local tira do lote as notas já carregadas; lote sem nota nova
+        não chega ao destino.
+        """
         if not nfse_data:
             logger.warning("Nenhum dado NFSe para carregar")
             return False
         
+        if self.indice_hash is not None:
+            processadas = len(nfse_data)
+            nfse_data = self.indice_hash.filtrar_novas(nfse_data)
+            if not nfse_data:
+                logger.info(f"{processadas} NFSes já carregadas (índice local): destino não consultado")
+                return True
+        
         try:
-            # Converter para DataFrame
-            df = pd.DataFrame(nfse_data)
-            
-            # Tabela de destino
+            # Tabela de destino (colunas fora do schema legado são ignoradas)
             table_id = f"{self.config['PROJECT_ID']}.{self.config['DATASET_RAW']}.nfse_campinas"
+            self.loader.garantir_tabela(table_id, SCHEMA_NFSE_LEGADO)
+            novas = self.loader.mesclar(table_id, nfse_data, chave='hash_nfse')
             
-            # Verificar se tabela existe, senão criar
-            try:
-                table = self.bq_client.get_table(table_id)
-            except:
-                # Criar tabela com schema apropriado
-                schema = [
-                    bigquery.SchemaField("numero_nfse", "STRING"),
-                    bigquery.SchemaField("codigo_verificacao", "STRING"),
-                    bigquery.SchemaField("data_emissao", "DATE"),
-                    bigquery.SchemaField("data_competencia", "DATE"),
-                    bigquery.SchemaField("prestador_cnpj", "STRING"),
-                    bigquery.SchemaField("prestador_razao_social", "STRING"),
-                    bigquery.SchemaField("tomador_cnpj", "STRING"),
-                    bigquery.SchemaField("tomador_cpf", "STRING"),
-                    bigquery.SchemaField("tomador_razao_social", "STRING"),
-                    bigquery.SchemaField("tomador_endereco", "STRING"),
-                    bigquery.SchemaField("tomador_municipio", "STRING"),
-                    bigquery.SchemaField("tomador_uf", "STRING"),
-                    bigquery.SchemaField("tomador_cep", "STRING"),
-                    bigquery.SchemaField("valor_servicos", "FLOAT"),
-                    bigquery.SchemaField("valor_deducoes", "FLOAT"),
-                    bigquery.SchemaField("valor_pis", "FLOAT"),
-                    bigquery.SchemaField("valor_cofins", "FLOAT"),
-                    bigquery.SchemaField("valor_inss", "FLOAT"),
-                    bigquery.SchemaField("valor_ir", "FLOAT"),
-                    bigquery.SchemaField("valor_csll", "FLOAT"),
-                    bigquery.SchemaField("valor_iss", "FLOAT"),
-                    bigquery.SchemaField("valor_liquido", "FLOAT"),
-                    bigquery.SchemaField("discriminacao", "STRING"),
-                    bigquery.SchemaField("item_lista_servico", "STRING"),
-                    bigquery.SchemaField("data_processamento", "DATE"),
-                    bigquery.SchemaField("origem_consulta", "STRING"),
-                    bigquery.SchemaField("hash_nfse", "STRING")
-                ]
-                
-                table = bigquery.Table(table_id, schema=schema)
-                table = self.bq_client.create_table(table)
-                logger.info(f"Tabela {table_id} criada")
+            # Tributos explodidos das mesmas notas, na tabela estreita (id determinístico por nota e tributo)
+            tributos = [t for nfse in nfse_data for t in self.parser.extrair_tributos(nfse)]
+            novos_tributos = self.loader.mesclar(self._tabela_tributos(), tributos, chave='id') if tributos else 0
             
-            # Inserir dados (evitar duplicatas por hash)
-            inserted_count = 0
-            for _, row in df.iterrows():
-                # Verificar se já existe
-                query = f"""
-                SELECT COUNT(*) as count 
-                FROM `{table_id}` 
-                WHERE hash_nfse = '{row['hash_nfse']}'
-                """
-                
-                result = list(self.bq_client.query(query))
-                if result[0].count == 0:
-                    # Inserir novo registro
-                    errors = self.bq_client.insert_rows_json(table_id, [row.to_dict()])
-                    if not errors:
-                        inserted_count += 1
-                    else:
-                        logger.warning(f"Erro ao inserir NFSe {row['numero_nfse']}: {errors}")
-            
-            logger.info(f"Inseridas {inserted_count} novas NFSes de {len(df)} processadas")
+            logger.info(
+                f"Inseridas {novas} novas NFSes de {len(nfse_data)} processadas "
+                f"e {novos_tributos} linhas de tributos"
+            )
+            if self.indice_hash is not None:
+                self.indice_hash.registrar(nfse.get('hash_nfse') for nfse in nfse_data)
             return True
-            
+        
         except Exception as e:
             logger.error(f"Erro ao carregar dados no BigQuery: {e}")
             return False
     
-    def consultar_historico(self, meses_atras=24):
-        """Consultar histórico de NFSe"""
-        logger.info(f"Iniciando consulta histórica ({meses_atras} meses)")
+    def reconstruir_indice_hash(self):
+        """
+        Refazer o índice local com os hash_nfse que estão no destino
+        
+        Para o primeiro uso com um destino já povoado, ou depois de dados
+        apagados/recarregados por fora da integração.
+        
+        Returns:
+            Hashes no índice
+        """
+        if self.indice_hash is None:
+            raise ValueError("Índice de hash_nfse desativado (processamento.indice_hash)")
+        table_id = f"{self.config['PROJECT_ID']}.{self.config['DATASET_RAW']}.nfse_campinas"
+        return self.indice_hash.reconstruir(self.loader.iterar_chaves(table_id, 'hash_nfse'))
+    
+    def _tabela_tributos(self):
+        """Tabela nf_tributos (criada pelo schema versionado no primeiro uso)"""
+        table_id = f"{self.config['PROJECT_ID']}.{self.config['DATASET_RAW']}.nf_tributos"
+        if not self._tabela_tributos_ok:
+            self.loader.garantir_tabela(table_id, schema_de_json(SCHEMA_TRIBUTOS))
+            self._tabela_tributos_ok = True
+        return table_id
+    
+    def _carregar_lote(self, nfses, avancar_watermark=True):
+        """Carregar lote e, se bem-sucedido, avançar a marca d'água do prestador"""
+        carregado = self.load_to_bigquery(nfses)
+        if carregado and avancar_watermark:
+            self.watermarks.registrar_carga(
+                self.config['CLIENTE_CNPJ'],
+                [parse_data_emissao(n.get('data_emissao')) for n in nfses]
+            )
+        return carregado
+    
+    def _notas_em_quarentena(self):
+        """Notas reprovadas no XSD pela thread atual (0 sem validação)"""
+        validador = self.parser.validador
+        return validador.invalidas_nesta_thread() if validador is not None else 0
+    
+    def consultar_janela(self, indice, data_inicio, data_fim):
+        """
+        Consultar uma janela, isolando NFSes e erro
+        
+        Notas da janela reprovadas no XSD ficam em resultado['quarentena']:
+        não estão em resultado['nfses'], então a janela está incompleta.
+        """
+        logger.info(f"Consultando período: {data_inicio.strftime('%Y-%m-%d')} a {data_fim.strftime('%Y-%m-%d')}")
+        
+        resultado = {
+            'indice': indice,
+            'data_inicio': data_inicio,
+            'data_fim': data_fim,
+            'nfses': [],
+            'quarentena': 0,
+            'erro': None
+        }
+        
+        inicio = time.perf_counter()
+        try:
+            # Vaga no teto global liberada antes de eventual divisão da janela
+            with self.limite_global or contextlib.nullcontext():
+                em_quarentena = self._notas_em_quarentena()
+                resultado['nfses'] = self.requisitar_nfse_periodo(data_inicio, data_fim)
+                resultado['quarentena'] = self._notas_em_quarentena() - em_quarentena
+            self.planejador.registrar(data_inicio, data_fim, len(resultado['nfses']), time.perf_counter() - inicio)
+        except (requests.ReadTimeout, LimitePaginasError) as e:
+            dias = (data_fim.date() - data_inicio.date()).days
+            if dias < 1:
+                logger.error(f"Erro no período {data_inicio.strftime('%Y-%m-%d')}: {e}")
+                resultado['erro'] = str(e)
+                return resultado
+            
+            # Janela densa demais: dividir ao meio e consultar as metades
+            self.planejador.registrar_estouro(data_inicio, data_fim)
+            meio = data_inicio + timedelta(days=(dias - 1) // 2)
+            logger.warning(f"Dividindo período {data_inicio.strftime('%Y-%m-%d')} a {data_fim.strftime('%Y-%m-%d')}: {e}")
+            
+            metades = [
+                self.consultar_janela(indice, data_inicio, meio),
+                self.consultar_janela(indice, meio + timedelta(days=1), data_fim)
+            ]
+            resultado['nfses'] = metades[0]['nfses'] + metades[1]['nfses']
+            resultado['quarentena'] = metades[0]['quarentena'] + metades[1]['quarentena']
+            resultado['erro'] = '; '.join(m['erro'] for m in metades if m['erro']) or None
+        except Exception as e:
+            logger.error(f"Erro no período {data_inicio.strftime('%Y-%m-%d')} a {data_fim.strftime('%Y-%m-%d')}: {e}")
+            resultado['erro'] = str(e)
+        
+        return resultado
+    
+    def iterar_janelas(self, janelas, workers=1):
+        """
+        Consultar janelas com pool limitado de workers
+        
+        Gera um resultado por janela, na ordem das janelas. No máximo
+        2 * workers janelas ficam em memória ao mesmo tempo.
+        """
+        if workers <= 1:
+            for i, (inicio, fim) in enumerate(janelas):
+                yield self.consultar_janela(i, inicio, fim)
+            return
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='nfse-janela') as executor:
+            pendentes = deque()
+            for i, (inicio, fim) in enumerate(janelas):
+                pendentes.append(executor.submit(self.consultar_janela, i, inicio, fim))
+                if len(pendentes) >= workers * 2:
+                    yield pendentes.popleft().result()
+            while pendentes:
+                yield pendentes.popleft().result()
+    
+    def consultar_janelas(self, janelas, workers=1):
+        """
+        Consultar janelas com pool limitado de workers
+        
+        Returns:
+            Lista de resultados por janela, na ordem das janelas
+        """
+        return list(self.iterar_janelas(janelas, workers))
+    
+    def consultar_historico(self, meses_atras=24, workers=WORKERS_PADRAO):
+        """
+        Consultar histórico de NFSe, carregando em lotes à medida que as janelas chegam
+        
+        A marca d'água só avança enquanto nenhuma janela ou carga falhou e
+        nenhuma nota foi para a quarentena do XSD: as janelas chegam em
+        ordem, então ela nunca passa de um período incompleto e a próxima
+        execução volta a consultá-lo. Falhas ficam em ultimo_historico.
+        
+        Returns:
+            Total de NFSes carregadas
+        """
+        lote_tamanho = self.config['LOTE_TAMANHO']
+        logger.info(f"Iniciando consulta histórica ({meses_atras} meses, {workers} workers, lotes de {lote_tamanho})")
+        
+        # Certificado vencido interrompe a carga antes da primeira janela
+        self.nfse_client.verificar_certificado()
         
         data_fim = datetime.now()
         data_inicio = data_fim - timedelta(days=meses_atras * 30)
         
-        # Consultar em períodos de 1 mês para evitar timeouts
-        current_date = data_inicio
-        total_nfses = []
+        # Janelas dimensionadas pela densidade aprendida de cada mês
+        janelas = self.planejador.planejar(data_inicio, data_fim)
         
-        while current_date < data_fim:
-            periodo_fim = min(current_date + timedelta(days=30), data_fim)
-            
-            logger.info(f"Consultando período: {current_date.strftime('%Y-%m-%d')} a {periodo_fim.strftime('%Y-%m-%d')}")
+        # Pipeline: consultar janela -> parsear -> carregar lote -> liberar
+        total_nfses = 0
+        janelas_com_erro = 0
+        janelas_com_quarentena = 0
+        notas_em_quarentena = 0
+        lotes_com_erro = 0
+        nfses_nao_carregadas = 0
+        pendentes = []
+        
+        def carregar(lote):
+            nonlocal total_nfses, lotes_com_erro, nfses_nao_carregadas
+            # Falha ou quarentena anterior: período incompleto, marca d'água parada
+            completo = janelas_com_erro == 0 and janelas_com_quarentena == 0 and lotes_com_erro == 0
+            if self._carregar_lote(lote, avancar_watermark=completo):
+                total_nfses += len(lote)
+            else:
+                lotes_com_erro += 1
+                nfses_nao_carregadas += len(lote)
+        
+        for resultado in self.iterar_janelas(janelas, workers):
+            if resultado['erro']:
+                janelas_com_erro += 1
+            if resultado['quarentena']:
+                janelas_com_quarentena += 1
+                notas_em_quarentena += resultado['quarentena']
             
-            nfses_periodo = self.consultar_nfse_periodo(current_date, periodo_fim)
-            total_nfses.extend(nfses_periodo)
+            # Ordem das janelas preservada: saída determinística
+            pendentes.extend(resultado['nfses'])
+            while len(pendentes) >= lote_tamanho:
+                carregar(pendentes[:lote_tamanho])
+                del pendentes[:lote_tamanho]
             
-            current_date = periodo_fim + timedelta(days=1)
+            logger.info(
+                f"Janela {resultado['indice'] + 1}/{len(janelas)} concluída - "
+                f"{total_nfses} NFSes carregadas, pico de memória {formatar_memoria(pico_memoria_mb())}"
+            )
         
-        # Carregar no BigQuery
-        if total_nfses:
-            self.load_to_bigquery(total_nfses)
-            logger.info(f"Consulta histórica concluída: {len(total_nfses)} NFSes processadas")
+        if pendentes:
+            carregar(pendentes)
+        
+        self.ultimo_historico = {
+            'janelas': len(janelas),
+            'janelas_com_erro': janelas_com_erro,
+            'janelas_com_quarentena': janelas_com_quarentena,
+            'notas_em_quarentena': notas_em_quarentena,
+            'lotes_com_erro': lotes_com_erro,
+            'nfses_nao_carregadas': nfses_nao_carregadas,
+            'falhas': janelas_com_erro + janelas_com_quarentena + lotes_com_erro
+        }
+        
+        self.planejador.salvar()
+        logger.info(f"Webservice NFSe: {self.nfse_client.metricas()}")
+        logger.info(f"Parser NFSe: {self.parser.metricas()}")
+        if self.indice_hash is not None:
+            logger.info(f"Índice hash_nfse: {self.indice_hash.metricas()}")
+        
+        if self.ultimo_historico['falhas']:
+            logger.error(
+                f"Consulta histórica concluída com falhas: {janelas_com_erro} de {len(janelas)} janelas, "
+                f"{lotes_com_erro} lotes ({nfses_nao_carregadas} NFSes) não carregados, "
+                f"{notas_em_quarentena} NFSes em quarentena em {janelas_com_quarentena} janelas - "
+                f"{total_nfses} NFSes carregadas, marca d'água parada na primeira falha"
+            )
+        elif total_nfses:
+            logger.info(
+                f"Consulta histórica concluída: {total_nfses} NFSes processadas - "
+                f"pico de memória {formatar_memoria(pico_memoria_mb())}"
+            )
         else:
             logger.warning("Nenhuma NFSe encontrada no período histórico")
         
-        return len(total_nfses)
+        return total_nfses
     
-    def consultar_incremento(self):
-        """Consultar incremento desde última execução"""
-        # Consultar últimas 72 horas para garantir captura completa
+    def consultar_incremento(self, workers=1):
+        """
+        Consultar incremento desde a marca d'água da última carga
+        
+        Com janela com erro ou nota em quarentena no XSD, as NFSes válidas
+        são carregadas mas a marca d'água não avança: a próxima execução
+        volta a consultar o período.
+        """
+        self.nfse_client.verificar_certificado()
+        
+        prestador = self.config['CLIENTE_CNPJ']
         data_fim = datetime.now()
-        data_inicio = data_fim - timedelta(hours=72)
+        # Varredura fixa usada na primeira execução (sem marca d'água)
+        varredura_fixa = data_fim - timedelta(hours=self.config['INCREMENTO_HORAS_INICIAL'])
+        
+        watermark = self.watermarks.obter(prestador)
+        if watermark is None:
+            data_inicio = varredura_fixa
+        else:
+            data_inicio = watermark - timedelta(hours=self.config['INCREMENTO_SOBREPOSICAO_HORAS'])
         
         logger.info(f"Consultando incremento: {data_inicio.strftime('%Y-%m-%d %H:%M')} a {data_fim.strftime('%Y-%m-%d %H:%M')}")
         
-        nfses = self.consultar_nfse_periodo(data_inicio, data_fim)
+        nfses = []
+        janelas_com_erro = 0
+        janelas_com_quarentena = 0
+        notas_em_quarentena = 0
+        for resultado in self.iterar_janelas(self.planejador.planejar(data_inicio, data_fim), workers):
+            nfses.extend(resultado['nfses'])
+            if resultado['erro']:
+                janelas_com_erro += 1
+            if resultado['quarentena']:
+                janelas_com_quarentena += 1
+                notas_em_quarentena += resultado['quarentena']
         
-        if nfses:
-            self.load_to_bigquery(nfses)
+        # Relatório: re-consultadas na sobreposição vs puladas graças à marca d'água
+        datas = [parse_data_emissao(n.get('data_emissao')) for n in nfses]
+        reconsultadas = sum(1 for d in datas if watermark is not None and d is not None and d <= watermark)
+        puladas = self.watermarks.contar_carregadas(prestador, varredura_fixa, data_inicio) if data_inicio > varredura_fixa else 0
+        self.ultimo_incremento = {
+            'data_inicio': data_inicio,
+            'nfses': len(nfses),
+            'novas': len(nfses) - reconsultadas,
+            'reconsultadas': reconsultadas,
+            'puladas': puladas,
+            'janelas_com_erro': janelas_com_erro,
+            'janelas_com_quarentena': janelas_com_quarentena,
+            'notas_em_quarentena': notas_em_quarentena,
+            'lotes_com_erro': 0,
+            'falhas': janelas_com_erro + janelas_com_quarentena
+        }
+        logger.info(
+            f"Incremento: {len(nfses) - reconsultadas} novas, {reconsultadas} re-consultadas (sobreposição), "
+            f"{puladas} já carregadas puladas em relação à varredura fixa"
+        )
+        
+        logger.info(f"Webservice NFSe: {self.nfse_client.metricas()}")
+        logger.info(f"Parser NFSe: {self.parser.metricas()}")
+        
+        carregadas = len(nfses)
+        # Janela com erro ou quarentena: não avançar a marca além de um período incompleto
+        completo = janelas_com_erro == 0 and janelas_com_quarentena == 0
+        if nfses and not self._carregar_lote(nfses, avancar_watermark=completo):
+            carregadas = 0
+            self.ultimo_incremento['lotes_com_erro'] = 1
+            self.ultimo_incremento['falhas'] += 1
+        
+        if self.ultimo_incremento['falhas']:
+            logger.error(
+                f"Consulta incremental concluída com falhas: {janelas_com_erro} janelas com erro, "
+                f"{notas_em_quarentena} NFSes em quarentena em {janelas_com_quarentena} janelas, "
+                f"{self.ultimo_incremento['lotes_com_erro']} lote não carregado - {carregadas} NFSes carregadas"
+            )
+        elif nfses:
             logger.info(f"Consulta incremental concluída: {len(nfses)} NFSes processadas")
         else:
             logger.info("Nenhuma NFSe nova encontrada")
+        if self.indice_hash is not None:
+            logger.info(f"Índice hash_nfse: {self.indice_hash.metricas()}")
+        
+        return carregadas
+    
+    def reprocessar_respostas(self, diretorio=None, workers=None):
+        """
+        Reprocessar respostas arquivadas, com parse em vários processos
+        
+        Lê os arquivos de DIRETORIO_RESPOSTAS (ou diretorio), parseia em um
+        pool de processos na ordem dos arquivos e carrega em lotes. A marca
+        d'água não é alterada: são notas antigas. Lotes com falha ficam em
+        ultimo_reprocessamento.
         
-        return len(nfses)
+        Returns:
+            Total de NFSes carregadas
+        """
+        diretorio = diretorio or self.config['DIRETORIO_RESPOSTAS']
+        if not diretorio:
+            raise ValueError("Diretório de respostas não configurado (processamento.diretorio_respostas)")
+        
+        caminhos = listar_respostas(diretorio)
+        lote_tamanho = self.config['LOTE_TAMANHO']
+        parser = ParallelNfseParser(workers, bloco_bytes=int(self.config['REPROCESSAMENTO_BLOCO_MB'] * 1024 * 1024))
+        logger.info(f"Reprocessando {len(caminhos)} respostas de {diretorio} ({parser.workers} processos)")
+        
+        total_nfses = 0
+        lotes_com_erro = 0
+        nfses_nao_carregadas = 0
+        pendentes = []
+        
+        def carregar(lote):
+            nonlocal total_nfses, lotes_com_erro, nfses_nao_carregadas
+            if self._carregar_lote(lote, avancar_watermark=False):
+                total_nfses += len(lote)
+            else:
+                lotes_com_erro += 1
+                nfses_nao_carregadas += len(lote)
+        
+        for nfse in parser.iterar_nfse(caminhos, ordenado=True):
+            pendentes.append(nfse)
+            if len(pendentes) >= lote_tamanho:
+                carregar(pendentes)
+                pendentes = []
+        
+        if pendentes:
+            carregar(pendentes)
+        
+        self.ultimo_reprocessamento = {
+            'arquivos': len(caminhos),
+            'lotes_com_erro': lotes_com_erro,
+            'nfses_nao_carregadas': nfses_nao_carregadas,
+            'falhas': lotes_com_erro
+        }
+        
+        if lotes_com_erro:
+            logger.error(
+                f"Reprocessamento concluído com falhas: {lotes_com_erro} lotes ({nfses_nao_carregadas} NFSes) "
+                f"não carregados - {total_nfses} NFSes carregadas"
+            )
+        else:
+            logger.info(
+                f"Reprocessamento concluído: {total_nfses} NFSes - "
+                f"pico de memória {formatar_memoria(pico_memoria_mb())}"
+            )
+        if self.indice_hash is not None:
+            logger.info(f"Índice hash_nfse: {self.indice_hash.metricas()}")
+        return total_nfses
+
+def carregar_clientes(config_yaml):
+    """
+    Lista de clientes (prestadores) do config.yaml
+    
+    Usa a lista 'clientes' quando presente; senão, o bloco 'cliente' único
+    com o certificado da seção nfse. Campos omitidos em cada cliente herdam
+    certificado_path/certificado_senha da seção nfse.
+    
+    Returns:
+        Lista de dicts com nome, cnpj, inscricao_municipal, certificado_path,
+        certificado_senha e max_concorrencia
+    """
+    nfse = config_yaml.get('nfse', {})
+    clientes = config_yaml.get('clientes') or (
+        [config_yaml['cliente']] if config_yaml.get('cliente') else []
+    )
+    
+    return [
+        {
+            'nome': cliente.get('nome', cliente['cnpj']),
+            'cnpj': str(cliente['cnpj']),
+            'inscricao_municipal': str(cliente.get('inscricao_municipal', '')),
+            'certificado_path': cliente.get('certificado_path', nfse.get('certificado_path')),
+            'certificado_senha': cliente.get('certificado_senha', nfse.get('certificado_senha')),
+            'max_concorrencia': cliente.get('max_concorrencia', WORKERS_PADRAO)
+        }
+        for cliente in clientes
+    ]
+
+def selecionar_clientes(clientes, selecao):
+    """Filtrar clientes por 'todos' ou CNPJs separados por vírgula"""
+    if selecao == 'todos':
+        return clientes
+    
+    cnpjs = [c.strip() for c in selecao.split(',') if c.strip()]
+    desconhecidos = set(cnpjs) - {c['cnpj'] for c in clientes}
+    if desconhecidos:
+        raise ValueError(f"Clientes não configurados em {CONFIG_YAML}: {', '.join(sorted(desconhecidos))}")
+    return [c for c in clientes if c['cnpj'] in cnpjs]
+
+def executar_clientes(clientes, modo='incremento', meses=24, max_concorrencia_global=MAX_CONCORRENCIA_GLOBAL,
+                      config=None, bq_client=None, watermarks=None):
+    """
+    Consultar vários clientes em paralelo
+    
+    Cada cliente roda em sua própria integração (certificado, planejador de
+    janelas) com até max_concorrencia janelas simultâneas; um semáforo
+    compartilhado limita as consultas em voo somando todos os clientes.
+    Marcas d'água (chaveadas pelo CNPJ) e índice de hash_nfse são compartilhados.
+    
+    Args:
+        clientes: Lista de carregar_clientes()
+        modo: 'historico' ou 'incremento'
+        meses: Meses da consulta histórica
+        max_concorrencia_global: Teto de consultas simultâneas ao webservice
+        config: Sobrescritas aplicadas a todas as integrações
+        bq_client: Cliente BigQuery compartilhado
+        watermarks: Armazenamento de marcas d'água (padrão: o do diretório de estado)
+    
+    Returns:
+        Dict por CNPJ com nome, nfses, incremento, erro e segundos
+    """
+    limite_global = threading.BoundedSemaphore(max_concorrencia_global)
+    base = NFSeCampinasIntegration(config=config, bq_client=bq_client, watermarks=watermarks)
+    watermarks = base.watermarks
+    
+    def executar(cliente):
+        resultado = {'nome': cliente['nome'], 'nfses': 0, 'incremento': None, 'erro': None, 'segundos': 0.0}
+        inicio = time.perf_counter()
+        try:
+            integracao = NFSeCampinasIntegration(
+                config={
+                    **(config or {}),
+                    'CLIENTE_CNPJ': cliente['cnpj'],
+                    'CLIENTE_INSCRICAO': cliente['inscricao_municipal'],
+                    'CERT_PATH': cliente['certificado_path'],
+                    'CERT_PASSWORD': cliente['certificado_senha']
+                },
+                bq_client=bq_client,
+                watermarks=watermarks,
+                limite_global=limite_global,
+                indice_hash=base.indice_hash
+            )
+            workers = min(cliente['max_concorrencia'], max_concorrencia_global)
+            if modo == 'historico':
+                resultado['nfses'] = integracao.consultar_historico(meses, workers=workers)
+                if integracao.ultimo_historico['falhas']:
+                    resultado['erro'] = (
+                        f"{integracao.ultimo_historico['janelas_com_erro']} janelas e "
+                        f"{integracao.ultimo_historico['lotes_com_erro']} lotes com falha, "
+                        f"{integracao.ultimo_historico['notas_em_quarentena']} NFSes em quarentena"
+                    )
+            else:
+                resultado['nfses'] = integracao.consultar_incremento(workers=workers)
+                resultado['incremento'] = integracao.ultimo_incremento
+                if integracao.ultimo_incremento['falhas']:
+                    resultado['erro'] = (
+                        f"{integracao.ultimo_incremento['janelas_com_erro']} janelas e "
+                        f"{integracao.ultimo_incremento['lotes_com_erro']} lotes com falha, "
+                        f"{integracao.ultimo_incremento['notas_em_quarentena']} NFSes em quarentena"
+                    )
+        except Exception as e:
+            logger.error(f"Erro no cliente {cliente['nome']} ({cliente['cnpj']}): {e}")
+            resultado['erro'] = str(e)
+        resultado['segundos'] = time.perf_counter() - inicio
+        return cliente['cnpj'], resultado
+    
+    logger.info(
+        f"Consultando {len(clientes)} clientes ({modo}), "
+        f"até {max_concorrencia_global} consultas simultâneas no total"
+    )
+    
+    resultados = {}
+    if clientes:
+        with ThreadPoolExecutor(max_workers=len(clientes), thread_name_prefix='nfse-cliente') as executor:
+            for futuro in as_completed([executor.submit(executar, c) for c in clientes]):
+                cnpj, resultado = futuro.result()
+                resultados[cnpj] = resultado
+    
+    # Resumo na ordem da configuração
+    resultados = {c['cnpj']: resultados[c['cnpj']] for c in clientes}
+    for cnpj, resultado in resultados.items():
+        situacao = f"erro: {resultado['erro']}" if resultado['erro'] else f"{resultado['nfses']} NFSes"
+        logger.info(f"Cliente {resultado['nome']} ({cnpj}): {situacao} em {resultado['segundos']:.1f}s")
+    
+    return resultados
 
 def main():
     """Função principal"""
+    configurar_logging()
+    parser = argparse.ArgumentParser(description='Integração NFSe Campinas')
+    parser.add_argument(
+        'modo', nargs='?', default='incremento',
+        help='historico, reprocessar, reconstruir-indice ou incremento (padrão)'
+    )
+    parser.add_argument('meses', nargs='?', type=int, default=24, help='Meses da consulta histórica')
+    parser.add_argument('--workers', type=int, default=WORKERS_PADRAO, help='Janelas consultadas em paralelo')
+    parser.add_argument('--workers-parse', type=int, help='Processos de parse no reprocessamento')
+    parser.add_argument('--clientes', help="'todos' ou CNPJs separados por vírgula (lista clientes do config.yaml)")
+    args = parser.parse_args()
+    
     try:
+        if args.clientes:
+            # Carteira inteira numa execução: clientes em paralelo sob teto global
+            config_yaml = load_config(CONFIG_YAML)
+            clientes = selecionar_clientes(carregar_clientes(config_yaml), args.clientes)
+            resultados = executar_clientes(
+                clientes, args.modo, args.meses,
+                max_concorrencia_global=config_yaml.get('processamento', {}).get(
+                    'max_concorrencia_global', MAX_CONCORRENCIA_GLOBAL
+                )
+            )
+            if any(r['erro'] for r in resultados.values()):
+                sys.exit(1)
+            return
+        
         integration = NFSeCampinasIntegration()
         
-        # Verificar argumentos
-        if len(sys.argv) > 1 and sys.argv[1] == 'historico':
-            # Consulta histórica
-            meses = int(sys.argv[2]) if len(sys.argv) > 2 else 24
-            integration.consultar_historico(meses)
+        if args.modo == 'historico':
+            # Consulta histórica: janela ou lote com falha encerra com erro
+            integration.consultar_historico(args.meses, workers=args.workers)
+            if integration.ultimo_historico['falhas']:
+                sys.exit(1)
+        elif args.modo == 'reprocessar':
+            # Respostas arquivadas, parse em vários processos (padrão: todos os núcleos)
+            integration.reprocessar_respostas(workers=args.workers_parse)
+            if integration.ultimo_reprocessamento['falhas']:
+                sys.exit(1)
+        elif args.modo == 'reconstruir-indice':
+            # Índice local de hash_nfse refeito a partir do destino
+            integration.reconstruir_indice_hash()
         else:
-            # Consulta incremental (padrão para n8n)
+            # Consulta incremental (padrão para n8n): falha encerra com erro
             integration.consultar_incremento()
-            
+            if integration.ultimo_incremento['falhas']:
+                sys.exit(1)
+    
     except Exception as e:
         logger.error(f"Erro na execução: {e}")
         sys.exit(1)
@@ -0,0 +1,178 @@
+"""Cliente assíncrono NFSe Campinas - ABRASF 2.03"""
+
+import asyncio
+import ssl
+import aiohttp
+import logging
+
+from src.api.auth import carregar_certificado, criar_contexto_ssl
+from src.api.nfse_client import (
+    HEADERS_CONSULTA,
+    LimitePaginasError,
+    montar_envelope_consulta,
+    proxima_pagina,
+    url_webservice,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncNfseClient:
+    """
+    Cliente asyncio para WebService NFSe Campinas
+    
+    Mesma API de consulta do NfseClient, com métodos assíncronos. Um único
+    pool de conexões é compartilhado e um semáforo limita quantas
+    requisições ficam em voo. Uso:
+    
+        async with AsyncNfseClient(config) as client:
+            resultados = await client.consultar_periodos(periodos)
+    """
+    
+    def __init__(self, config):
+        """
+        Args:
+            config: Dicionário com configurações (formato do config.yaml)
+        """
+        self.config = config
+        nfse = config['nfse']
+        
+        self.endpoint = url_webservice(nfse).split('?')[0]
+        self.timeout = nfse.get('timeout', 30)
+        self.max_paginas = nfse.get('max_paginas', 1000)
+        self.max_concorrencia = nfse.get('max_concorrencia', 20)
+        
+        self.certificado = None
+        if nfse.get('certificado_path'):
+            self.certificado = carregar_certificado(nfse['certificado_path'], nfse.get('certificado_senha'))
+        
+        self._session = None
+        self._semaforo = None
+        self._tarefas = set()
+    
+    async def abrir(self):
+        """Cria o pool de conexões e o semáforo de concorrência"""
+        nfse = self.config['nfse']
+        
+        contexto_ssl = True
+        if self.certificado is not None:
+            contexto_ssl = criar_contexto_ssl(self.certificado, nfse.get('ca_bundle'))
+        elif nfse.get('ca_bundle'):
+            contexto_ssl = ssl.create_default_context(cafile=nfse['ca_bundle'])
+        
+        self._semaforo = asyncio.Semaphore(self.max_concorrencia)
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_concorrencia, ssl=contexto_ssl),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers=HEADERS_CONSULTA
+        )
+        return self
+    
+    async def fechar(self):
+        """Cancela consultas em andamento e encerra o pool de conexões"""
+        pendentes = [tarefa for tarefa in self._tarefas if not tarefa.done()]
+        for tarefa in pendentes:
+            tarefa.cancel()
+        if pendentes:
+            logger.info(f"Cancelando {len(pendentes)} consultas em andamento")
+            await asyncio.gather(*pendentes, return_exceptions=True)
+        
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+    
+    async def __aenter__(self):
+        return await self.abrir()
+    
+    async def __aexit__(self, *exc):
+        await self.fechar()
+    
+    def _criar_tarefa(self, coroutine) -> asyncio.Task:
+        """Cria tarefa rastreada (cancelada em fechar())"""
+        tarefa = asyncio.ensure_future(coroutine)
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+        return tarefa
+    
+    def verificar_certificado(self):
+        """Falha imediatamente se o certificado venceu durante a execução"""
+        if self.certificado is not None:
+            self.certificado.verificar_validade()
+    
+    async def consultar_nfse_periodo(self, data_inicio: str, data_fim: str, pagina: int = 1) -> str:
+        """
+        Consulta NFSe por período
+        
+        Args:
+            data_inicio: Data início (YYYY-MM-DD)
+            data_fim: Data fim (YYYY-MM-DD)
+            pagina: Página da consulta
+            
+        Returns:
+            XML com as NFSe encontradas
+        """
+        self.verificar_certificado()
+        envelope = montar_envelope_consulta(self.config['cliente'], data_inicio, data_fim, pagina)
+        
+        async with self._semaforo:
+            logger.debug(f"Consultando NFSe de {data_inicio} até {data_fim} (página {pagina})")
+            async with self._session.post(self.endpoint, data=envelope.encode('utf-8')) as response:
+                texto = await response.text()
+                if response.status != 200:
+                    raise RuntimeError(f"Erro na consulta NFSe: {response.status} - {texto}")
+        
+        return texto
+    
+    async def iterar_paginas(self, data_inicio: str, data_fim: str):
+        """
+        Consulta NFSe por período, página a página (próxima página antecipada)
+        
+        Yields:
+            XML de cada página, em ordem
+            
+        Raises:
+            LimitePaginasError: Após a última página permitida por max_paginas
+        """
+        pagina = 1
+        tarefa = self._criar_tarefa(self.consultar_nfse_periodo(data_inicio, data_fim, pagina))
+        
+        try:
+            while tarefa is not None:
+                xml_pagina = await tarefa
+                
+                proxima = proxima_pagina(xml_pagina)
+                tarefa = None
+                limite_atingido = False
+                if proxima is not None and proxima > pagina:
+                    if proxima > self.max_paginas:
+                        limite_atingido = True
+                    else:
+                        pagina = proxima
+                        tarefa = self._criar_tarefa(self.consultar_nfse_periodo(data_inicio, data_fim, pagina))
+                
+                yield xml_pagina
+                
+                if limite_atingido:
+                    raise LimitePaginasError(
+                        f"Limite de {self.max_paginas} páginas atingido em {data_inicio} a {data_fim}"
+                    )
+        finally:
+            if tarefa is not None and not tarefa.done():
+                tarefa.cancel()
+    
+    async def consultar_paginas(self, data_inicio: str, data_fim: str) -> list:
+        """Todas as páginas de um período"""
+        return [xml_pagina async for xml_pagina in self.iterar_paginas(data_inicio, data_fim)]
+    
+    async def consultar_periodos(self, periodos) -> list:
+        """
+        Consulta vários períodos em paralelo (limitado por max_concorrencia)
+        
+        Args:
+            periodos: Lista de tuplas (data_inicio, data_fim) em YYYY-MM-DD
+            
+        Returns:
+            Por período, na ordem de entrada: lista de páginas XML ou a exceção ocorrida
+        """
+        tarefas = [self._criar_tarefa(self.consultar_paginas(inicio, fim)) for inicio, fim in periodos]
+        return await asyncio.gather(*tarefas, return_exceptions=True)
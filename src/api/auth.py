@@ -1,23 +1,195 @@
 """Autenticação com certificado digital"""
 
+import os
+import ssl
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
 from cryptography import x509
 from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.serialization import pkcs12
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Aviso de vencimento próximo (dias)
+DIAS_AVISO_VENCIMENTO = 30
 
-def carregar_certificado(caminho: str, senha: str):
+# tmpfs: PEM com chave privada nunca chega ao disco quando disponível
+DIRETORIO_TMPFS = '/dev/shm'
+
+_cache_certificados = {}
+_cache_lock = threading.Lock()
+
+
+class CertificadoExpiradoError(Exception):
+    """Certificado digital fora do período de validade"""
+
+
+class CertificadoDigital:
+    """Certificado A1 decifrado (chave, certificado e cadeia)"""
+    
+    def __init__(self, chave_privada, certificado, cadeia=()):
+        self.chave_privada = chave_privada
+        self.certificado = certificado
+        self.cadeia = list(cadeia)
+    
+    @property
+    def titular(self) -> str:
+        return self.certificado.subject.rfc4514_string()
+    
+    @property
+    def not_valid_before(self) -> datetime:
+        return self.certificado.not_valid_before
+    
+    @property
+    def not_valid_after(self) -> datetime:
+        return self.certificado.not_valid_after
+    
+    def dias_restantes(self, agora: datetime = None) -> float:
+        """Dias até o vencimento (negativo se já venceu)"""
+        agora = agora or datetime.utcnow()
+        return (self.not_valid_after - agora).total_seconds() / 86400
+    
+    def verificar_validade(self, agora: datetime = None):
+        """
+        Falha imediatamente se o certificado estiver fora da validade
+        
+        Raises:
+            CertificadoExpiradoError: Certificado vencido ou ainda não válido
+        """
+        agora = agora or datetime.utcnow()
+        if agora < self.not_valid_before:
+            raise CertificadoExpiradoError(
+                f"Certificado {self.titular} válido somente a partir de {self.not_valid_before:%Y-%m-%d %H:%M} UTC"
+            )
+        if agora > self.not_valid_after:
+            raise CertificadoExpiradoError(
+                f"Certificado {self.titular} venceu em {self.not_valid_after:%Y-%m-%d %H:%M} UTC"
+            )
+    
+    def para_pem(self) -> bytes:
+        """Chave (PKCS#8, sem senha) seguida dos certificados, em PEM"""
+        return certificado_para_pem(self.chave_privada, self.certificado, self.cadeia)
+
+
+def carregar_certificado(caminho: str, senha: str, verificar_validade: bool = True) -> CertificadoDigital:
     """
     Carrega certificado digital .pfx
     
+    O .pfx é decifrado uma vez por processo; chamadas seguintes com o
+    mesmo arquivo (e mesma data de modificação) reutilizam o resultado.
+    
     Args:
         caminho: Caminho do arquivo .pfx
         senha: Senha do certificado
+        verificar_validade: Falhar se o certificado estiver vencido
         
     Returns:
-        Certificado carregado
+        CertificadoDigital decifrado
+        
+    Raises:
+        CertificadoExpiradoError: Certificado vencido (se verificar_validade)
+    """
+    caminho_absoluto = os.path.abspath(caminho)
+    chave_cache = (caminho_absoluto, os.stat(caminho_absoluto).st_mtime_ns, senha)
+    
+    with _cache_lock:
+        certificado = _cache_certificados.get(chave_cache)
+        if certificado is None:
+            logger.info(f"Carregando certificado de {caminho}")
+            with open(caminho_absoluto, 'rb') as f:
+                dados = f.read()
+            
+            chave_privada, cert, cadeia = pkcs12.load_key_and_certificates(
+                dados,
+                senha.encode() if senha else None,
+                default_backend()
+            )
+            certificado = CertificadoDigital(chave_privada, cert, cadeia or [])
+            _cache_certificados[chave_cache] = certificado
+            
+            logger.info(
+                f"Certificado {certificado.titular} válido até "
+                f"{certificado.not_valid_after:%Y-%m-%d} ({certificado.dias_restantes():.0f} dias)"
+            )
+            if 0 <= certificado.dias_restantes() < DIAS_AVISO_VENCIMENTO:
+                logger.warning(f"Certificado digital vence em {certificado.dias_restantes():.0f} dias")
+    
+    if verificar_validade:
+        certificado.verificar_validade()
+    return certificado
+
+
+def limpar_cache_certificados():
+    """Descarta certificados decifrados em memória"""
+    with _cache_lock:
+        _cache_certificados.clear()
+
+
+def certificado_para_pem(chave_privada, certificado, cadeia=()) -> bytes:
     """
-    # TODO: Implementar carregamento de certificado
-    logger.info(f"Carregando certificado de {caminho}")
-    pass
+    Serializa chave e certificados em um único bloco PEM
+    
+    Args:
+        chave_privada: Chave privada do certificado
+        certificado: Certificado x509
+        cadeia: Certificados intermediários
+        
+    Returns:
+        Chave (PKCS#8, sem senha) seguida dos certificados, em PEM
+    """
+    pem = chave_privada.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    )
+    for cert in (certificado, *cadeia):
+        pem += cert.public_bytes(serialization.Encoding.PEM)
+    return pem
+
+
+@contextmanager
+def arquivo_pem_temporario(certificado: CertificadoDigital):
+    """
+    Materializa o PEM para bibliotecas que exigem caminho de arquivo
+    
+    O arquivo é criado com permissão 0600, em tmpfs quando disponível,
+    e removido ao sair do bloco.
+    
+    Args:
+        certificado: Certificado decifrado
+        
+    Yields:
+        Caminho do arquivo PEM (chave + certificados)
+    """
+    diretorio = DIRETORIO_TMPFS if os.path.isdir(DIRETORIO_TMPFS) else None
+    fd, caminho_pem = tempfile.mkstemp(suffix='.pem', dir=diretorio)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(certificado.para_pem())
+        yield caminho_pem
+    finally:
+        os.unlink(caminho_pem)
+
+
+def criar_contexto_ssl(certificado: CertificadoDigital, ca_bundle: str = None) -> ssl.SSLContext:
+    """
+    Cria contexto TLS mútuo com o certificado já decifrado
+    
+    Args:
+        certificado: Certificado decifrado
+        ca_bundle: CAs aceitas para o servidor (padrão: CAs do sistema)
+        
+    Returns:
+        SSLContext reutilizável por todas as conexões do processo
+    """
+    contexto = ssl.create_default_context(cafile=ca_bundle)
+    
+    # load_cert_chain só aceita caminho de arquivo; o PEM é lido uma vez e removido
+    with arquivo_pem_temporario(certificado) as caminho_pem:
+        contexto.load_cert_chain(caminho_pem)
+    
+    return contexto
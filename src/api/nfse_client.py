@@ -1,11 +1,179 @@
 """Cliente API NFSe Campinas - ABRASF 2.03"""
 
-from zeep import Client
+import gzip
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from zeep import Client, Settings
+from zeep.cache import SqliteCache
+from zeep.transports import Transport
 from zeep.wsse.signature import Signature
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
 import logging
 
+from src.api.auth import carregar_certificado, criar_contexto_ssl
+from src.api.throttling import (
+    SqliteTokenBucket, CircuitBreaker, RetryPolicy, RespostaRetentavelError,
+    STATUS_RETENTAVEIS, retry_after_segundos
+)
+
 logger = logging.getLogger(__name__)
 
+NAMESPACE_NFSE = 'http://www.betha.com.br/e-nota-contribuinte-ws'
+
+HEADERS_CONSULTA = {
+    'Content-Type': 'text/xml; charset=utf-8',
+    'SOAPAction': 'ConsultarNfse'
+}
+
+_RE_PROXIMA_PAGINA = re.compile(r'<(?:\w+:)?ProximaPagina>\s*(\d+)\s*<')
+_RE_PROXIMA_PAGINA_BYTES = re.compile(_RE_PROXIMA_PAGINA.pattern.encode())
+
+# Leitura do corpo em modo stream
+TAMANHO_BLOCO = 64 * 1024
+
+
+def url_webservice(nfse: dict) -> str:
+    """URL do webservice: nfse.endpoint ou o WSDL do ambiente configurado"""
+    url = nfse.get('endpoint')
+    if not url:
+        ambiente = nfse.get('ambiente', 'homologacao')
+        url = nfse[f'wsdl_url_{ambiente}']
+    return url
+
+
+def montar_envelope_consulta(cliente: dict, data_inicio: str, data_fim: str, pagina: int = 1) -> str:
+    """
+    Monta envelope SOAP do ConsultarNfseEnvio
+    
+    Args:
+        cliente: Seção cliente do config (cnpj, inscricao_municipal)
+        data_inicio: Data início (YYYY-MM-DD)
+        data_fim: Data fim (YYYY-MM-DD)
+        pagina: Página da consulta (ABRASF 2.03)
+        
+    Returns:
+        Envelope SOAP
+    """
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+    <soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"
+                   xmlns:nfse="{NAMESPACE_NFSE}">
+        <soap:Header/>
+        <soap:Body>
+            <nfse:ConsultarNfseEnvio>
+                <ConsultarNfseEnvio xmlns="{NAMESPACE_NFSE}">
+                    <Prestador>
+                        <CpfCnpj>
+                            <Cnpj>{cliente['cnpj']}</Cnpj>
+                        </CpfCnpj>
+                        <InscricaoMunicipal>{cliente['inscricao_municipal']}</InscricaoMunicipal>
+                    </Prestador>
+                    <PeriodoEmissao>
+                        <DataInicial>{data_inicio}</DataInicial>
+                        <DataFinal>{data_fim}</DataFinal>
+                    </PeriodoEmissao>
+                    <Pagina>{pagina}</Pagina>
+                </ConsultarNfseEnvio>
+            </nfse:ConsultarNfseEnvio>
+        </soap:Body>
+    </soap:Envelope>"""
+
+
+def proxima_pagina(xml_pagina: str):
+    """Número da próxima página informado na resposta, ou None se for a última"""
+    match = _RE_PROXIMA_PAGINA.search(xml_pagina)
+    return int(match.group(1)) if match else None
+
+
+class LimitePaginasError(RuntimeError):
+    """Consulta com mais páginas que o limite configurado"""
+
+
+class RespostaNfse:
+    """
+    Corpo de uma resposta do webservice, em arquivo temporário
+    
+    Os bytes ficam exatamente como chegaram (gzip inclusive) num
+    SpooledTemporaryFile: em memória até o limite e em disco acima dele.
+    abrir() entrega o XML descomprimido sob demanda para o parser e bruto()
+    entrega os mesmos bytes para arquivamento, sem cópia intermediária.
+    """
+    
+    def __init__(self, arquivo, comprimido: bool = False):
+        """
+        Args:
+            arquivo: Arquivo binário com o corpo, posicionado no fim
+            comprimido: Corpo em gzip (Content-Encoding: gzip)
+        """
+        self.arquivo = arquivo
+        self.comprimido = comprimido
+        self.tamanho = arquivo.tell()
+    
+    def abrir(self):
+        """Arquivo somente leitura com o XML (descomprimido), do início"""
+        self.arquivo.seek(0)
+        if self.comprimido:
+            return gzip.GzipFile(fileobj=self.arquivo, mode='rb')
+        return self.arquivo
+    
+    def bruto(self):
+        """Arquivo com os bytes recebidos, do início (para arquivamento)"""
+        self.arquivo.seek(0)
+        return self.arquivo
+    
+    def ler(self) -> bytes:
+        """XML completo em memória (evitar em respostas grandes)"""
+        return self.abrir().read()
+    
+    def salvar(self, caminho: str):
+        """Grava os bytes recebidos em caminho (.gz quando comprimido)"""
+        with open(caminho, 'wb') as destino:
+            shutil.copyfileobj(self.bruto(), destino, TAMANHO_BLOCO)
+    
+    def proxima_pagina(self):
+        """Número da próxima página, lido em blocos sem carregar o XML inteiro"""
+        xml = self.abrir()
+        resto = b''
+        while True:
+            bloco = xml.read(TAMANHO_BLOCO)
+            if not bloco:
+                return None
+            trecho = resto + bloco
+            match = _RE_PROXIMA_PAGINA_BYTES.search(trecho)
+            if match:
+                return int(match.group(1))
+            # Sobreposição cobre a tag partida entre dois blocos
+            resto = trecho[-64:]
+    
+    def fechar(self):
+        self.arquivo.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+class AdaptadorTLS(HTTPAdapter):
+    """HTTPAdapter que reutiliza um SSLContext com certificado cliente"""
+    
+    def __init__(self, contexto_ssl=None, **kwargs):
+        self.contexto_ssl = contexto_ssl
+        super().__init__(**kwargs)
+    
+    def init_poolmanager(self, *args, **kwargs):
+        if self.contexto_ssl is not None:
+            kwargs['ssl_context'] = self.contexto_ssl
+        return super().init_poolmanager(*args, **kwargs)
+
 
 class NfseClient:
     """Cliente para WebService NFSe Campinas"""
@@ -14,25 +182,317 @@ class NfseClient:
         """
         Inicializa cliente SOAP
         
+        O certificado é decifrado uma única vez e as conexões TLS ficam
+        abertas (keep-alive) entre consultas.
+        
         Args:
-            config: Dicionário com configurações
+            config: Dicionário com configurações (formato do config.yaml)
         """
         self.config = config
-        # TODO: Implementar inicialização do cliente Zeep
-        # TODO: Configurar certificado digital
-        pass
+        nfse = config['nfse']
+        
+        url = url_webservice(nfse)
+        self.endpoint = url.split('?')[0]
+        self.wsdl_url = nfse.get('wsdl_local') or (url if '?' in url else f'{url}?wsdl')
+        self.timeout = nfse.get('timeout', 30)
+        self.max_paginas = nfse.get('max_paginas', 1000)
+        # Respostas em stream ficam em memória até este tamanho, depois em disco
+        self.spool_max_bytes = int(nfse.get('resposta_spool_mb', 8) * 1024 * 1024)
+        
+        self.certificado = None
+        if nfse.get('certificado_path'):
+            self.certificado = carregar_certificado(nfse['certificado_path'], nfse.get('certificado_senha'))
+        
+        self.session = self._criar_sessao()
+        
+        # Vazão: token bucket (opcional, compartilhável via arquivo), retry e circuit breaker
+        self.limitador = None
+        if nfse.get('limite_requisicoes_segundo'):
+            self.limitador = SqliteTokenBucket(
+                nfse.get('limite_estado') or ':memory:',
+                taxa=nfse['limite_requisicoes_segundo'],
+                capacidade=nfse.get('limite_rajada', nfse['limite_requisicoes_segundo']),
+                chave=urlparse(self.endpoint).netloc or 'nfse'
+            )
+        self.circuito = CircuitBreaker(nfse.get('circuito_falhas', 5), nfse.get('circuito_pausa_segundos', 60))
+        self.retry = RetryPolicy(
+            nfse.get('retry_tentativas', 3),
+            base_segundos=nfse.get('retry_base_segundos', 1.0),
+            maximo_segundos=nfse.get('retry_maximo_segundos', 30.0)
+        )
+        
+        # Cliente Zeep (WSDL + XSDs) só é montado quando uma operação é usada
+        self._soap = None
+        self._soap_lock = threading.Lock()
+        self._operacoes = {}
+    
+    def _criar_sessao(self) -> requests.Session:
+        """Cria sessão HTTP com pool de conexões e TLS mútuo"""
+        nfse = self.config['nfse']
+        
+        contexto_ssl = None
+        if self.certificado is not None:
+            contexto_ssl = criar_contexto_ssl(self.certificado, nfse.get('ca_bundle'))
+        
+        pool = {
+            'pool_connections': nfse.get('pool_conexoes', 4),
+            'pool_maxsize': nfse.get('pool_max', 10),
+        }
+        
+        session = requests.Session()
+        session.mount('https://', AdaptadorTLS(contexto_ssl, **pool))
+        session.mount('http://', HTTPAdapter(**pool))
+        if nfse.get('ca_bundle'):
+            session.verify = nfse['ca_bundle']
+        session.headers.update(HEADERS_CONSULTA)
+        return session
     
-    def consultar_nfse_periodo(self, data_inicio: str, data_fim: str):
+    @property
+    def soap(self) -> Client:
+        """Cliente Zeep, construído no primeiro uso"""
+        with self._soap_lock:
+            if self._soap is None:
+                self._soap = self._criar_cliente_soap()
+        return self._soap
+    
+    def _criar_cliente_soap(self) -> Client:
+        """
+        Carrega o WSDL e os XSDs importados
+        
+        Com nfse.wsdl_cache, os documentos ficam em SQLite local por
+        nfse.wsdl_cache_ttl_horas e a inicialização dispensa a rede.
+        Com nfse.wsdl_local, usa uma cópia do WSDL versionada no repositório.
+        """
+        nfse = self.config['nfse']
+        
+        cache = None
+        if nfse.get('wsdl_cache'):
+            os.makedirs(os.path.dirname(nfse['wsdl_cache']) or '.', exist_ok=True)
+            cache = SqliteCache(path=nfse['wsdl_cache'], timeout=int(nfse.get('wsdl_cache_ttl_horas', 24) * 3600))
+        
+        inicio = time.perf_counter()
+        client = Client(
+            self.wsdl_url,
+            transport=Transport(cache=cache, timeout=self.timeout, session=self.session),
+            settings=Settings(strict=False, xml_huge_tree=True)
+        )
+        logger.info(f"WSDL carregado em {time.perf_counter() - inicio:.2f}s ({self.wsdl_url})")
+        return client
+    
+    def operacao(self, nome: str):
+        """
+        Operação SOAP do WSDL, resolvida no primeiro uso
+        
+        Args:
+            nome: Nome da operação (ex.: ConsultarNfseServicoPrestado)
+        """
+        if nome not in self._operacoes:
+            self._operacoes[nome] = self.soap.service[nome]
+        return self._operacoes[nome]
+    
+    def verificar_certificado(self):
+        """
+        Falha imediatamente se o certificado venceu durante a execução
+        
+        Raises:
+            CertificadoExpiradoError: Certificado fora da validade
+        """
+        if self.certificado is not None:
+            self.certificado.verificar_validade()
+    
+    def montar_envelope_consulta(self, data_inicio: str, data_fim: str, pagina: int = 1) -> str:
+        """Monta envelope SOAP do ConsultarNfseEnvio para o cliente configurado"""
+        return montar_envelope_consulta(self.config['cliente'], data_inicio, data_fim, pagina)
+    
+    def consultar_nfse_periodo(self, data_inicio: str, data_fim: str, pagina: int = 1):
         """
         Consulta NFSe por período
         
         Args:
             data_inicio: Data início (YYYY-MM-DD)
             data_fim: Data fim (YYYY-MM-DD)
+            pagina: Página da consulta
             
         Returns:
             XML com as NFSe encontradas
+            
+        Raises:
+            CircuitoAbertoError: Webservice suspenso após falhas seguidas
+            RuntimeError: Resposta HTTP de erro (após esgotar as tentativas em 429/5xx)
         """
-        # TODO: Implementar consulta
-        logger.info(f"Consultando NFSe de {data_inicio} até {data_fim}")
-        pass
+        logger.info(f"Consultando NFSe de {data_inicio} até {data_fim} (página {pagina})")
+        self.verificar_certificado()
+        envelope = self.montar_envelope_consulta(data_inicio, data_fim, pagina)
+        
+        return self.retry.executar(
+            lambda: self._enviar(envelope),
+            descricao=f"consulta {data_inicio} a {data_fim} (página {pagina})"
+        )
+    
+    def baixar_nfse_periodo(self, data_inicio: str, data_fim: str, pagina: int = 1) -> RespostaNfse:
+        """
+        Consulta NFSe por período em modo stream
+        
+        O corpo não é decodificado para str: os bytes recebidos (gzip, se o
+        servidor comprimir) vão direto para um arquivo temporário.
+        
+        Args:
+            data_inicio: Data início (YYYY-MM-DD)
+            data_fim: Data fim (YYYY-MM-DD)
+            pagina: Página da consulta
+            
+        Returns:
+            RespostaNfse (fechar após o uso)
+        """
+        logger.info(f"Consultando NFSe de {data_inicio} até {data_fim} (página {pagina}, stream)")
+        self.verificar_certificado()
+        envelope = self.montar_envelope_consulta(data_inicio, data_fim, pagina)
+        
+        return self.retry.executar(
+            lambda: self._enviar(envelope, stream=True),
+            descricao=f"consulta {data_inicio} a {data_fim} (página {pagina})"
+        )
+    
+    def _enviar(self, envelope: str, stream: bool = False):
+        """Uma tentativa de POST, passando pelo circuito e pelo limitador"""
+        self.circuito.permitir()
+        if self.limitador is not None:
+            self.limitador.adquirir()
+        
+        try:
+            response = self.session.post(
+                self.endpoint, data=envelope.encode('utf-8'), timeout=self.timeout, stream=stream
+            )
+        except requests.ConnectTimeout:
+            # Servidor não atendeu a conexão: falha do webservice, não janela densa
+            self.circuito.registrar_falha()
+            raise
+        except requests.Timeout:
+            self.circuito.liberar_teste()
+            raise
+        except requests.ConnectionError:
+            self.circuito.registrar_falha()
+            raise
+        
+        if response.status_code in STATUS_RETENTAVEIS:
+            self.circuito.registrar_falha()
+            raise RespostaRetentavelError(
+                response.status_code, response.text,
+                retry_after_segundos(response.headers.get('Retry-After'))
+            )
+        
+        self.circuito.registrar_sucesso()
+        if response.status_code != 200:
+            raise RuntimeError(f"Erro na consulta NFSe: {response.status_code} - {response.text}")
+        
+        if stream:
+            return self._gravar_corpo(response)
+        return response.text
+    
+    def _gravar_corpo(self, response) -> RespostaNfse:
+        """Copia o corpo da resposta, sem decodificar, para um arquivo temporário"""
+        comprimido = response.headers.get('Content-Encoding', '').lower() == 'gzip'
+        arquivo = tempfile.SpooledTemporaryFile(max_size=self.spool_max_bytes)
+        try:
+            # gzip fica comprimido; outras codificações são decodificadas pelo urllib3
+            for bloco in response.raw.stream(TAMANHO_BLOCO, decode_content=not comprimido):
+                arquivo.write(bloco)
+        except ReadTimeoutError as e:
+            arquivo.close()
+            raise requests.ReadTimeout(e)
+        except ProtocolError as e:
+            arquivo.close()
+            raise requests.ConnectionError(e)
+        finally:
+            response.close()
+        
+        return RespostaNfse(arquivo, comprimido)
+    
+    def metricas(self) -> dict:
+        """Estado do limitador, do circuit breaker e das novas tentativas"""
+        return {
+            'limitador': self.limitador.metricas() if self.limitador is not None else None,
+            'circuito': self.circuito.metricas(),
+            'retry': self.retry.metricas()
+        }
+    
+    def iterar_paginas(self, data_inicio: str, data_fim: str, stream: bool = False):
+        """
+        Consulta NFSe por período, página a página
+        
+        A página N+1 é requisitada em segundo plano assim que a página N
+        chega, sobrepondo a espera de rede com o parse feito pelo chamador.
+        
+        Args:
+            data_inicio: Data início (YYYY-MM-DD)
+            data_fim: Data fim (YYYY-MM-DD)
+            stream: Gerar RespostaNfse em vez de str; cada resposta é
+                fechada quando o chamador avança para a próxima
+            
+        Yields:
+            XML (ou RespostaNfse) de cada página, em ordem
+            
+        Raises:
+            LimitePaginasError: Após a última página permitida por max_paginas
+        """
+        consultar = self.baixar_nfse_periodo if stream else self.consultar_nfse_periodo
+        
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='nfse-pagina') as executor:
+            pagina = 1
+            futuro = executor.submit(consultar, data_inicio, data_fim, pagina)
+            
+            try:
+                while futuro is not None:
+                    xml_pagina = futuro.result()
+                    
+                    proxima = xml_pagina.proxima_pagina() if stream else self.proxima_pagina(xml_pagina)
+                    futuro = None
+                    limite_atingido = False
+                    if proxima is not None and proxima > pagina:
+                        if proxima > self.max_paginas:
+                            limite_atingido = True
+                        else:
+                            pagina = proxima
+                            futuro = executor.submit(consultar, data_inicio, data_fim, pagina)
+                    
+                    try:
+                        yield xml_pagina
+                    finally:
+                        if stream:
+                            xml_pagina.fechar()
+                    
+                    if limite_atingido:
+                        raise LimitePaginasError(
+                            f"Limite de {self.max_paginas} páginas atingido em {data_inicio} a {data_fim}"
+                        )
+            finally:
+                # Chamador parou antes (erro, break): página antecipada não fica aberta
+                if futuro is not None:
+                    self._descartar_pagina(futuro, stream)
+    
+    @staticmethod
+    def _descartar_pagina(futuro, stream: bool):
+        """Cancela a página antecipada ou espera por ela e fecha a resposta"""
+        if futuro.cancel():
+            return
+        try:
+            resposta = futuro.result()
+        except Exception as e:
+            logger.debug(f"Página antecipada descartada com erro: {e}")
+            return
+        if stream:
+            resposta.fechar()
+    
+    proxima_pagina = staticmethod(proxima_pagina)
+    
+    def fechar(self):
+        """Encerra as conexões do pool"""
+        self.session.close()
+        if self.limitador is not None:
+            self.limitador.fechar()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.fechar()
@@ -0,0 +1,304 @@
+"""Controle de vazão do webservice NFSe: token bucket, retry e circuit breaker"""
+
+import os
+import random
+import sqlite3
+import threading
+import time
+import logging
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Respostas HTTP que indicam sobrecarga/instabilidade passageira do servidor
+STATUS_RETENTAVEIS = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitoAbertoError(RuntimeError):
+    """Webservice falhou repetidamente; consultas suspensas até a pausa acabar"""
+
+
+class RespostaRetentavelError(RuntimeError):
+    """Resposta HTTP de sobrecarga (429/5xx), elegível para nova tentativa"""
+    
+    def __init__(self, status_code: int, texto: str = '', retry_after: float = None):
+        super().__init__(f"Erro na consulta NFSe: {status_code} - {texto[:200]}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class SqliteTokenBucket:
+    """
+    Token bucket compartilhado entre threads e processos
+    
+    O saldo fica numa tabela SQLite atualizada em transação exclusiva
+    (BEGIN IMMEDIATE), então processos diferentes apontando para o mesmo
+    arquivo dividem a mesma vazão. Com ':memory:' o limite vale só para
+    este objeto (threads do processo).
+    """
+    
+    def __init__(self, caminho: str = ':memory:', taxa: float = 5.0, capacidade: float = 10.0,
+                 chave: str = 'nfse'):
+        """
+        Args:
+            caminho: Arquivo SQLite do estado ou ':memory:'
+            taxa: Requisições por segundo sustentadas
+            capacidade: Rajada máxima (tokens acumulados)
+            chave: Identifica o bucket no arquivo (ex.: host do webservice)
+        """
+        self.taxa = float(taxa)
+        self.capacidade = float(capacidade)
+        self.chave = chave
+        self._lock = threading.Lock()
+        
+        if caminho != ':memory:':
+            os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        # Transações controladas manualmente; timeout cobre a disputa entre processos
+        self._conn = sqlite3.connect(caminho, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS token_bucket ("
+            " chave TEXT PRIMARY KEY, tokens REAL NOT NULL, atualizado REAL NOT NULL)"
+        )
+        
+        # Métricas deste processo
+        self.adquiridos = 0
+        self.esperas = 0
+        self.segundos_espera = 0.0
+    
+    def _reservar(self) -> float:
+        """Consome um token se houver; senão, retorna quanto esperar"""
+        agora = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                linha = self._conn.execute(
+                    'SELECT tokens, atualizado FROM token_bucket WHERE chave = ?', (self.chave,)
+                ).fetchone()
+                tokens, atualizado = linha if linha else (self.capacidade, agora)
+                tokens = min(self.capacidade, tokens + max(agora - atualizado, 0.0) * self.taxa)
+                
+                espera = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    espera = (1 - tokens) / self.taxa
+                
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO token_bucket (chave, tokens, atualizado) VALUES (?, ?, ?)',
+                    (self.chave, tokens, agora)
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return espera
+    
+    def adquirir(self):
+        """Bloqueia até haver token disponível"""
+        inicio = time.perf_counter()
+        esperou = False
+        while True:
+            espera = self._reservar()
+            if espera <= 0:
+                break
+            esperou = True
+            time.sleep(espera)
+        
+        with self._lock:
+            self.adquiridos += 1
+            if esperou:
+                self.esperas += 1
+                self.segundos_espera += time.perf_counter() - inicio
+    
+    def tokens_disponiveis(self) -> float:
+        """Saldo atual do bucket (compartilhado)"""
+        with self._lock:
+            linha = self._conn.execute(
+                'SELECT tokens, atualizado FROM token_bucket WHERE chave = ?', (self.chave,)
+            ).fetchone()
+        if linha is None:
+            return self.capacidade
+        return min(self.capacidade, linha[0] + max(time.time() - linha[1], 0.0) * self.taxa)
+    
+    def metricas(self) -> dict:
+        """Estado do limitador"""
+        return {
+            'taxa_por_segundo': self.taxa,
+            'capacidade': self.capacidade,
+            'tokens_disponiveis': round(self.tokens_disponiveis(), 2),
+            'adquiridos': self.adquiridos,
+            'esperas': self.esperas,
+            'segundos_espera': round(self.segundos_espera, 3)
+        }
+    
+    def fechar(self):
+        """Fecha a conexão SQLite"""
+        self._conn.close()
+
+
+class CircuitBreaker:
+    """
+    Suspende consultas após falhas consecutivas
+    
+    fechado -> aberto após limiar_falhas falhas seguidas; aberto -> meio_aberto
+    após pausa_segundos, quando uma única consulta de teste é liberada;
+    sucesso fecha o circuito, falha reabre.
+    """
+    
+    FECHADO = 'fechado'
+    ABERTO = 'aberto'
+    MEIO_ABERTO = 'meio_aberto'
+    
+    def __init__(self, limiar_falhas: int = 5, pausa_segundos: float = 60.0):
+        self.limiar_falhas = limiar_falhas
+        self.pausa_segundos = pausa_segundos
+        self._lock = threading.Lock()
+        self._estado = self.FECHADO
+        self._falhas_seguidas = 0
+        self._aberto_em = 0.0
+        self._teste_em_voo = False
+        self.aberturas = 0
+        self.rejeitadas = 0
+    
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            if self._estado == self.ABERTO and time.monotonic() - self._aberto_em >= self.pausa_segundos:
+                return self.MEIO_ABERTO
+            return self._estado
+    
+    def permitir(self):
+        """
+        Libera uma consulta ou falha imediatamente
+        
+        Raises:
+            CircuitoAbertoError: Circuito aberto (ou teste meio-aberto já em andamento)
+        """
+        with self._lock:
+            if self._estado == self.ABERTO:
+                restante = self.pausa_segundos - (time.monotonic() - self._aberto_em)
+                if restante > 0:
+                    self.rejeitadas += 1
+                    raise CircuitoAbertoError(f"Webservice NFSe suspenso por mais {restante:.0f}s")
+                self._estado = self.MEIO_ABERTO
+                self._teste_em_voo = False
+            
+            if self._estado == self.MEIO_ABERTO:
+                if self._teste_em_voo:
+                    self.rejeitadas += 1
+                    raise CircuitoAbertoError("Webservice NFSe em teste após falhas; aguardando resultado")
+                self._teste_em_voo = True
+    
+    def registrar_sucesso(self):
+        with self._lock:
+            if self._estado != self.FECHADO:
+                logger.info("Circuito do webservice NFSe fechado")
+            self._estado = self.FECHADO
+            self._falhas_seguidas = 0
+            self._teste_em_voo = False
+    
+    def liberar_teste(self):
+        """Consulta sem veredito sobre o servidor (ex.: timeout de janela densa)"""
+        with self._lock:
+            self._teste_em_voo = False
+    
+    def registrar_falha(self):
+        with self._lock:
+            self._falhas_seguidas += 1
+            if self._estado == self.MEIO_ABERTO or self._falhas_seguidas >= self.limiar_falhas:
+                if self._estado != self.ABERTO:
+                    self.aberturas += 1
+                    logger.warning(
+                        f"Circuito do webservice NFSe aberto após {self._falhas_seguidas} falhas "
+                        f"(pausa de {self.pausa_segundos:.0f}s)"
+                    )
+                self._estado = self.ABERTO
+                self._aberto_em = time.monotonic()
+                self._teste_em_voo = False
+    
+    def metricas(self) -> dict:
+        """Estado do circuito"""
+        return {
+            'estado': self.estado,
+            'falhas_seguidas': self._falhas_seguidas,
+            'aberturas': self.aberturas,
+            'rejeitadas': self.rejeitadas
+        }
+
+
+class RetryPolicy:
+    """
+    Backoff exponencial com jitter completo
+    
+    Tenta de novo erros de conexão (inclusive timeout de conexão) e
+    respostas 429/5xx. Timeout de leitura não é repetido: janela densa
+    demais é dividida por quem chamou.
+    """
+    
+    def __init__(self, tentativas: int = 3, base_segundos: float = 1.0, maximo_segundos: float = 30.0):
+        """
+        Args:
+            tentativas: Total de tentativas (1 = sem retry)
+            base_segundos: Teto da primeira espera
+            maximo_segundos: Teto de qualquer espera
+        """
+        self.tentativas = max(1, int(tentativas))
+        self.base_segundos = base_segundos
+        self.maximo_segundos = maximo_segundos
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.esgotadas = 0
+    
+    @staticmethod
+    def retentavel(erro: Exception) -> bool:
+        if isinstance(erro, requests.Timeout) and not isinstance(erro, requests.ConnectTimeout):
+            return False
+        return isinstance(erro, (RespostaRetentavelError, requests.ConnectionError))
+    
+    def espera(self, tentativa: int, erro: Exception = None) -> float:
+        """Segundos antes da próxima tentativa (tentativa começa em 1)"""
+        teto = min(self.maximo_segundos, self.base_segundos * 2 ** (tentativa - 1))
+        espera = random.uniform(0, teto)
+        # Retry-After do servidor é respeitado como piso
+        retry_after = getattr(erro, 'retry_after', None)
+        if retry_after:
+            espera = max(espera, min(retry_after, self.maximo_segundos))
+        return espera
+    
+    def executar(self, funcao, descricao: str = 'consulta'):
+        """
+        Executa funcao() com novas tentativas nos erros passageiros
+        
+        Returns:
+            Retorno de funcao()
+        """
+        for tentativa in range(1, self.tentativas + 1):
+            try:
+                return funcao()
+            except Exception as e:
+                if not self.retentavel(e):
+                    raise
+                if tentativa == self.tentativas:
+                    with self._lock:
+                        self.esgotadas += 1
+                    raise
+                espera = self.espera(tentativa, e)
+                with self._lock:
+                    self.retries += 1
+                logger.warning(
+                    f"Falha na {descricao} (tentativa {tentativa}/{self.tentativas}): {e} - "
+                    f"nova tentativa em {espera:.1f}s"
+                )
+                time.sleep(espera)
+    
+    def metricas(self) -> dict:
+        return {'tentativas': self.tentativas, 'retries': self.retries, 'esgotadas': self.esgotadas}
+
+
+def retry_after_segundos(valor) -> float:
+    """Converte o cabeçalho Retry-After (segundos) em float; datas HTTP são ignoradas"""
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
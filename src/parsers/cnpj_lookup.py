@@ -0,0 +1,371 @@
+"""Situação cadastral de CNPJs: cache SQLite local e consulta remota em lote"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.api.throttling import (
+    STATUS_RETENTAVEIS, RespostaRetentavelError, RetryPolicy, SqliteTokenBucket, retry_after_segundos
+)
+from src.parsers.validators import validar_cnpj_lote
+
+logger = logging.getLogger(__name__)
+
+# Validade do cache por situação, em dias: situações definitivas duram mais
+TTL_DIAS_PADRAO = {
+    'ATIVA': 30,
+    'SUSPENSA': 7,
+    'INAPTA': 7,
+    'BAIXADA': 365,
+    'NULA': 365,
+    'NAO_ENCONTRADO': 1,
+}
+TTL_DIAS_OUTRAS = 7
+
+# Resultados gravados no cache por transação durante um lote
+GRAVAR_CADA = 100
+
+# CNPJs por SELECT ... IN (limite de variáveis do SQLite)
+_CONSULTA_CACHE_MAXIMO = 500
+
+_SEM_MASCARA = str.maketrans('', '', './- ')
+
+
+def normalizar_cnpj(cnpj) -> str:
+    """CNPJ sem máscara e em maiúsculas (chave do cache)"""
+    return str(cnpj).translate(_SEM_MASCARA).strip().upper()
+
+
+def normalizar_situacao(texto) -> str:
+    """'Baixada' / 'BAIXADA' / 'Não encontrado' -> 'BAIXADA' / 'NAO_ENCONTRADO'"""
+    sem_acento = unicodedata.normalize('NFD', str(texto or '')).encode('ascii', 'ignore').decode()
+    return '_'.join(sem_acento.upper().split()) or 'DESCONHECIDA'
+
+
+class CnpjBackend:
+    """Interface da fonte remota da situação cadastral"""
+    
+    def consultar(self, cnpj: str) -> dict:
+        """
+        Situação de um CNPJ (já normalizado e com dígitos válidos)
+        
+        Returns:
+            Dicionário com 'situacao' (ex.: 'ATIVA', 'BAIXADA', 'NAO_ENCONTRADO')
+            e, se houver, 'razao_social' e 'data_situacao'
+        
+        Raises:
+            Exception: Falha na consulta (o CNPJ fica fora do cache)
+        """
+        raise NotImplementedError
+
+
+class HttpCnpjBackend(CnpjBackend):
+    """
+    Consulta por HTTP GET a um serviço JSON de CNPJ (padrão: BrasilAPI)
+    
+    A vazão é limitada por um SqliteTokenBucket (compartilhado entre
+    threads e processos) e falhas passageiras passam pelo RetryPolicy.
+    """
+    
+    def __init__(self, url: str = 'https://brasilapi.com.br/api/cnpj/v1/{cnpj}', timeout: float = 15,
+                 limitador: SqliteTokenBucket = None, retry: RetryPolicy = None, pool_conexoes: int = 4):
+        """
+        Args:
+            url: Modelo da URL com {cnpj}
+            timeout: Segundos por requisição
+            limitador: Token bucket das requisições (None: sem limite)
+            retry: Novas tentativas em 429/5xx e erros de conexão
+            pool_conexoes: Conexões mantidas abertas (use o número de workers)
+        """
+        self.url = url
+        self.timeout = timeout
+        self.limitador = limitador
+        self.retry = retry or RetryPolicy()
+        self.session = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=pool_conexoes)
+        self.session.mount('https://', adaptador)
+        self.session.mount('http://', adaptador)
+    
+    def consultar(self, cnpj: str) -> dict:
+        return self.retry.executar(lambda: self._consultar(cnpj), f"consulta do CNPJ {cnpj}")
+    
+    def _consultar(self, cnpj: str) -> dict:
+        if self.limitador is not None:
+            self.limitador.adquirir()
+        resposta = self.session.get(self.url.format(cnpj=cnpj), timeout=self.timeout)
+        if resposta.status_code == 404:
+            return {'situacao': 'NAO_ENCONTRADO'}
+        if resposta.status_code in STATUS_RETENTAVEIS:
+            raise RespostaRetentavelError(
+                resposta.status_code, resposta.text, retry_after_segundos(resposta.headers.get('Retry-After'))
+            )
+        resposta.raise_for_status()
+        
+        dados = resposta.json()
+        return {
+            'situacao': normalizar_situacao(
+                dados.get('descricao_situacao_cadastral') or dados.get('situacao')
+            ),
+            'razao_social': dados.get('razao_social') or dados.get('nome'),
+            'data_situacao': dados.get('data_situacao_cadastral') or dados.get('data_situacao'),
+        }
+
+
+class SqliteCnpjCache:
+    """
+    Cache local da situação cadastral (um arquivo SQLite, seguro entre threads)
+    
+    A validade é calculada na leitura a partir da situação gravada, então
+    mudar os TTLs vale também para o que já está no cache.
+    """
+    
+    def __init__(self, caminho: str = ':memory:', ttl_dias: dict = None, ttl_dias_outras: float = TTL_DIAS_OUTRAS):
+        """
+        Args:
+            caminho: Arquivo SQLite (':memory:' para não persistir)
+            ttl_dias: Dias de validade por situação (sobrepõe TTL_DIAS_PADRAO)
+            ttl_dias_outras: Validade das situações fora de ttl_dias
+        """
+        if caminho != ':memory:':
+            os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        self.ttl_dias = {**TTL_DIAS_PADRAO, **{normalizar_situacao(k): v for k, v in (ttl_dias or {}).items()}}
+        self.ttl_dias_outras = ttl_dias_outras
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cnpj_situacao (
+                cnpj TEXT PRIMARY KEY,
+                situacao TEXT NOT NULL,
+                dados TEXT NOT NULL,
+                consultado_em REAL NOT NULL
+            )
+        """)
+    
+    def validade_segundos(self, situacao: str) -> float:
+        """Tempo em que uma consulta com esta situação continua válida"""
+        return self.ttl_dias.get(situacao, self.ttl_dias_outras) * 86400
+    
+    def obter_varios(self, cnpjs: list, agora: float = None) -> dict:
+        """
+        Entradas ainda válidas do cache
+        
+        Returns:
+            {cnpj: dados da consulta (com 'situacao' e 'consultado_em')}
+        """
+        agora = time.time() if agora is None else agora
+        encontrados = {}
+        for inicio in range(0, len(cnpjs), _CONSULTA_CACHE_MAXIMO):
+            trecho = cnpjs[inicio:inicio + _CONSULTA_CACHE_MAXIMO]
+            with self._lock:
+                linhas = self._conn.execute(
+                    f"SELECT cnpj, situacao, dados, consultado_em FROM cnpj_situacao "
+                    f"WHERE cnpj IN ({','.join('?' * len(trecho))})",
+                    trecho
+                ).fetchall()
+            for cnpj, situacao, dados, consultado_em in linhas:
+                if agora - consultado_em < self.validade_segundos(situacao):
+                    encontrados[cnpj] = {
+                        **json.loads(dados),
+                        'situacao': situacao,
+                        'consultado_em': datetime.fromtimestamp(consultado_em).isoformat(timespec='seconds')
+                    }
+        return encontrados
+    
+    def gravar_varios(self, resultados: dict, agora: float = None):
+        """Grava {cnpj: dados da consulta} numa transação"""
+        if not resultados:
+            return
+        agora = time.time() if agora is None else agora
+        linhas = []
+        for cnpj, dados in resultados.items():
+            extras = {k: v for k, v in dados.items() if k not in ('situacao', 'consultado_em', 'fonte', 'cnpj')}
+            linhas.append((cnpj, dados['situacao'], json.dumps(extras, ensure_ascii=False), agora))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cnpj_situacao (cnpj, situacao, dados, consultado_em) VALUES (?, ?, ?, ?)",
+                linhas
+            )
+    
+    def contar(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cnpj_situacao").fetchone()[0]
+    
+    def fechar(self):
+        self._conn.close()
+
+
+class CnpjStatusLookup:
+    """
+    Situação cadastral de CNPJs em lote: cache local primeiro, remoto só para o que faltar
+    
+    Cada lote é normalizado e deduplicado, CNPJs com dígito verificador
+    inválido são respondidos localmente (validar_cnpj_lote), os válidos
+    são procurados no cache e só os ausentes ou vencidos vão ao backend,
+    em um pool de threads com no máximo 2 * workers consultas pendentes.
+    Consultas com erro não entram no cache.
+    """
+    
+    def __init__(self, backend: CnpjBackend, cache: SqliteCnpjCache = None, workers: int = 4):
+        """
+        Args:
+            backend: Fonte remota (HttpCnpjBackend ou um stub)
+            cache: Cache local (padrão: SQLite em memória)
+            workers: Consultas remotas simultâneas
+        """
+        self.backend = backend
+        self.cache = cache if cache is not None else SqliteCnpjCache()
+        self.workers = max(1, int(workers))
+        self._lock = threading.Lock()
+        
+        self.solicitados = 0
+        self.duplicados = 0
+        self.invalidos = 0
+        self.acertos_cache = 0
+        self.consultas_remotas = 0
+        self.erros = 0
+    
+    def consultar(self, cnpj: str) -> dict:
+        """
+        Situação de um CNPJ (mesmo formato de consultar_lote)
+        
+        Raises:
+            ValueError: CNPJ ausente ou só com máscara
+        """
+        normalizado = normalizar_cnpj(cnpj) if cnpj is not None else ''
+        if not normalizado:
+            raise ValueError(f"CNPJ vazio: {cnpj!r}")
+        return self.consultar_lote([normalizado])[normalizado]
+    
+    def consultar_lote(self, cnpjs) -> dict:
+        """
+        Situação cadastral de vários CNPJs
+        
+        Args:
+            cnpjs: CNPJs com ou sem máscara (repetidos são consultados uma vez)
+        
+        Returns:
+            {cnpj normalizado: {'cnpj', 'situacao', 'fonte', ...}} na ordem da
+            primeira ocorrência; fonte é 'cache', 'remoto' ou 'local'
+            (situação 'INVALIDO'); falhas vêm com situação 'ERRO' e 'erro'
+        """
+        cnpjs = list(cnpjs)
+        unicos = list(dict.fromkeys(normalizar_cnpj(c) for c in cnpjs if c is not None))
+        resultados = dict.fromkeys(unicos)
+        
+        validos = [cnpj for cnpj, ok in zip(unicos, validar_cnpj_lote(unicos)) if ok]
+        for cnpj in set(unicos).difference(validos):
+            resultados[cnpj] = {'cnpj': cnpj, 'situacao': 'INVALIDO', 'fonte': 'local'}
+        
+        em_cache = self.cache.obter_varios(validos)
+        for cnpj, dados in em_cache.items():
+            resultados[cnpj] = {'cnpj': cnpj, **dados, 'fonte': 'cache'}
+        
+        faltantes = [cnpj for cnpj in validos if cnpj not in em_cache]
+        erros = self._consultar_remoto(faltantes, resultados)
+        
+        with self._lock:
+            self.solicitados += len(cnpjs)
+            self.duplicados += len(cnpjs) - len(unicos)
+            self.invalidos += len(unicos) - len(validos)
+            self.acertos_cache += len(em_cache)
+            self.consultas_remotas += len(faltantes)
+            self.erros += erros
+        
+        logger.info(
+            f"Situação cadastral: {len(cnpjs)} CNPJs, {len(unicos)} distintos, {len(em_cache)} do cache, "
+            f"{len(faltantes)} consultados ({erros} com erro), {len(unicos) - len(validos)} inválidos"
+        )
+        return resultados
+    
+    def _consultar_remoto(self, cnpjs: list, resultados: dict) -> int:
+        """Consulta os CNPJs no pool, gravando no cache a cada GRAVAR_CADA respostas"""
+        if not cnpjs:
+            return 0
+        
+        erros = 0
+        a_gravar = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pendentes = {}
+            fila = deque(cnpjs)
+            while fila or pendentes:
+                while fila and len(pendentes) < self.workers * 2:
+                    cnpj = fila.popleft()
+                    pendentes[executor.submit(self.backend.consultar, cnpj)] = cnpj
+                
+                prontos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    cnpj = pendentes.pop(futuro)
+                    try:
+                        dados = dict(futuro.result())
+                        dados['situacao'] = normalizar_situacao(dados.get('situacao'))
+                    except Exception as e:
+                        erros += 1
+                        logger.warning(f"Falha na consulta do CNPJ {cnpj}: {e}")
+                        resultados[cnpj] = {'cnpj': cnpj, 'situacao': 'ERRO', 'erro': str(e), 'fonte': 'remoto'}
+                        continue
+                    resultados[cnpj] = {
+                        'cnpj': cnpj, **dados,
+                        'consultado_em': datetime.now().isoformat(timespec='seconds'), 'fonte': 'remoto'
+                    }
+                    a_gravar[cnpj] = dados
+                
+                # Gravação parcial: uma interrupção não perde o que já foi consultado
+                if len(a_gravar) >= GRAVAR_CADA:
+                    self.cache.gravar_varios(a_gravar)
+                    a_gravar = {}
+        
+        self.cache.gravar_varios(a_gravar)
+        return erros
+    
+    def metricas(self) -> dict:
+        """Totais acumulados dos lotes consultados"""
+        distintos_validos = self.acertos_cache + self.consultas_remotas
+        return {
+            'solicitados': self.solicitados,
+            'duplicados': self.duplicados,
+            'invalidos': self.invalidos,
+            'acertos_cache': self.acertos_cache,
+            'consultas_remotas': self.consultas_remotas,
+            'erros': self.erros,
+            'taxa_acerto_cache': round(self.acertos_cache / distintos_validos, 3) if distintos_validos else 0.0
+        }
+
+
+def criar_consulta_cnpj(config: dict, backend: CnpjBackend = None) -> CnpjStatusLookup:
+    """
+    Monta a consulta de situação cadastral a partir do config.yaml
+    
+    Args:
+        config: Configuração completa (usa a seção cnpj_situacao)
+        backend: Fonte remota no lugar do HttpCnpjBackend (ex.: stub local)
+    """
+    secao = config.get('cnpj_situacao', {})
+    workers = secao.get('workers', 4)
+    if backend is None:
+        limitador = None
+        if secao.get('limite_requisicoes_segundo'):
+            limitador = SqliteTokenBucket(
+                secao.get('limite_estado', ':memory:'),
+                taxa=secao['limite_requisicoes_segundo'],
+                capacidade=secao.get('limite_rajada', secao['limite_requisicoes_segundo']),
+                chave='cnpj_situacao'
+            )
+        backend = HttpCnpjBackend(
+            url=secao.get('url', 'https://brasilapi.com.br/api/cnpj/v1/{cnpj}'),
+            timeout=secao.get('timeout', 15),
+            limitador=limitador,
+            retry=RetryPolicy(tentativas=secao.get('retry_tentativas', 3)),
+            pool_conexoes=workers
+        )
+    cache = SqliteCnpjCache(secao.get('cache', 'state/cnpj_situacao.sqlite3'), ttl_dias=secao.get('ttl_dias'))
+    return CnpjStatusLookup(backend, cache, workers=workers)
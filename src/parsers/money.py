@@ -0,0 +1,185 @@
+"""Conversão exata de valores monetários do XML (inteiro escalado, Decimal ou float)"""
+
+import re
+from decimal import Decimal
+
+import numpy as np
+
+# Casas decimais por tipo de campo (ABRASF: tsValor com 2, tsAliquota com até 4)
+CASAS_DECIMAIS = {'valor': 2, 'aliquota': 4}
+
+# xs:decimal: 1234.56, -0.5, 12
+_RE_DECIMAL = re.compile(r'([+-]?)(\d*)(?:\.(\d*))?', re.ASCII)
+# Formato brasileiro: 1.234,56 / 1234,56 / 1.234.567
+_RE_BRASILEIRO = re.compile(r'([+-]?)(\d{1,3}(?:\.\d{3})+|\d+)(?:,(\d*))?', re.ASCII)
+
+# Textos que não vão para o float no lote: caracteres que ele aceitaria e o
+# caminho exato rejeita ('1e3', 'nan', '1_000', dígitos não ASCII) e casas
+# além das `casas` do valor, que o float arredondaria em silêncio
+_RE_FORA_DO_FLOAT = re.compile(r'[^0-9+\-. \t\n\r]')
+_CASAS_A_MAIS = r'\.[0-9]{%d}'
+
+# Textos até este tamanho (15 dígitos, sinal e ponto) passam pelo float sem perda
+_MAX_RAPIDO = 17
+
+# Maior inteiro escalado convertido pelo float no lote (15 dígitos, como _MAX_RAPIDO)
+_MAX_ESCALADO = 10 ** 15
+
+
+class ValorMonetarioInvalido(ValueError):
+    """Texto que não representa um valor monetário exato"""
+
+
+def conversor_inteiro(casas: int = 2):
+    """
+    Conversor de texto em inteiro escalado (centavos, com casas=2)
+    
+    Caminho rápido para a forma do XML com exatamente `casas` decimais
+    ('1234.56'): float e arredondamento, exato até 15 dígitos. Demais
+    formas (outras quantidades de casas, '1.234,56', '1.234.567') passam
+    pelo caminho exato com regex; casas além de `casas` só são aceitas
+    se forem zeros (nada é arredondado).
+    
+    Returns:
+        Função texto -> inteiro (None para texto ausente/vazio) que levanta
+        ValorMonetarioInvalido para texto que não é um valor exato
+    """
+    # Constantes como argumentos padrão: variáveis locais no caminho rápido
+    def converter(texto, _ponto=-casas - 1, _escala=10 ** casas, _float=float, _round=round):
+        try:
+            if texto[_ponto] == '.' and len(texto) <= _MAX_RAPIDO and texto.isascii() and '_' not in texto:
+                return _round(_float(texto) * _escala)
+        except (IndexError, TypeError, ValueError):
+            pass
+        return _parse_exato(texto, casas)
+    return converter
+
+
+def conversor_float(casas: int = 2):
+    """
+    Conversor de texto em float validado
+    
+    O float é o mais próximo do valor decimal exato (igual a float() na
+    forma do XML); textos inválidos levantam ValorMonetarioInvalido em vez
+    de virar 0.0.
+    """
+    def converter(texto, _ponto=-casas - 1, _float=float):
+        try:
+            if texto[_ponto] == '.' and texto.isascii() and '_' not in texto:
+                return _float(texto)
+        except (IndexError, TypeError, ValueError):
+            pass
+        inteiro = _parse_exato(texto, casas)
+        return inteiro / 10 ** casas if inteiro is not None else None
+    return converter
+
+
+def conversor_decimal(casas: int = 2):
+    """Conversor de texto em Decimal com `casas` casas decimais"""
+    inteiro = conversor_inteiro(casas)
+    
+    def converter(texto):
+        valor = inteiro(texto)
+        return Decimal(valor).scaleb(-casas) if valor is not None else None
+    return converter
+
+
+# Representação dos valores monetários -> fábrica do conversor
+CONVERSORES_MONETARIOS = {
+    'float': conversor_float,
+    'centavos': conversor_inteiro,
+    'decimal': conversor_decimal,
+}
+
+parse_centavos = conversor_inteiro(2)
+parse_decimal = conversor_decimal(2)
+
+
+def _parse_exato(texto, casas: int):
+    if texto is None:
+        return None
+    limpo = texto.strip()
+    if not limpo:
+        return None
+    
+    match = _RE_DECIMAL.fullmatch(limpo)
+    if match:
+        sinal, inteiro, fracao = match.groups()
+    else:
+        match = _RE_BRASILEIRO.fullmatch(limpo)
+        if match is None:
+            raise ValorMonetarioInvalido(f"Valor monetário inválido: {texto!r}")
+        sinal, inteiro, fracao = match.groups()
+        inteiro = inteiro.replace('.', '')
+    
+    fracao = fracao or ''
+    if not inteiro and not fracao:
+        raise ValorMonetarioInvalido(f"Valor monetário inválido: {texto!r}")
+    if fracao[casas:].strip('0'):
+        raise ValorMonetarioInvalido(f"Valor monetário com mais de {casas} casas decimais: {texto!r}")
+    
+    valor = int(inteiro or '0') * 10 ** casas + int(fracao[:casas].ljust(casas, '0'))
+    return -valor if sinal == '-' else valor
+
+
+def inteiros_em_lote(textos: list, casas: int = 2, bloco: int = 4096):
+    """
+    Converte uma coluna de textos em inteiros escalados (NumPy)
+    
+    Cada bloco é convertido de uma vez pelo NumPy; os textos com casas
+    além de `casas`, mais de 15 dígitos ou algo além de dígitos, sinal e
+    ponto (formato brasileiro, '1e3', 'nan'), vazios e ausentes passam
+    pelo caminho exato, um a um, com as mesmas regras de parse_centavos.
+    
+    Args:
+        textos: Valores como no XML (None para ausente)
+        casas: Casas decimais dos inteiros
+        bloco: Valores por conversão vetorizada (um texto inválido só
+            faz o próprio bloco cair para o caminho exato)
+    
+    Returns:
+        (inteiros int64, nulos bool, índices dos textos inválidos);
+        inválidos também ficam marcados como nulos
+    """
+    total = len(textos)
+    inteiros = np.zeros(total, dtype=np.int64)
+    nulos = np.zeros(total, dtype=bool)
+    invalidos = []
+    escala = 10 ** casas
+    casas_a_mais = re.compile(_CASAS_A_MAIS % (casas + 1))
+    
+    def fora_do_float(texto):
+        return _RE_FORA_DO_FLOAT.search(texto) or casas_a_mais.search(texto)
+    
+    for inicio in range(0, total, bloco):
+        trecho = textos[inicio:inicio + bloco]
+        try:
+            # Bloco inteiro verificado de uma vez; se algo escapar, só esses textos saem do float
+            if fora_do_float('\n'.join(filter(None, trecho))):
+                trecho_float = [None if t and fora_do_float(t) else t for t in trecho]
+            else:
+                trecho_float = trecho
+            escalados = np.array(trecho_float, dtype=np.float64) * escala
+        except (ValueError, TypeError):
+            revisar = range(len(trecho))
+        else:
+            arredondados = np.rint(escalados)
+            # Até `casas` decimais e 15 dígitos o arredondamento é exato; NaN
+            # (None, fora do float) e valores maiores são revistos
+            exatos = np.abs(escalados) < _MAX_ESCALADO
+            revisar = np.flatnonzero(~exatos)
+            arredondados[revisar] = 0
+            inteiros[inicio:inicio + len(trecho)] = arredondados
+        
+        for i in revisar:
+            try:
+                valor = _parse_exato(trecho[i], casas)
+            except ValorMonetarioInvalido:
+                invalidos.append(inicio + i)
+                valor = None
+            if valor is None:
+                nulos[inicio + i] = True
+            else:
+                inteiros[inicio + i] = valor
+    
+    return inteiros, nulos, invalidos
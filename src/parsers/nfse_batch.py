@@ -0,0 +1,344 @@
+"""Lote colunar de NFSe: um array tipado por coluna em vez de um dict por nota"""
+
+import io
+import json
+import sys
+from array import array
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+import logging
+
+import numpy as np
+
+from src.parsers.money import CASAS_DECIMAIS
+from src.parsers.xml_parser import CAMPOS_NFSE
+
+logger = logging.getLogger(__name__)
+
+# Colunas calculadas em NfseXmlParser.extrair_nfse, na ordem do dicionário
+COLUNAS_DERIVADAS = (
+    ('status_nfse', 'texto'),
+    ('valor_iss_retido', 'valor'),
+    ('valor_liquido', 'valor'),
+    ('data_processamento', 'data'),
+    ('data_criacao', 'data_hora'),
+    ('origem_consulta', 'texto'),
+    ('hash_nfse', 'unico'),
+    ('id', 'unico'),
+)
+
+# Armazenamento diferente do tipo de extração: data/hora em segundos e
+# colunas de valor único por nota fora do dicionário (não se repetem)
+TIPOS_ARMAZENAMENTO = {
+    'data_emissao': 'data_hora',
+    'numero_nfse': 'unico',
+    'codigo_verificacao': 'unico',
+    'rps_numero': 'unico',
+}
+
+# Notas decodificadas por vez ao reconstruir dicionários
+BLOCO_REGISTROS = 10000
+
+# Marcadores de nulo nos arrays inteiros
+NULO_32 = -2 ** 31
+NULO_64 = -2 ** 63
+
+# Data/hora sem fuso no XML é hora local de Campinas
+FUSO_NFSE = ZoneInfo('America/Sao_Paulo')
+
+# Deslocamento guardado para texto original sem fuso
+SEM_FUSO = -2 ** 15
+
+_EPOCA = date(1970, 1, 1).toordinal()
+_EPOCA_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_SEGUNDO = timedelta(seconds=1)
+_MINUTO = timedelta(minutes=1)
+
+# Código de tipo do array.array por tipo de armazenamento
+_CODIGOS_ARRAY = {'valor': 'q', 'aliquota': 'q', 'data': 'i', 'data_hora': 'q', 'sim_nao': 'b', 'texto': 'i'}
+
+
+def _para_dias(texto):
+    if not texto:
+        return NULO_32
+    return date.fromisoformat(texto[:10]).toordinal() - _EPOCA
+
+
+def _para_segundos(texto):
+    """Texto ISO -> (segundos UTC desde 1970, deslocamento do texto em minutos ou SEM_FUSO)"""
+    if not texto:
+        return NULO_64, SEM_FUSO
+    momento = datetime.fromisoformat(texto)
+    if momento.tzinfo is None:
+        return (momento.replace(tzinfo=FUSO_NFSE) - _EPOCA_UTC) // _SEGUNDO, SEM_FUSO
+    return (momento - _EPOCA_UTC) // _SEGUNDO, momento.utcoffset() // _MINUTO
+
+
+def _texto_data_hora(segundos, deslocamento, fuso_explicito):
+    """Segundos UTC -> texto ISO com o fuso do original (sem fuso: hora de Campinas)"""
+    momento = _EPOCA_UTC + segundos * _SEGUNDO
+    if deslocamento != SEM_FUSO:
+        return momento.astimezone(timezone(deslocamento * _MINUTO)).isoformat()
+    local = momento.astimezone(FUSO_NFSE)
+    return local.isoformat() if fuso_explicito else local.replace(tzinfo=None).isoformat()
+
+
+def _para_inteiro(valor, casas):
+    """float/Decimal em reais -> inteiro escalado; int já vem escalado (monetario='centavos')"""
+    if valor is None:
+        return NULO_64
+    if isinstance(valor, int):
+        return valor
+    if isinstance(valor, Decimal):
+        return int(valor.scaleb(casas))
+    return round(valor * 10 ** casas)
+
+
+def _decimal_texto(inteiro: int, casas: int) -> str:
+    """Inteiro escalado -> texto decimal exato (ex.: 103170, 2 -> '1031.70')"""
+    sinal = '-' if inteiro < 0 else ''
+    parte, fracao = divmod(abs(inteiro), 10 ** casas)
+    return f"{sinal}{parte}.{fracao:0{casas}d}"
+
+
+class NfseBatch:
+    """
+    Lote de NFSe armazenado por colunas
+    
+    Valores monetários ficam em int64 (centavos; alíquota com 4 casas),
+    datas em dias desde 1970-01-01 (int32), data/hora em segundos UTC
+    (int64, texto sem fuso lido como hora de Campinas) com o deslocamento
+    do texto original em minutos (int16),
+    sim/não em int8 e textos repetidos (município, UF, razão social...)
+    codificados num dicionário por coluna, com um código int32 por nota.
+    Nulos usam marcadores nos arrays inteiros.
+    Os arrays são exportados para Arrow sem cópia (exceto o alargamento
+    dos valores para decimal128), e daí para Parquet; NDJSON sai direto.
+    """
+    
+    def __init__(self, campos=CAMPOS_NFSE):
+        """
+        Args:
+            campos: Mapeamento (coluna, caminho, tipo) do NfseXmlParser que
+                gerou os registros; define colunas e tipos do lote
+        """
+        tipos = {}
+        for coluna, _, tipo in campos:
+            tipos.setdefault(coluna, TIPOS_ARMAZENAMENTO.get(coluna, tipo))
+        for coluna, tipo in COLUNAS_DERIVADAS:
+            tipos.setdefault(coluna, tipo)
+        
+        self.tipos = tipos
+        self.colunas = tuple(tipos)
+        self._dados = {
+            coluna: [] if tipo == 'unico' else array(_CODIGOS_ARRAY[tipo])
+            for coluna, tipo in tipos.items()
+        }
+        # Coluna texto -> (valores distintos, valor -> código)
+        self._dicionarios = {coluna: ([], {}) for coluna, tipo in tipos.items() if tipo == 'texto'}
+        # Coluna data/hora -> deslocamento do texto original (devolvido em valores)
+        self._fusos = {coluna: array('h') for coluna, tipo in tipos.items() if tipo == 'data_hora'}
+        self._tamanho = 0
+    
+    @classmethod
+    def de_registros(cls, registros, campos=CAMPOS_NFSE) -> 'NfseBatch':
+        """Monta um lote a partir de dicionários de NfseXmlParser.extrair_nfse"""
+        lote = cls(campos)
+        lote.estender(registros)
+        return lote
+    
+    def __len__(self):
+        return self._tamanho
+    
+    def adicionar(self, nfse: dict):
+        """
+        Acrescenta uma NFSe ao lote
+        
+        Colunas fora do mapeamento são ignoradas; ausentes ficam nulas.
+        Valores monetários em float ou Decimal (reais) ou int já escalado
+        (NfseXmlParser(monetario='centavos')).
+        
+        Raises:
+            ValueError: Data ou data/hora em formato inválido (nada é gravado)
+        """
+        convertidos = []
+        fusos = []
+        for coluna in self.colunas:
+            valor = nfse.get(coluna)
+            tipo = self.tipos[coluna]
+            try:
+                if tipo in CASAS_DECIMAIS:
+                    valor = _para_inteiro(valor, CASAS_DECIMAIS[tipo])
+                elif tipo == 'data':
+                    valor = _para_dias(valor)
+                elif tipo == 'data_hora':
+                    valor, fuso = _para_segundos(valor)
+                    fusos.append(fuso)
+                elif tipo == 'sim_nao':
+                    valor = -1 if valor is None else int(bool(valor))
+            except ValueError as e:
+                raise ValueError(f"Coluna {coluna} inválida ({valor!r}): {e}") from e
+            convertidos.append(valor)
+        
+        for coluna, valor in zip(self.colunas, convertidos):
+            if coluna in self._dicionarios:
+                valor = self._codificar(coluna, valor)
+            self._dados[coluna].append(valor)
+        for deslocamentos, fuso in zip(self._fusos.values(), fusos):
+            deslocamentos.append(fuso)
+        self._tamanho += 1
+    
+    def estender(self, registros):
+        """Acrescenta várias NFSe ao lote"""
+        for nfse in registros:
+            self.adicionar(nfse)
+    
+    def _codificar(self, coluna, texto):
+        if texto is None:
+            return -1
+        valores, indice = self._dicionarios[coluna]
+        codigo = indice.get(texto)
+        if codigo is None:
+            codigo = indice[texto] = len(valores)
+            valores.append(texto)
+        return codigo
+    
+    def valores(self, coluna: str, valores_exatos: bool = False, inicio: int = 0, fim: int = None) -> list:
+        """
+        Valores de uma coluna no formato de extrair_nfse
+        
+        Args:
+            coluna: Nome da coluna
+            valores_exatos: Formato de carga: valores monetários como texto
+                decimal exato em vez de float e data/hora sempre com fuso
+                (sem ele, o original volta como veio)
+            inicio, fim: Faixa de notas (padrão: todas)
+        """
+        dados = self._dados[coluna][inicio:fim]
+        tipo = self.tipos[coluna]
+        if tipo == 'unico':
+            return list(dados)
+        if tipo == 'texto':
+            distintos = self._dicionarios[coluna][0]
+            return [distintos[codigo] if codigo >= 0 else None for codigo in dados]
+        if tipo in CASAS_DECIMAIS:
+            casas = CASAS_DECIMAIS[tipo]
+            if valores_exatos:
+                return [_decimal_texto(v, casas) if v != NULO_64 else None for v in dados]
+            escala = 10 ** casas
+            return [v / escala if v != NULO_64 else None for v in dados]
+        if tipo == 'data':
+            return [date.fromordinal(v + _EPOCA).isoformat() if v != NULO_32 else None for v in dados]
+        if tipo == 'data_hora':
+            fusos = self._fusos[coluna][inicio:fim]
+            return [
+                _texto_data_hora(v, f, valores_exatos) if v != NULO_64 else None for v, f in zip(dados, fusos)
+            ]
+        return [bool(v) if v >= 0 else None for v in dados]
+    
+    def iterar_registros(self, valores_exatos: bool = False):
+        """
+        Reconstrói as NFSe como dicionários, uma por vez
+        
+        Decodifica BLOCO_REGISTROS notas por vez, então só esse trecho
+        existe como objetos Python ao mesmo tempo.
+        
+        Yields:
+            Dicionário com as colunas do lote (mesmas chaves de extrair_nfse)
+        """
+        for inicio in range(0, self._tamanho, BLOCO_REGISTROS):
+            fim = inicio + BLOCO_REGISTROS
+            colunas = [self.valores(coluna, valores_exatos, inicio, fim) for coluna in self.colunas]
+            for linha in zip(*colunas):
+                yield dict(zip(self.colunas, linha))
+    
+    def para_arrow(self):
+        """
+        Tabela Arrow do lote
+        
+        Inteiros, datas, data/hora e códigos de dicionário usam os próprios
+        buffers do lote (não acrescente notas enquanto a tabela existir).
+        
+        Returns:
+            pyarrow.Table com decimal128 para valores, date32, timestamp[s, UTC],
+            bool e dictionary<int32, string> para textos repetidos
+        """
+        import pyarrow as pa
+        
+        arrays = {}
+        for coluna in self.colunas:
+            dados = self._dados[coluna]
+            tipo = self.tipos[coluna]
+            if tipo == 'unico':
+                arrays[coluna] = pa.array(dados, pa.string())
+                continue
+            
+            numeros = np.frombuffer(dados, dtype=dados.typecode)
+            if tipo in CASAS_DECIMAIS:
+                # decimal128 é little-endian de 16 bytes: parte baixa + extensão de sinal
+                largos = np.empty((len(numeros), 2), dtype=np.int64)
+                largos[:, 0] = numeros
+                largos[:, 1] = numeros >> 63
+                nulos = numeros == NULO_64
+                validade = pa.array(~nulos).buffers()[1] if nulos.any() else None
+                arrays[coluna] = pa.Array.from_buffers(
+                    pa.decimal128(18, CASAS_DECIMAIS[tipo]), len(numeros), [validade, pa.py_buffer(largos)]
+                )
+            elif tipo == 'data':
+                arrays[coluna] = pa.array(numeros, mask=numeros == NULO_32).view(pa.date32())
+            elif tipo == 'data_hora':
+                arrays[coluna] = pa.array(numeros, mask=numeros == NULO_64).view(pa.timestamp('s', tz='UTC'))
+            elif tipo == 'sim_nao':
+                arrays[coluna] = pa.array(numeros == 1, mask=numeros < 0)
+            else:
+                arrays[coluna] = pa.DictionaryArray.from_arrays(
+                    pa.array(numeros, mask=numeros < 0),
+                    pa.array(self._dicionarios[coluna][0], pa.string())
+                )
+        return pa.table(arrays)
+    
+    def gravar_parquet(self, destino, compressao: str = 'snappy'):
+        """
+        Grava o lote em Parquet (textos repetidos ficam dictionary-encoded)
+        
+        Args:
+            destino: Caminho ou arquivo binário
+            compressao: Codec do Parquet
+        """
+        import pyarrow.parquet as pq
+        
+        pq.write_table(self.para_arrow(), destino, compression=compressao)
+    
+    def gravar_ndjson(self, destino):
+        """
+        Grava o lote em JSON delimitado por linha (carga do BigQuery)
+        
+        Valores monetários vão como texto decimal exato (NUMERIC) e
+        data/hora com fuso explícito (TIMESTAMP sem fuso seria lido como UTC).
+        
+        Args:
+            destino: Caminho ou arquivo binário
+        """
+        arquivo = open(destino, 'wb') if isinstance(destino, str) else destino
+        try:
+            texto = io.TextIOWrapper(arquivo, encoding='utf-8', newline='\n', write_through=True)
+            for registro in self.iterar_registros(valores_exatos=True):
+                texto.write(json.dumps(registro, ensure_ascii=False))
+                texto.write('\n')
+            texto.detach()
+        finally:
+            if isinstance(destino, str):
+                arquivo.close()
+    
+    def bytes_memoria(self) -> int:
+        """Memória ocupada pelo lote (arrays, dicionários e textos)"""
+        total = 0
+        for dados in (*self._dados.values(), *self._fusos.values()):
+            total += sys.getsizeof(dados)
+            if isinstance(dados, list):
+                total += sum(sys.getsizeof(v) for v in dados if v is not None)
+        for valores, indice in self._dicionarios.values():
+            total += sys.getsizeof(valores) + sys.getsizeof(indice)
+            total += sum(sys.getsizeof(v) for v in valores)
+        return total
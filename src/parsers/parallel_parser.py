@@ -0,0 +1,193 @@
+"""Parse paralelo de respostas ABRASF arquivadas (ProcessPoolExecutor)"""
+
+import glob
+import gzip
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import logging
+
+from src.parsers.xml_parser import NfseXmlParser, NAMESPACE_NFSE
+
+logger = logging.getLogger(__name__)
+
+# Fim de cada nota (com ou sem prefixo de namespace)
+_RE_FIM_COMP_NFSE = re.compile(rb'</(?:(\w+):)?CompNfse>')
+
+# Leitura do arquivo ao procurar as fronteiras dos trechos
+TAMANHO_LEITURA = 1024 * 1024
+
+# Parser de cada processo do pool (criado no primeiro uso)
+_parser = None
+
+
+def listar_respostas(diretorio: str) -> list:
+    """Respostas arquivadas (.xml e .xml.gz) do diretório, em ordem de nome"""
+    caminhos = glob.glob(os.path.join(diretorio, '*.xml')) + glob.glob(os.path.join(diretorio, '*.xml.gz'))
+    return sorted(caminhos)
+
+
+def _abrir(caminho: str):
+    return gzip.open(caminho, 'rb') if caminho.endswith('.gz') else open(caminho, 'rb')
+
+
+def _processar(tarefa):
+    """
+    Parseia um arquivo inteiro ou um trecho de CompNfse (no processo filho)
+    
+    Returns:
+        (colunas, linhas): nomes das colunas e uma tupla de valores por nota
+    """
+    global _parser
+    if _parser is None:
+        _parser = NfseXmlParser()
+    
+    caminho, inicio, fim, prefixo = tarefa
+    if inicio is None:
+        with _abrir(caminho) as arquivo:
+            registros = list(_parser.iterar_nfse(arquivo))
+    else:
+        with open(caminho, 'rb') as arquivo:
+            arquivo.seek(inicio)
+            trecho = arquivo.read(fim - inicio)
+        # Trecho só com notas: envolver num elemento que declara o namespace
+        declaracao = f'xmlns:{prefixo}' if prefixo else 'xmlns'
+        xml = f'<ListaNfse {declaracao}="{NAMESPACE_NFSE}">'.encode() + trecho + b'</ListaNfse>'
+        registros = list(_parser.iterar_nfse(xml))
+    
+    if not registros:
+        return (), []
+    # Tuplas em vez de dicts: menos bytes para serializar de volta ao processo pai
+    return tuple(registros[0]), [tuple(r.values()) for r in registros]
+
+
+class ParallelNfseParser:
+    """Distribui o parse de respostas arquivadas entre processos"""
+    
+    def __init__(self, workers: int = None, bloco_bytes: int = None):
+        """
+        Args:
+            workers: Processos do pool (padrão: núcleos da máquina)
+            bloco_bytes: Dividir arquivos .xml maiores que isso em trechos de
+                CompNfse completos (None: um arquivo por tarefa)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.bloco_bytes = bloco_bytes
+    
+    def planejar_tarefas(self, caminhos: list) -> list:
+        """
+        Tarefas (caminho, início, fim, prefixo) para o pool
+        
+        Arquivos .xml grandes são cortados logo após um </CompNfse>, então
+        cada trecho contém apenas notas completas; .gz vão inteiros.
+        """
+        tarefas = []
+        for caminho in caminhos:
+            if not self.bloco_bytes or caminho.endswith('.gz') or os.path.getsize(caminho) <= self.bloco_bytes:
+                tarefas.append((caminho, None, None, None))
+                continue
+            tarefas.extend(self._dividir(caminho))
+        return tarefas
+    
+    def _dividir(self, caminho: str) -> list:
+        """Trechos de ~bloco_bytes terminando em fronteiras de CompNfse"""
+        tarefas = []
+        inicio = None       # início do trecho atual (primeira nota)
+        ultimo_fim = None   # fim da última nota vista
+        prefixo = None
+        deslocamento = 0
+        resto = b''
+        
+        with open(caminho, 'rb') as arquivo:
+            while True:
+                bloco = arquivo.read(TAMANHO_LEITURA)
+                if not bloco:
+                    break
+                dados = resto + bloco
+                base = deslocamento - len(resto)
+                for match in _RE_FIM_COMP_NFSE.finditer(dados):
+                    fim = base + match.end()
+                    if ultimo_fim is not None and fim <= ultimo_fim:
+                        continue  # já visto na sobreposição
+                    if inicio is None:
+                        prefixo = match.group(1).decode() if match.group(1) else None
+                        inicio = self._inicio_primeira_nota(caminho, prefixo)
+                    ultimo_fim = fim
+                    if fim - inicio >= self.bloco_bytes:
+                        tarefas.append((caminho, inicio, fim, prefixo))
+                        inicio = fim
+                deslocamento += len(bloco)
+                # Sobreposição cobre a tag de fechamento partida entre leituras
+                resto = dados[-64:]
+        
+        if ultimo_fim is not None and ultimo_fim > inicio:
+            tarefas.append((caminho, inicio, ultimo_fim, prefixo))
+        return tarefas
+    
+    @staticmethod
+    def _inicio_primeira_nota(caminho: str, prefixo: str) -> int:
+        """Posição do primeiro <CompNfse> do arquivo"""
+        tag = re.compile(rb'<' + (prefixo.encode() + b':' if prefixo else b'') + rb'CompNfse[\s>]')
+        with open(caminho, 'rb') as arquivo:
+            deslocamento = 0
+            resto = b''
+            while True:
+                bloco = arquivo.read(TAMANHO_LEITURA)
+                if not bloco:
+                    raise ValueError(f"CompNfse não encontrado em {caminho}")
+                dados = resto + bloco
+                match = tag.search(dados)
+                if match:
+                    return deslocamento - len(resto) + match.start()
+                deslocamento += len(bloco)
+                resto = dados[-64:]
+    
+    def iterar_lotes(self, caminhos: list, ordenado: bool = True):
+        """
+        Parseia as respostas no pool de processos
+        
+        No máximo 2 * workers tarefas ficam em voo, então a memória do
+        processo pai não cresce com o tamanho do acervo.
+        
+        Args:
+            caminhos: Arquivos de resposta (.xml ou .xml.gz)
+            ordenado: Entregar na ordem das tarefas (senão, por conclusão)
+        
+        Yields:
+            (colunas, linhas) de cada arquivo ou trecho
+        """
+        tarefas = self.planejar_tarefas(caminhos)
+        logger.info(f"Parse paralelo: {len(caminhos)} arquivos, {len(tarefas)} tarefas, {self.workers} processos")
+        
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pendentes = deque()
+            for tarefa in tarefas:
+                pendentes.append(executor.submit(_processar, tarefa))
+                if len(pendentes) >= self.workers * 2:
+                    yield from self._concluir(pendentes, ordenado)
+            while pendentes:
+                yield from self._concluir(pendentes, ordenado)
+    
+    @staticmethod
+    def _concluir(pendentes: deque, ordenado: bool):
+        """Entrega a próxima tarefa (ordenado) ou as que já terminaram"""
+        if ordenado:
+            yield pendentes.popleft().result()
+            return
+        
+        prontos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+        for futuro in prontos:
+            pendentes.remove(futuro)
+            yield futuro.result()
+    
+    def iterar_nfse(self, caminhos: list, ordenado: bool = True):
+        """
+        Parseia as respostas no pool de processos, uma NFSe por vez
+        
+        Yields:
+            Dicionário no mesmo formato de NfseXmlParser.extrair_nfse
+        """
+        for colunas, linhas in self.iterar_lotes(caminhos, ordenado):
+            for linha in linhas:
+                yield dict(zip(colunas, linha))
@@ -3,21 +3,79 @@
 import re
 import logging
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
+# Pesos dos dígitos verificadores (módulo 11)
+PESOS_CNPJ = np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2], dtype=np.int64)
+PESOS_CPF = np.arange(11, 1, -1, dtype=np.int64)
+
+# Máscara aceita nos documentos ('12.ABC.345/01DE-35', '123.456.789-09')
+_SEPARADORES = np.array([ord(c) for c in './- '], dtype=np.uint32)
+
+# Linhas convertidas por vez: a matriz de caracteres tem a largura do maior texto do bloco
+BLOCO_VALIDACAO = 65536
+
+# Cálculo dos dígitos de uma raiz (calcular_dv_cnpj)
+_RE_CNPJ = re.compile(r'[0-9A-Z]*[0-9]{2}', re.ASCII)
+_PESOS_CNPJ = tuple(PESOS_CNPJ.tolist())
 
-def validar_cnpj(cnpj: str) -> bool:
+
+def validar_cnpj_lote(cnpjs, alfanumerico: bool = True):
     """
-    Valida CNPJ com dígitos verificadores
+    Valida uma coluna de CNPJs de uma vez (NumPy)
+    
+    Aceita o CNPJ numérico e o alfanumérico da Receita Federal (julho de
+    2026): 12 caracteres [0-9A-Z] de raiz e ordem, seguidos de 2 dígitos
+    verificadores. Cada caractere vale seu código ASCII menos 48 ('0'-'9'
+    = 0-9, 'A' = 17 ... 'Z' = 42), e os dígitos são o módulo 11 com os
+    pesos de sempre, então para CNPJs só numéricos o cálculo é o mesmo.
+    Máscara (. / - e espaços) é ignorada, letras minúsculas viram
+    maiúsculas; CNPJs com todos os caracteres iguais são inválidos.
     
     Args:
-        cnpj: CNPJ (apenas números)
-        
+        cnpjs: Array NumPy, Series do pandas ou lista de textos (números,
+            inclusive como texto '123.0', são completados com zeros à
+            esquerda; None/NaN são inválidos)
+        alfanumerico: Aceitar letras na raiz e na ordem
+    
+    Returns:
+        Array bool (Series com o mesmo índice, se a entrada for Series)
+    """
+    return _validar_lote(cnpjs, 14, _dv_cnpj, alfanumerico)
+
+
+def validar_cpf_lote(cpfs):
+    """
+    Valida uma coluna de CPFs de uma vez (NumPy)
+    
+    Args:
+        cpfs: Array NumPy, Series do pandas ou lista de textos (números,
+            inclusive como texto '123.0', são completados com zeros à
+            esquerda; None/NaN são inválidos)
+    
+    Returns:
+        Array bool (Series com o mesmo índice, se a entrada for Series)
+    """
+    return _validar_lote(cpfs, 11, _dv_cpf, False)
+
+
+def validar_cnpj(cnpj: str, alfanumerico: bool = True) -> bool:
+    """
+    Valida CNPJ com dígitos verificadores (numérico ou alfanumérico)
+    
+    Passa pelo mesmo caminho de validar_cnpj_lote (lote de um): para
+    colunas inteiras, use o lote.
+    
+    Args:
+        cnpj: CNPJ, com ou sem máscara
+        alfanumerico: Aceitar letras na raiz e na ordem
+    
     Returns:
         True se válido
     """
-    # TODO: Implementar validação CNPJ
-    pass
+    return bool(_validar_lote([cnpj], 14, _dv_cnpj, alfanumerico)[0])
 
 
 def validar_cpf(cpf: str) -> bool:
@@ -25,10 +83,152 @@ def validar_cpf(cpf: str) -> bool:
     Valida CPF com dígitos verificadores
     
     Args:
-        cpf: CPF (apenas números)
-        
+        cpf: CPF, com ou sem máscara
+    
     Returns:
         True se válido
     """
-    # TODO: Implementar validação CPF
-    pass
+    return bool(_validar_lote([cpf], 11, _dv_cpf, False)[0])
+
+
+def calcular_dv_cnpj(raiz: str) -> str:
+    """
+    Dígitos verificadores de um CNPJ
+    
+    Args:
+        raiz: Os 12 primeiros caracteres (raiz e ordem), sem máscara
+    
+    Returns:
+        Os 2 dígitos verificadores
+    """
+    raiz = raiz.upper()
+    if len(raiz) != 12 or not _RE_CNPJ.fullmatch(raiz + '00'):
+        raise ValueError(f"Raiz de CNPJ inválida: {raiz!r}")
+    valores = [ord(c) - 48 for c in raiz]
+    dv1 = _dv_texto(valores, _PESOS_CNPJ[1:])
+    return f"{dv1}{_dv_texto(valores + [dv1], _PESOS_CNPJ)}"
+
+
+def _dv_texto(valores: list, pesos: tuple) -> int:
+    resto = sum(v * p for v, p in zip(valores, pesos)) % 11
+    return 0 if resto < 2 else 11 - resto
+
+
+def _dv_cnpj(valores):
+    """Dígitos verificadores de cada linha (12 primeiros valores por linha)"""
+    dv1 = _modulo_11(valores[:, :12] @ PESOS_CNPJ[1:])
+    dv2 = _modulo_11(valores[:, :12] @ PESOS_CNPJ[:12] + dv1 * PESOS_CNPJ[12])
+    return dv1, dv2
+
+
+def _dv_cpf(valores):
+    """Dígitos verificadores de cada linha (9 primeiros valores por linha)"""
+    dv1 = _modulo_11(valores[:, :9] @ PESOS_CPF[1:])
+    dv2 = _modulo_11(valores[:, :9] @ PESOS_CPF[:9] + dv1 * PESOS_CPF[9])
+    return dv1, dv2
+
+
+def _modulo_11(soma):
+    resto = soma % 11
+    return np.where(resto < 2, 0, 11 - resto)
+
+
+def _validar_lote(documentos, tamanho: int, calcular_dv, alfanumerico: bool):
+    """Normaliza a coluna em blocos de caracteres e compara os dígitos verificadores"""
+    # Series do pandas: resultado com o mesmo índice
+    indice = documentos.index if hasattr(documentos, 'to_numpy') else None
+    textos = _como_texto(documentos, tamanho)
+    validos = np.zeros(len(textos), dtype=bool)
+    
+    for inicio in range(0, len(textos), BLOCO_VALIDACAO):
+        codigos = _codigos(textos[inicio:inicio + BLOCO_VALIDACAO], tamanho)
+        if codigos is None:
+            continue
+        caracteres, completos = codigos
+        valores = caracteres.astype(np.int64) - 48
+        
+        # Verificadores sempre numéricos; demais posições [0-9] ou [A-Z]
+        digito = (valores >= 0) & (valores <= 9)
+        permitido = digito | ((valores >= 17) & (valores <= 42)) if alfanumerico else digito
+        ok = completos & permitido[:, :-2].all(axis=1) & digito[:, -2:].all(axis=1)
+        ok &= ~(caracteres == caracteres[:, :1]).all(axis=1)
+        
+        dv1, dv2 = calcular_dv(valores)
+        ok &= (dv1 == valores[:, -2]) & (dv2 == valores[:, -1])
+        validos[inicio:inicio + len(ok)] = ok
+    
+    if indice is not None:
+        import pandas as pd
+        return pd.Series(validos, index=indice)
+    return validos
+
+
+def _como_texto(documentos, tamanho: int):
+    """
+    Coluna como array de texto (U), com os zeros à esquerda perdidos devolvidos
+    
+    Vale para qualquer dtype: inteiros, floats inteiros (planilha lida como
+    número), textos só de dígitos e esses mesmos textos com '.0' no fim
+    (coluna numérica já convertida com astype(str)) viram os dígitos
+    completados até `tamanho`; demais textos seguem como estão.
+    """
+    if hasattr(documentos, 'to_numpy'):
+        documentos = documentos.to_numpy()
+    arr = np.asarray(documentos)
+    if arr.dtype.kind == 'f':
+        # Planilhas lidas como número: só valores inteiros são documentos
+        inteiros = np.isfinite(arr) & (arr == np.round(arr))
+        arr = np.where(inteiros, arr, 0).astype(np.int64)
+        return np.where(inteiros, np.char.zfill(arr.astype(str), tamanho), '')
+    if arr.dtype.kind in 'iu':
+        return np.char.zfill(arr.astype(str), tamanho)
+    if arr.dtype.kind == 'S':
+        arr = np.char.decode(arr, 'latin-1')
+    elif arr.dtype.kind != 'U':
+        arr = np.array([_texto(valor) for valor in arr.ravel()], dtype=str)
+    
+    if not arr.size:
+        return arr.astype(str)
+    # '191', ' 191 ' e '191.0' -> '00000000191'
+    textos = np.char.strip(arr)
+    inteiro, ponto, decimais = (np.asarray(parte) for parte in np.char.partition(textos, '.').T)
+    numerico = np.char.isdigit(inteiro) & ((ponto == '') | (np.char.strip(decimais, '0') == ''))
+    return np.where(numerico, np.char.zfill(inteiro, tamanho), arr)
+
+
+def _texto(valor) -> str:
+    """Valor de uma coluna object como texto (None, NaN e bool viram '')"""
+    if isinstance(valor, str):
+        return valor
+    if isinstance(valor, bytes):
+        return valor.decode('latin-1')
+    if isinstance(valor, (bool, np.bool_)) or valor is None:
+        return ''
+    if isinstance(valor, (int, np.integer)):
+        return str(valor)
+    if isinstance(valor, (float, np.floating)):
+        return str(int(valor)) if np.isfinite(valor) and valor == round(valor) else ''
+    return str(valor)
+
+
+def _codigos(textos, tamanho: int):
+    """
+    Caracteres de cada documento sem máscara, em maiúsculas
+    
+    Returns:
+        (matriz uint32 com `tamanho` códigos por linha, linhas com exatamente
+        `tamanho` caracteres), ou None para bloco vazio
+    """
+    if not len(textos):
+        return None
+    largura = max(textos.dtype.itemsize // 4, tamanho)
+    # Cada caractere de um array U é um código uint32: matriz linhas x largura sem cópia por texto
+    codigos = textos.astype(f'U{largura}').view(np.uint32).reshape(len(textos), largura).copy()
+    minusculas = (codigos >= 97) & (codigos <= 122)
+    codigos[minusculas] -= 32
+    
+    manter = (codigos != 0) & ~np.isin(codigos, _SEPARADORES)
+    completos = manter.sum(axis=1) == tamanho
+    # Ordenação estável de ~manter traz os caracteres mantidos para a frente, na ordem
+    ordem = np.argsort(~manter, axis=1, kind='stable')[:, :tamanho]
+    return np.take_along_axis(codigos, ordem, axis=1), completos
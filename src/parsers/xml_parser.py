@@ -1,37 +1,409 @@
 """Parser XML ABRASF 2.03 para Python Dict"""
 
+import hashlib
+import io
+import uuid
+from collections import Counter
+from datetime import datetime
 from lxml import etree
 import logging
 
+from src.parsers.money import CASAS_DECIMAIS, CONVERSORES_MONETARIOS, ValorMonetarioInvalido
+
 logger = logging.getLogger(__name__)
 
+NAMESPACE_NFSE = 'http://www.betha.com.br/e-nota-contribuinte-ws'
+
+NS = {'nfse': NAMESPACE_NFSE}
+
+TAG_COMP_NFSE = f'{{{NAMESPACE_NFSE}}}CompNfse'
+
+# Prefixos dos blocos do InfNfse (ABRASF 2.03)
+_PRESTADOR = 'PrestadorServico/'
+_DECLARACAO = 'DeclaracaoPrestacaoServico/InfDeclaracaoPrestacaoServico/'
+_SERVICO = _DECLARACAO + 'Servico/'
+_VALORES = _SERVICO + 'Valores/'
+_TOMADOR = _DECLARACAO + 'TomadorServico/'
+
+# Coluna -> caminho (nomes locais, relativo ao InfNfse) -> tipo
+# Colunas de schemas/bigquery/nf_emitidas.json extraídas do XML; nova coluna = nova linha.
+# Mais de um caminho para a mesma coluna: vale o que estiver presente (ex.: Cnpj/Cpf).
+CAMPOS_NFSE = (
+    ('numero_nfse', 'Numero', 'texto'),
+    ('codigo_verificacao', 'CodigoVerificacao', 'texto'),
+    ('data_emissao', 'DataEmissao', 'texto'),
+    ('data_competencia', _DECLARACAO + 'Competencia', 'data'),
+    ('nfse_substituida', 'NfseSubstituida', 'texto'),
+    ('outras_informacoes', 'OutrasInformacoes', 'texto'),
+    ('valor_credito', 'ValorCredito', 'valor'),
+    ('base_calculo', 'ValoresNfse/BaseCalculo', 'valor'),
+    ('aliquota', 'ValoresNfse/Aliquota', 'aliquota'),
+    ('valor_liquido_nfse', 'ValoresNfse/ValorLiquidoNfse', 'valor'),
+    
+    # Prestador de serviço
+    ('prestador_cnpj', _PRESTADOR + 'IdentificacaoPrestador/CpfCnpj/Cnpj', 'texto'),
+    ('prestador_cnpj', _PRESTADOR + 'IdentificacaoPrestador/CpfCnpj/Cpf', 'texto'),
+    ('prestador_inscricao_municipal', _PRESTADOR + 'IdentificacaoPrestador/InscricaoMunicipal', 'texto'),
+    ('prestador_razao_social', _PRESTADOR + 'RazaoSocial', 'texto'),
+    ('prestador_nome_fantasia', _PRESTADOR + 'NomeFantasia', 'texto'),
+    ('prestador_endereco', _PRESTADOR + 'Endereco/Endereco', 'texto'),
+    ('prestador_numero', _PRESTADOR + 'Endereco/Numero', 'texto'),
+    ('prestador_complemento', _PRESTADOR + 'Endereco/Complemento', 'texto'),
+    ('prestador_bairro', _PRESTADOR + 'Endereco/Bairro', 'texto'),
+    ('prestador_codigo_municipio', _PRESTADOR + 'Endereco/CodigoMunicipio', 'texto'),
+    ('prestador_uf', _PRESTADOR + 'Endereco/Uf', 'texto'),
+    ('prestador_cep', _PRESTADOR + 'Endereco/Cep', 'texto'),
+    ('prestador_telefone', _PRESTADOR + 'Contato/Telefone', 'texto'),
+    ('prestador_email', _PRESTADOR + 'Contato/Email', 'texto'),
+    ('orgao_gerador_municipio', 'OrgaoGerador/CodigoMunicipio', 'texto'),
+    ('orgao_gerador_uf', 'OrgaoGerador/Uf', 'texto'),
+    
+    # Tomador do serviço
+    ('tomador_cpf_cnpj', _TOMADOR + 'IdentificacaoTomador/CpfCnpj/Cnpj', 'texto'),
+    ('tomador_cpf_cnpj', _TOMADOR + 'IdentificacaoTomador/CpfCnpj/Cpf', 'texto'),
+    ('tomador_cnpj', _TOMADOR + 'IdentificacaoTomador/CpfCnpj/Cnpj', 'texto'),
+    ('tomador_cpf', _TOMADOR + 'IdentificacaoTomador/CpfCnpj/Cpf', 'texto'),
+    ('tomador_inscricao_municipal', _TOMADOR + 'IdentificacaoTomador/InscricaoMunicipal', 'texto'),
+    ('tomador_razao_social', _TOMADOR + 'RazaoSocial', 'texto'),
+    ('tomador_endereco', _TOMADOR + 'Endereco/Endereco', 'texto'),
+    ('tomador_numero', _TOMADOR + 'Endereco/Numero', 'texto'),
+    ('tomador_complemento', _TOMADOR + 'Endereco/Complemento', 'texto'),
+    ('tomador_bairro', _TOMADOR + 'Endereco/Bairro', 'texto'),
+    ('tomador_codigo_municipio', _TOMADOR + 'Endereco/CodigoMunicipio', 'texto'),
+    ('tomador_municipio', _TOMADOR + 'Endereco/CodigoMunicipio', 'texto'),
+    ('tomador_uf', _TOMADOR + 'Endereco/Uf', 'texto'),
+    ('tomador_cep', _TOMADOR + 'Endereco/Cep', 'texto'),
+    ('tomador_telefone', _TOMADOR + 'Contato/Telefone', 'texto'),
+    ('tomador_email', _TOMADOR + 'Contato/Email', 'texto'),
+    ('intermediario_cpf_cnpj', _DECLARACAO + 'Intermediario/IdentificacaoIntermediario/CpfCnpj/Cnpj', 'texto'),
+    ('intermediario_cpf_cnpj', _DECLARACAO + 'Intermediario/IdentificacaoIntermediario/CpfCnpj/Cpf', 'texto'),
+    ('intermediario_razao_social', _DECLARACAO + 'Intermediario/RazaoSocial', 'texto'),
+    
+    # Valores do serviço
+    ('valor_servicos', _VALORES + 'ValorServicos', 'valor'),
+    ('valor_deducoes', _VALORES + 'ValorDeducoes', 'valor'),
+    ('valor_pis', _VALORES + 'ValorPis', 'valor'),
+    ('valor_cofins', _VALORES + 'ValorCofins', 'valor'),
+    ('valor_inss', _VALORES + 'ValorInss', 'valor'),
+    ('valor_ir', _VALORES + 'ValorIr', 'valor'),
+    ('valor_csll', _VALORES + 'ValorCsll', 'valor'),
+    ('outras_retencoes', _VALORES + 'OutrasRetencoes', 'valor'),
+    ('valor_total_tributos', _VALORES + 'ValTotTributos', 'valor'),
+    ('valor_iss', _VALORES + 'ValorIss', 'valor'),
+    ('desconto_incondicionado', _VALORES + 'DescontoIncondicionado', 'valor'),
+    ('desconto_condicionado', _VALORES + 'DescontoCondicionado', 'valor'),
+    
+    # Serviço
+    ('iss_retido', _SERVICO + 'IssRetido', 'sim_nao'),
+    ('responsavel_retencao', _SERVICO + 'ResponsavelRetencao', 'texto'),
+    ('item_lista_servico', _SERVICO + 'ItemListaServico', 'texto'),
+    ('codigo_cnae', _SERVICO + 'CodigoCnae', 'texto'),
+    ('codigo_tributacao_municipio', _SERVICO + 'CodigoTributacaoMunicipio', 'texto'),
+    ('codigo_nbs', _SERVICO + 'CodigoNbs', 'texto'),
+    ('discriminacao', _SERVICO + 'Discriminacao', 'texto'),
+    ('codigo_municipio_prestacao', _SERVICO + 'CodigoMunicipio', 'texto'),
+    ('codigo_pais', _SERVICO + 'CodigoPais', 'texto'),
+    ('exigibilidade_iss', _SERVICO + 'ExigibilidadeISS', 'texto'),
+    ('municipio_incidencia', _SERVICO + 'MunicipioIncidencia', 'texto'),
+    ('numero_processo', _SERVICO + 'NumeroProcesso', 'texto'),
+    
+    # RPS, obra e regime
+    ('rps_numero', _DECLARACAO + 'Rps/IdentificacaoRps/Numero', 'texto'),
+    ('rps_serie', _DECLARACAO + 'Rps/IdentificacaoRps/Serie', 'texto'),
+    ('rps_tipo', _DECLARACAO + 'Rps/IdentificacaoRps/Tipo', 'texto'),
+    ('rps_data_emissao', _DECLARACAO + 'Rps/DataEmissao', 'data'),
+    ('codigo_obra', _DECLARACAO + 'ConstrucaoCivil/CodigoObra', 'texto'),
+    ('art', _DECLARACAO + 'ConstrucaoCivil/Art', 'texto'),
+    ('regime_especial_tributacao', _DECLARACAO + 'RegimeEspecialTributacao', 'texto'),
+    ('optante_simples_nacional', _DECLARACAO + 'OptanteSimplesNacional', 'sim_nao'),
+    ('incentivo_fiscal', _DECLARACAO + 'IncentivoFiscal', 'sim_nao'),
+)
+
+
+def _data(texto):
+    return texto[:10] if texto else None
+
+
+def _sim_nao(texto):
+    # ABRASF: 1 = Sim, 2 = Não
+    if texto is None:
+        return None
+    return texto.strip() == '1'
+
+
+CONVERSORES = {
+    'texto': lambda texto: texto,
+    'data': _data,
+    'sim_nao': _sim_nao,
+    # Valores monetários: float validado (ver NfseXmlParser(monetario=...))
+    **{tipo: CONVERSORES_MONETARIOS['float'](casas) for tipo, casas in CASAS_DECIMAIS.items()},
+}
+
+# Linhas de nf_tributos: tipo_tributo -> coluna de valor da NFSe (valores de
+# Servico/Valores são retenções; o ISS segue IssRetido)
+TRIBUTOS = (
+    ('PIS', 'valor_pis'),
+    ('COFINS', 'valor_cofins'),
+    ('INSS', 'valor_inss'),
+    ('IR', 'valor_ir'),
+    ('CSLL', 'valor_csll'),
+    ('OUTROS', 'outras_retencoes'),
+    ('ISS', 'valor_iss'),
+)
+
+RESPONSAVEL_RETENCAO = {'1': 'Tomador', '2': 'Intermediário'}
+
+# Valor de colunas ausentes no XML (valores monetários zerados, como na tabela legada)
+PADROES = {'valor': 0.0, 'aliquota': 0.0}
+
+
+def compilar_campos(campos, namespace=NAMESPACE_NFSE, conversores=CONVERSORES, padroes=PADROES):
+    """
+    Pré-processa o mapeamento em uma árvore de prefixos por tag
+    
+    Cada nó é {tag: (destinos, filhos)}, com a tag tanto no namespace
+    informado quanto sem namespace; destinos é [(coluna, conversor)].
+    
+    Args:
+        campos: Mapeamento (coluna, caminho, tipo)
+        namespace: Namespace das tags
+        conversores: Tipo -> função texto -> valor
+        padroes: Tipo -> valor de coluna ausente
+    
+    Returns:
+        (árvore de prefixos, {coluna: valor padrão})
+    """
+    raiz = {}
+    padroes_colunas = {}
+    for coluna, caminho, tipo in campos:
+        nos = [raiz]
+        for nome in caminho.split('/'):
+            proximos = []
+            for no in nos:
+                for tag in (f'{{{namespace}}}{nome}', nome):
+                    proximos.append(no.setdefault(tag, ([], {})))
+            nos = [filhos for _, filhos in proximos]
+        for destinos, _ in proximos:
+            destinos.append((coluna, conversores[tipo]))
+        padroes_colunas.setdefault(coluna, padroes.get(tipo))
+    return raiz, padroes_colunas
+
 
 class NfseXmlParser:
     """Parser de XML NFSe para estrutura Python"""
     
-    def parse_nfse_response(self, xml_string: str) -> list:
+    def __init__(self, origem_consulta: str = 'nfse_campinas_api', campos=CAMPOS_NFSE,
+                 monetario: str = 'float', validador=None):
+        """
+        Args:
+            origem_consulta: Valor da coluna origem_consulta nos registros
+            campos: Mapeamento (coluna, caminho, tipo) usado na extração
+            monetario: Representação dos valores: 'float', 'centavos'
+                (inteiro; alíquota em décimos de milésimo) ou 'decimal'
+            validador: NfseXsdValidator opcional; notas reprovadas nas
+                respostas sorteadas vão para a quarentena e não são geradas
+        """
+        self.origem_consulta = origem_consulta
+        self.monetario = monetario
+        self.validador = validador
+        conversores = dict(CONVERSORES)
+        padroes_tipo = dict(PADROES)
+        for tipo, casas in CASAS_DECIMAIS.items():
+            conversores[tipo] = CONVERSORES_MONETARIOS[monetario](casas)
+            padroes_tipo[tipo] = conversores[tipo]('0')
+        self._zero = padroes_tipo['valor']
+        
+        self._arvore, padroes = compilar_campos(campos, conversores=conversores, padroes=padroes_tipo)
+        self._vazio = dict.fromkeys(padroes)
+        self._padroes = [(coluna, padrao) for coluna, padrao in padroes.items() if padrao is not None]
+        # Valores que não são números exatos: ficam nulos (não zerados) e são contados por coluna
+        self.valores_invalidos = Counter()
+    
+    def iterar_nfse(self, fonte, com_tributos: bool = False):
+        """
+        Parse incremental (iterparse) da resposta, uma NFSe por vez
+        
+        Cada CompNfse é extraído assim que termina de ser lido; o elemento
+        e os irmãos já processados são removidos da árvore, então a memória
+        fica constante independentemente do tamanho da resposta. Com
+        validador, a resposta pode ser sorteada para validação no XSD.
+        
+        Args:
+            fonte: XML em str/bytes ou arquivo binário (ex.: RespostaNfse.abrir())
+            com_tributos: Gerar (nfse, linhas de nf_tributos) na mesma passagem
+        
+        Yields:
+            Dicionário com dados de cada NFSe, na ordem do documento
+        """
+        if isinstance(fonte, str):
+            fonte = fonte.encode('utf-8')
+        if isinstance(fonte, bytes):
+            fonte = io.BytesIO(fonte)
+        
+        data_processamento = datetime.now().strftime('%Y-%m-%d')
+        validar = self.validador is not None and self.validador.sortear()
+        contexto = etree.iterparse(fonte, events=('end',), tag=TAG_COMP_NFSE, huge_tree=True)
+        try:
+            for _, comp_nfse in contexto:
+                nfse = None
+                # Validação antes da poda: a subárvore da nota ainda está completa
+                if not validar or self.validador.validar(comp_nfse):
+                    try:
+                        nfse = self.extrair_nfse(comp_nfse, data_processamento)
+                    except Exception as e:
+                        logger.error(f"Erro ao extrair dados da NFSe: {e}")
+                
+                # Liberar a nota e as anteriores (irmãos já processados)
+                comp_nfse.clear(keep_tail=True)
+                while comp_nfse.getprevious() is not None:
+                    del comp_nfse.getparent()[0]
+                
+                if nfse:
+                    yield (nfse, self.extrair_tributos(nfse)) if com_tributos else nfse
+        finally:
+            del contexto
+    
+    def parse_nfse_response(self, xml_string) -> list:
         """
         Parse XML de resposta da API
         
         Args:
-            xml_string: String XML da resposta
-            
+            xml_string: XML da resposta (str/bytes ou arquivo binário)
+        
         Returns:
             Lista de dicionários com dados das NFSe
         """
-        # TODO: Implementar parse do XML
-        logger.info("Parseando XML de resposta")
-        return []
+        nfses = list(self.iterar_nfse(xml_string))
+        logger.info(f"Processadas {len(nfses)} NFSes")
+        return nfses
     
-    def extrair_nfse(self, nfse_element) -> dict:
+    def extrair_nfse(self, nfse_element, data_processamento: str = None) -> dict:
         """
         Extrai dados de um elemento NFSe
         
+        Percorre o InfNfse uma única vez, descendo só nos ramos que têm
+        colunas mapeadas em CAMPOS_NFSE.
+        
         Args:
-            nfse_element: Elemento XML da NFSe
-            
+            nfse_element: Elemento CompNfse (lxml ou ElementTree)
+            data_processamento: Data da carga (YYYY-MM-DD); padrão hoje
+        
+        Returns:
+            Dicionário com dados extraídos, ou None sem Nfse/InfNfse
+        """
+        nfse = self._filho(nfse_element, 'Nfse')
+        inf_nfse = self._filho(nfse, 'InfNfse') if nfse is not None else None
+        if inf_nfse is None:
+            return None
+        
+        data = dict(self._vazio)
+        invalidos = []
+        self._percorrer(inf_nfse, self._arvore, data, invalidos)
+        for coluna, padrao in self._padroes:
+            if data[coluna] is None:
+                data[coluna] = padrao
+        if invalidos:
+            self._registrar_invalidos(data, invalidos)
+        
+        # Colunas derivadas e metadados de processamento
+        agora = datetime.now()
+        data['status_nfse'] = 'Cancelado' if self._filho(nfse_element, 'NfseCancelamento') is not None else 'Normal'
+        data['valor_iss_retido'] = data['valor_iss'] if data['iss_retido'] else self._zero
+        data['valor_liquido'] = data['valor_liquido_nfse']
+        data['data_processamento'] = data_processamento or agora.strftime('%Y-%m-%d')
+        data['data_criacao'] = agora.isoformat(timespec='seconds')
+        data['origem_consulta'] = self.origem_consulta
+        
+        # Hash da NFSe para controle de duplicatas
+        hash_string = f"{data['numero_nfse']}{data['codigo_verificacao']}{data['data_emissao']}"
+        data['hash_nfse'] = hashlib.sha256(hash_string.encode()).hexdigest()
+        data['id'] = str(uuid.UUID(data['hash_nfse'][:32]))
+        
+        return data
+    
+    def extrair_tributos(self, nfse: dict) -> list:
+        """
+        Linhas de nf_tributos (uma por tributo com valor) de uma NFSe extraída
+        
+        Usa os valores já lidos em extrair_nfse; o XML não é percorrido de novo.
+        
+        Args:
+            nfse: Dicionário retornado por extrair_nfse
+        
         Returns:
-            Dicionário com dados extraídos
+            Lista de dicionários no schema de nf_tributos
         """
-        # TODO: Implementar extração
-        pass
+        tributos = []
+        for tipo, coluna in TRIBUTOS:
+            valor = nfse.get(coluna)
+            if not valor:
+                continue
+            
+            iss = tipo == 'ISS'
+            retido = bool(nfse.get('iss_retido')) if iss else True
+            responsavel = nfse.get('responsavel_retencao')
+            tributos.append({
+                'id': str(uuid.uuid5(uuid.UUID(nfse['id']), tipo)),
+                'hash_nfse': nfse['hash_nfse'],
+                'numero_nfse': nfse['numero_nfse'],
+                'tomador_cpf_cnpj': nfse.get('tomador_cpf_cnpj'),
+                'data_emissao': nfse.get('data_emissao'),
+                'tipo_tributo': tipo,
+                'valor': valor,
+                'base_calculo': nfse.get('base_calculo') if iss else nfse.get('valor_servicos'),
+                'aliquota': nfse.get('aliquota') if iss else None,
+                'retido': retido,
+                'responsavel_retencao': (
+                    RESPONSAVEL_RETENCAO.get(responsavel, 'Tomador') if retido else None
+                ),
+                'observacoes': None,
+                'data_criacao': nfse.get('data_criacao'),
+            })
+        return tributos
+    
+    def _registrar_invalidos(self, data, invalidos):
+        """Anula as colunas com valor inválido (o padrão zero não se aplica) e contabiliza"""
+        for coluna, texto in invalidos:
+            data[coluna] = None
+            self.valores_invalidos[coluna] += 1
+        logger.warning(
+            f"NFSe {data.get('numero_nfse')}: valores inválidos mantidos nulos: "
+            + ', '.join(f"{coluna}={texto!r}" for coluna, texto in invalidos)
+        )
+    
+    def metricas(self) -> dict:
+        """Valores inválidos encontrados por coluna e, com validador, notas validadas no XSD"""
+        metricas = {
+            'valores_invalidos': sum(self.valores_invalidos.values()),
+            'por_coluna': dict(self.valores_invalidos)
+        }
+        if self.validador is not None:
+            metricas['xsd'] = self.validador.metricas()
+        return metricas
+    
+    def _percorrer(self, elemento, no, data, invalidos):
+        """Passagem única: desce só nas tags presentes na árvore do mapeamento"""
+        for filho in elemento:
+            # Comentários têm tag não-string e não casam com nenhuma entrada
+            entrada = no.get(filho.tag)
+            if entrada is None:
+                continue
+            destinos, filhos = entrada
+            if destinos:
+                texto = filho.text
+                for coluna, conversor in destinos:
+                    try:
+                        data[coluna] = conversor(texto)
+                    except ValorMonetarioInvalido:
+                        invalidos.append((coluna, texto))
+            if filhos:
+                self._percorrer(filho, filhos, data, invalidos)
+    
+    @staticmethod
+    def _filho(elemento, nome):
+        """Primeiro filho direto com o nome local informado"""
+        for filho in elemento:
+            tag = filho.tag
+            if isinstance(tag, str) and tag[tag.find('}') + 1:] == nome:
+                return filho
+        return None
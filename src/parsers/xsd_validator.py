@@ -0,0 +1,162 @@
+"""Validação das NFSe recebidas contra os XSDs ABRASF 2.03 (com amostragem e quarentena)"""
+
+import functools
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+from datetime import datetime
+from lxml import etree
+import logging
+
+from src.parsers.xml_parser import NAMESPACE_NFSE
+
+logger = logging.getLogger(__name__)
+
+# XSD versionado no repositório (subconjunto da resposta do ConsultarNfse),
+# resolvido a partir deste arquivo: independe do diretório de trabalho
+XSD_NFSE = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', '..', 'schemas', 'xsd', 'nfse_v2-03.xsd'
+))
+
+# Erros do XSD guardados por nota em quarentena
+MAX_ERROS_QUARENTENA = 20
+
+
+def carregar_schema(caminho: str = XSD_NFSE) -> etree.XMLSchema:
+    """
+    XMLSchema compilado, uma vez por processo e arquivo
+    
+    Args:
+        caminho: Arquivo XSD (os includes/imports são resolvidos a partir dele)
+    """
+    return _compilar_schema(os.path.abspath(caminho))
+
+
+@functools.lru_cache(maxsize=None)
+def _compilar_schema(caminho: str) -> etree.XMLSchema:
+    logger.info(f"Compilando XSD {caminho}")
+    return etree.XMLSchema(etree.parse(caminho))
+
+
+class NfseXsdValidator:
+    """
+    Valida cada CompNfse de uma resposta contra o XSD
+    
+    A validação é por nota, durante o iterparse (antes da poda da árvore),
+    então a memória continua constante. Para limitar o custo em produção,
+    sortear() escolhe quais respostas validar: uma a cada N ou uma fração
+    aleatória. Notas inválidas vão para o diretório de quarentena (XML da
+    nota + JSON com os erros) e não seguem para a carga.
+    """
+    
+    def __init__(self, quarentena: str, caminho_xsd: str = XSD_NFSE, amostra_cada: int = 1,
+                 fracao: float = None, semente: int = None):
+        """
+        Args:
+            quarentena: Diretório das notas reprovadas
+            caminho_xsd: Arquivo XSD
+            amostra_cada: Validar uma resposta a cada N (1 = todas)
+            fracao: Validar esta fração aleatória das respostas (substitui amostra_cada)
+            semente: Semente do sorteio (reprodutibilidade)
+        """
+        self.quarentena = quarentena
+        self.caminho_xsd = caminho_xsd
+        self.amostra_cada = max(1, int(amostra_cada or 1))
+        self.fracao = fracao
+        self.schema = carregar_schema(caminho_xsd)
+        self._aleatorio = random.Random(semente)
+        # XMLSchema guarda o error_log da última validação: uma por vez
+        self._lock = threading.Lock()
+        # Reprovadas por thread: cada janela é parseada inteira na mesma thread
+        self._por_thread = threading.local()
+        
+        self.respostas = 0
+        self.respostas_validadas = 0
+        self.notas_validadas = 0
+        self.notas_invalidas = 0
+    
+    def sortear(self) -> bool:
+        """Conta uma resposta e decide se ela será validada"""
+        with self._lock:
+            self.respostas += 1
+            if self.fracao is not None:
+                validar = self._aleatorio.random() < self.fracao
+            else:
+                validar = (self.respostas - 1) % self.amostra_cada == 0
+            if validar:
+                self.respostas_validadas += 1
+        return validar
+    
+    def validar(self, comp_nfse) -> bool:
+        """
+        Valida um CompNfse; reprovado vai para a quarentena
+        
+        Args:
+            comp_nfse: Elemento CompNfse (lxml), ainda com a subárvore completa
+        
+        Returns:
+            True se a nota é válida
+        """
+        with self._lock:
+            valido = self.schema.validate(comp_nfse)
+            erros = [] if valido else [
+                f"linha {erro.line}: {erro.message}" for erro in self.schema.error_log
+            ]
+            self.notas_validadas += 1
+            if not valido:
+                self.notas_invalidas += 1
+        
+        if not valido:
+            self._por_thread.invalidas = self.invalidas_nesta_thread() + 1
+            self.colocar_em_quarentena(comp_nfse, erros)
+        return valido
+    
+    def invalidas_nesta_thread(self) -> int:
+        """
+        Notas reprovadas pela thread atual desde o início
+        
+        A diferença antes/depois de parsear uma janela dá as notas dela que
+        foram para a quarentena, mesmo com várias janelas em paralelo.
+        """
+        return getattr(self._por_thread, 'invalidas', 0)
+    
+    def colocar_em_quarentena(self, comp_nfse, erros: list) -> str:
+        """
+        Grava a nota e os erros no diretório de quarentena
+        
+        O nome vem do número da nota e do hash do XML, então a mesma nota
+        reprovada de novo sobrescreve o próprio arquivo.
+        
+        Returns:
+            Caminho do XML gravado
+        """
+        xml = etree.tostring(comp_nfse, encoding='utf-8')
+        numero = comp_nfse.findtext(f'.//{{{NAMESPACE_NFSE}}}Numero') or 'sem_numero'
+        nome = f"{re.sub(r'[^0-9A-Za-z_-]', '_', numero.strip())[:40]}_{hashlib.sha1(xml).hexdigest()[:12]}"
+        
+        os.makedirs(self.quarentena, exist_ok=True)
+        caminho = os.path.join(self.quarentena, nome + '.xml')
+        with open(caminho, 'wb') as arquivo:
+            arquivo.write(xml)
+        with open(os.path.join(self.quarentena, nome + '.json'), 'w', encoding='utf-8') as arquivo:
+            json.dump({
+                'numero_nfse': numero,
+                'xsd': os.path.basename(self.caminho_xsd),
+                'data': datetime.now().isoformat(timespec='seconds'),
+                'erros': erros[:MAX_ERROS_QUARENTENA]
+            }, arquivo, ensure_ascii=False, indent=2)
+        
+        logger.warning(f"NFSe {numero} reprovada no XSD, em quarentena: {caminho} ({erros[0] if erros else ''})")
+        return caminho
+    
+    def metricas(self) -> dict:
+        """Respostas amostradas e notas validadas/reprovadas"""
+        return {
+            'respostas': self.respostas,
+            'respostas_validadas': self.respostas_validadas,
+            'notas_validadas': self.notas_validadas,
+            'notas_em_quarentena': self.notas_invalidas
+        }
@@ -1,32 +1,266 @@
 """Loader para Google BigQuery"""
 
+import io
+import json
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from google.api_core.exceptions import NotFound
 from google.cloud import bigquery
 import logging
 
+from src.parsers.nfse_batch import NfseBatch
+from src.storage.sink import NfseSink
+
 logger = logging.getLogger(__name__)
 
+# Tabela de staging some sozinha se a remoção no fim da carga falhar
+STAGING_EXPIRACAO_HORAS = 1
+
+# Tipo de armazenamento do NfseBatch -> tipo da coluna no BigQuery
+TIPOS_BIGQUERY = {
+    'unico': 'STRING',
+    'texto': 'STRING',
+    'valor': 'NUMERIC',
+    'aliquota': 'NUMERIC',
+    'data': 'DATE',
+    'data_hora': 'TIMESTAMP',
+    'sim_nao': 'BOOLEAN',
+}
+
+FORMATOS_CARGA = {
+    'parquet': bigquery.SourceFormat.PARQUET,
+    'ndjson': bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+}
+
+
+def schema_de_json(caminho: str) -> list:
+    """Schema versionado (JSON no formato da API do BigQuery) como SchemaFields"""
+    with open(caminho, encoding='utf-8') as arquivo:
+        return [bigquery.SchemaField.from_api_repr(campo) for campo in json.load(arquivo)]
+
+
+def schema_do_lote(lote) -> list:
+    """SchemaFields com as colunas e tipos de um NfseBatch (mesma ordem)"""
+    return [bigquery.SchemaField(coluna, TIPOS_BIGQUERY[tipo]) for coluna, tipo in lote.tipos.items()]
+
 
-class BigQueryLoader:
+def preparar_linhas(registros, schema, chave: str) -> list:
+    """
+    Linhas prontas para carga: só colunas do schema, uma por chave
+    
+    Colunas DATE recebem só a data de valores com hora; Decimal vira texto
+    (NUMERIC exato). Registros repetidos no lote (mesma chave) entram uma
+    vez, na primeira ocorrência.
+    
+    Args:
+        registros: Dicionários (extrair_nfse, extrair_tributos)
+        schema: SchemaFields da tabela de destino
+        chave: Coluna que identifica o registro
+    """
+    tipos = {campo.name: campo.field_type for campo in schema}
+    linhas = {}
+    for registro in registros:
+        valor_chave = registro.get(chave)
+        if valor_chave in linhas:
+            continue
+        linha = {}
+        for coluna, tipo in tipos.items():
+            valor = registro.get(coluna)
+            if isinstance(valor, Decimal):
+                valor = str(valor)
+            elif tipo == 'DATE' and isinstance(valor, str):
+                valor = valor[:10]
+            linha[coluna] = valor
+        linhas[valor_chave] = linha
+    return list(linhas.values())
+
+
+class BigQueryLoader(NfseSink):
     """Gerenciador de carregamento no BigQuery"""
     
-    def __init__(self, config):
+    def __init__(self, config, client=None):
         """
         Inicializa cliente BigQuery
         
         Args:
-            config: Dicionário com configurações
+            config: Dicionário com configurações (formato do config.yaml)
+            client: bigquery.Client já criado (padrão: criado no primeiro uso)
         """
         self.config = config
-        # TODO: Inicializar cliente BigQuery
-        pass
+        self._client = client
+        self._schemas = {}
+        self.jobs = 0
+    
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = bigquery.Client(project=self.config.get('gcp', {}).get('project_id'))
+        return self._client
+    
+    def garantir_tabela(self, table_id: str, schema: list) -> list:
+        """
+        Cria a tabela com o schema se ela não existir
+        
+        Returns:
+            Schema da tabela existente (ou do recém-criado)
+        """
+        if table_id not in self._schemas:
+            try:
+                tabela = self.client.get_table(table_id)
+            except NotFound:
+                tabela = self.client.create_table(bigquery.Table(table_id, schema=schema))
+                logger.info(f"Tabela {table_id} criada")
+            self._schemas[table_id] = list(tabela.schema)
+        return self._schemas[table_id]
     
-    def inserir_nfse_batch(self, nfse_list: list):
+    def mesclar(self, table_id: str, registros, chave: str) -> int:
         """
-        Insere lote de NFSe no BigQuery
+        Insere os registros cuja chave ainda não existe na tabela
+        
+        O lote vai uma vez para uma tabela de staging (load job) e entra no
+        destino por um único MERGE ... ON chave: dois jobs por chamada,
+        qualquer que seja o tamanho do lote, sem varrer a tabela por nota.
+        A staging é removida no fim (e expira sozinha se a remoção falhar).
+        
+        Args:
+            table_id: projeto.dataset.tabela de destino (já existente)
+            registros: Dicionários com as colunas da tabela
+            chave: Coluna de deduplicação (ex.: hash_nfse)
+        
+        Returns:
+            Quantidade de linhas inseridas
+        """
+        schema = self._schemas.get(table_id) or list(self.client.get_table(table_id).schema)
+        linhas = preparar_linhas(registros, schema, chave)
+        if not linhas:
+            return 0
+        
+        staging_id = f"{table_id}__staging_{uuid.uuid4().hex[:12]}"
+        staging = bigquery.Table(staging_id, schema=schema)
+        staging.expires = datetime.now(timezone.utc) + timedelta(hours=STAGING_EXPIRACAO_HORAS)
+        self.client.create_table(staging)
+        try:
+            carga = self.client.load_table_from_json(
+                linhas, staging_id,
+                job_config=bigquery.LoadJobConfig(
+                    schema=schema,
+                    write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+                    ignore_unknown_values=True
+                )
+            )
+            carga.result()
+            
+            colunas = ', '.join(f"`{campo.name}`" for campo in schema)
+            valores = ', '.join(f"S.`{campo.name}`" for campo in schema)
+            merge = self.client.query(f"""
+                MERGE `{table_id}` T
+                USING `{staging_id}` S
+                ON T.`{chave}` = S.`{chave}`
+                WHEN NOT MATCHED THEN
+                  INSERT ({colunas}) VALUES ({valores})
+            """)
+            merge.result()
+            self.jobs += 2
+        finally:
+            self.client.delete_table(staging_id, not_found_ok=True)
+        
+        inseridas = merge.num_dml_affected_rows or 0
+        logger.info(f"{table_id}: {inseridas} inseridas de {len(linhas)} no lote (MERGE por {chave})")
+        return inseridas
+    
+    def iterar_chaves(self, table_id: str, chave: str):
+        """Valores distintos da chave na tabela, lidos página a página (uma consulta)"""
+        try:
+            linhas = self.client.query(f"SELECT DISTINCT `{chave}` FROM `{table_id}`").result(page_size=50000)
+        except NotFound:
+            return
+        self.jobs += 1
+        for linha in linhas:
+            yield linha[0]
+    
+    def inserir_nfse_batch(self, nfse_list: list, table_id: str, formato: str = None) -> dict:
+        """
+        Insere lote de NFSe no BigQuery por load jobs de arquivo
+        
+        Cada grupo de processamento.lote_tamanho notas vira um NfseBatch,
+        serializado em memória (Parquet ou NDJSON) e enviado num load job
+        WRITE_APPEND; até bigquery.jobs_simultaneos jobs ficam em andamento
+        enquanto os próximos grupos são serializados, e cada um é consultado
+        a cada bigquery.intervalo_consulta_segundos até terminar. A tabela é
+        criada com as colunas do lote se não existir; colunas do arquivo que
+        a tabela não tem são ignoradas. Só acrescenta: não há deduplicação
+        contra a tabela (para isso use mesclar, como a integração).
         
         Args:
-            nfse_list: Lista de dicionários com dados das NFSe
+            nfse_list: Dicionários de NfseXmlParser.extrair_nfse
+            table_id: projeto.dataset.tabela de destino
+            formato: 'parquet' ou 'ndjson' (padrão: bigquery.formato_carga)
+        
+        Returns:
+            Resumo: formato, linhas, jobs e bytes dos arquivos
+        
+        Raises:
+            ValueError: Formato desconhecido
+            google.api_core.exceptions.GoogleAPICallError: Load job com erro
         """
-        # TODO: Implementar insert batch
-        logger.info(f"Inserindo {len(nfse_list)} NFSe no BigQuery")
-        pass
+        opcoes = self.config.get('bigquery', {})
+        tamanho = self.config.get('processamento', {}).get('lote_tamanho', 100)
+        formato = formato or opcoes.get('formato_carga', 'parquet')
+        if formato not in FORMATOS_CARGA:
+            raise ValueError(f"Formato de carga desconhecido: {formato} (use {', '.join(FORMATOS_CARGA)})")
+        
+        resumo = {'formato': formato, 'linhas': 0, 'jobs': 0, 'bytes': 0}
+        pendentes = deque()
+        maximo_pendentes = max(1, opcoes.get('jobs_simultaneos', 4))
+        
+        for inicio in range(0, len(nfse_list), tamanho):
+            lote = NfseBatch.de_registros(nfse_list[inicio:inicio + tamanho])
+            if table_id not in self._schemas:
+                self.garantir_tabela(table_id, schema_do_lote(lote))
+            
+            arquivo = io.BytesIO()
+            if formato == 'parquet':
+                lote.gravar_parquet(arquivo, compressao=opcoes.get('compressao_parquet', 'snappy'))
+            else:
+                lote.gravar_ndjson(arquivo)
+            tamanho_arquivo = arquivo.tell()
+            arquivo.seek(0)
+            
+            job = self.client.load_table_from_file(
+                arquivo, table_id, size=tamanho_arquivo,
+                job_config=bigquery.LoadJobConfig(
+                    source_format=FORMATOS_CARGA[formato],
+                    write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+                    ignore_unknown_values=True
+                )
+            )
+            pendentes.append(job)
+            resumo['jobs'] += 1
+            resumo['bytes'] += tamanho_arquivo
+            self.jobs += 1
+            while len(pendentes) >= maximo_pendentes:
+                resumo['linhas'] += self._aguardar_job(pendentes.popleft())
+        
+        while pendentes:
+            resumo['linhas'] += self._aguardar_job(pendentes.popleft())
+        
+        logger.info(
+            f"{table_id}: {resumo['linhas']} de {len(nfse_list)} NFSe carregadas "
+            f"({formato}, {resumo['jobs']} jobs, {resumo['bytes']} bytes)"
+        )
+        return resumo
+    
+    def _aguardar_job(self, job) -> int:
+        """Consulta o load job até terminar; retorna as linhas carregadas"""
+        intervalo = self.config.get('bigquery', {}).get('intervalo_consulta_segundos', 1.0)
+        while not job.done():
+            time.sleep(intervalo)
+        if job.error_result:
+            for erro in job.errors or [job.error_result]:
+                logger.error(f"Load job {job.job_id}: {erro.get('message')}")
+        job.result()
+        return job.output_rows or 0
@@ -0,0 +1,226 @@
+"""Índice local dos hash_nfse já carregados (SQLite + filtro de Bloom em memória)"""
+
+import hashlib
+import itertools
+import math
+import os
+import sqlite3
+import threading
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Chaves por consulta IN (...) ao SQLite (abaixo do limite de parâmetros)
+BLOCO_CONSULTA = 500
+
+# Linhas lidas/gravadas por vez ao montar o filtro e ao reconstruir o índice
+BLOCO_LEITURA = 50000
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom num array de bits NumPy
+    
+    Sem falsos negativos: chave que o filtro não contém nunca foi
+    adicionada. Falsos positivos ficam perto de taxa_falso_positivo enquanto
+    o número de chaves não passa da capacidade. As k posições de cada chave
+    saem de um único BLAKE2b de 128 bits (hashing duplo).
+    """
+    
+    def __init__(self, capacidade: int, taxa_falso_positivo: float = 0.01):
+        """
+        Args:
+            capacidade: Chaves previstas
+            taxa_falso_positivo: Fração de chaves ausentes apontadas como presentes
+        """
+        self.capacidade = max(1, int(capacidade))
+        self.taxa_falso_positivo = taxa_falso_positivo
+        self.bits = max(64, math.ceil(-self.capacidade * math.log(taxa_falso_positivo) / math.log(2) ** 2))
+        self.funcoes = max(1, round(self.bits / self.capacidade * math.log(2)))
+        self._array = np.zeros((self.bits + 7) // 8, dtype=np.uint8)
+        self._tamanho = 0
+    
+    def __len__(self):
+        return self._tamanho
+    
+    def _posicoes(self, chaves: list) -> np.ndarray:
+        """Matriz (chaves x funcoes) com a posição de cada bit"""
+        digests = b''.join(hashlib.blake2b(chave.encode('utf-8'), digest_size=16).digest() for chave in chaves)
+        pares = np.frombuffer(digests, dtype='<u8').reshape(-1, 2)
+        passos = np.arange(self.funcoes, dtype=np.uint64)
+        return (pares[:, :1] + passos * (pares[:, 1:] | np.uint64(1))) % np.uint64(self.bits)
+    
+    def adicionar(self, chaves):
+        """Adiciona chaves (textos) ao filtro"""
+        chaves = list(chaves)
+        if not chaves:
+            return
+        posicoes = self._posicoes(chaves).ravel()
+        np.bitwise_or.at(self._array, posicoes >> np.uint64(3), (1 << (posicoes & np.uint64(7))).astype(np.uint8))
+        self._tamanho += len(chaves)
+    
+    def contem(self, chaves) -> np.ndarray:
+        """
+        Returns:
+            Array bool por chave: False = certamente ausente, True = talvez presente
+        """
+        chaves = list(chaves)
+        if not chaves:
+            return np.zeros(0, dtype=bool)
+        posicoes = self._posicoes(chaves)
+        bits = (self._array[posicoes >> np.uint64(3)] >> (posicoes & np.uint64(7)).astype(np.uint8)) & 1
+        return bits.all(axis=1)
+    
+    def bytes_memoria(self) -> int:
+        return self._array.nbytes
+
+
+class HashNfseIndex:
+    """
+    hash_nfse já carregados no destino, consultados antes de montar as cargas
+    
+    As chaves ficam numa tabela SQLite (chave primária, sem rowid) e um
+    filtro de Bloom montado a partir dela na abertura fica na frente: notas
+    que o filtro não contém são novas sem ir ao disco; só as apontadas como
+    talvez carregadas são confirmadas no SQLite, BLOCO_CONSULTA por consulta.
+    Hashes entram no índice só depois da carga confirmada (registrar), então
+    o índice nunca esconde uma nota que não chegou ao destino; se o destino
+    perder dados, reconstruir a partir das chaves que ele tem.
+    """
+    
+    def __init__(self, caminho: str = ':memory:', capacidade: int = 100000, taxa_falso_positivo: float = 0.01):
+        """
+        Args:
+            caminho: Arquivo SQLite (':memory:' para não persistir)
+            capacidade: Tamanho mínimo do filtro (cresce com o índice)
+            taxa_falso_positivo: Taxa alvo do filtro de Bloom
+        """
+        if caminho != ':memory:':
+            os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        self.capacidade = capacidade
+        self.taxa_falso_positivo = taxa_falso_positivo
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS hashes (hash_nfse TEXT PRIMARY KEY) WITHOUT ROWID")
+        self._conn.commit()
+        
+        self.consultadas = 0
+        self.ja_carregadas = 0
+        self.consultas_disco = 0
+        self.falsos_positivos = 0
+        self.lotes = 0
+        self.lotes_evitados = 0
+        
+        with self._lock:
+            self._montar_filtro()
+    
+    def _montar_filtro(self):
+        """Filtro com folga para o dobro do índice atual, a partir do arquivo"""
+        total = self._conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+        self._filtro = BloomFilter(max(self.capacidade, 2 * total), self.taxa_falso_positivo)
+        cursor = self._conn.execute("SELECT hash_nfse FROM hashes")
+        while True:
+            linhas = cursor.fetchmany(BLOCO_LEITURA)
+            if not linhas:
+                break
+            self._filtro.adicionar(linha[0] for linha in linhas)
+    
+    def contar(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+    
+    def filtrar_novas(self, nfses: list, chave: str = 'hash_nfse') -> list:
+        """
+        NFSes cujo hash ainda não está no índice, na ordem recebida
+        
+        Notas sem hash são mantidas (o destino decide).
+        
+        Args:
+            nfses: Dicionários de NfseXmlParser.extrair_nfse
+            chave: Campo com o hash
+        """
+        if not nfses:
+            return []
+        hashes = [nfse.get(chave) for nfse in nfses]
+        
+        with self._lock:
+            talvez = self._filtro.contem(h or '' for h in hashes)
+            candidatos = list(dict.fromkeys(h for h, t in zip(hashes, talvez) if t and h))
+            carregados = set()
+            for inicio in range(0, len(candidatos), BLOCO_CONSULTA):
+                bloco = candidatos[inicio:inicio + BLOCO_CONSULTA]
+                carregados.update(linha[0] for linha in self._conn.execute(
+                    f"SELECT hash_nfse FROM hashes WHERE hash_nfse IN ({', '.join('?' * len(bloco))})", bloco
+                ))
+            
+            novas = [nfse for nfse, h in zip(nfses, hashes) if h not in carregados]
+            self.consultadas += len(nfses)
+            self.ja_carregadas += len(nfses) - len(novas)
+            self.consultas_disco += len(candidatos)
+            self.falsos_positivos += len(candidatos) - len(carregados)
+            self.lotes += 1
+            if not novas:
+                self.lotes_evitados += 1
+        return novas
+    
+    def registrar(self, hashes):
+        """Marca hashes como carregados (chamar só depois da carga confirmada)"""
+        hashes = [h for h in dict.fromkeys(hashes) if h]
+        if not hashes:
+            return
+        with self._lock:
+            with self._conn:
+                antes = self._conn.total_changes
+                self._conn.executemany("INSERT OR IGNORE INTO hashes VALUES (?)", ((h,) for h in hashes))
+                inseridos = self._conn.total_changes - antes
+            if len(self._filtro) + inseridos > self._filtro.capacidade:
+                self._montar_filtro()
+            else:
+                self._filtro.adicionar(hashes)
+    
+    def reconstruir(self, hashes) -> int:
+        """
+        Substitui o índice pelas chaves que estão no destino
+        
+        A troca é uma transação: se a leitura do destino falhar, o índice
+        anterior continua valendo.
+        
+        Args:
+            hashes: Iterável com todos os hash_nfse do destino (ex.: NfseSink.iterar_chaves)
+        
+        Returns:
+            Hashes no índice reconstruído
+        """
+        iterador = iter(hashes)
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM hashes")
+                while True:
+                    bloco = list(itertools.islice(iterador, BLOCO_LEITURA))
+                    if not bloco:
+                        break
+                    self._conn.executemany("INSERT OR IGNORE INTO hashes VALUES (?)", ((h,) for h in bloco if h))
+            self._montar_filtro()
+            total = self._conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+        
+        logger.info(f"Índice hash_nfse reconstruído a partir do destino: {total} hashes")
+        return total
+    
+    def metricas(self) -> dict:
+        """Acertos do índice e trabalho evitado no destino"""
+        return {
+            'consultadas': self.consultadas,
+            'ja_carregadas': self.ja_carregadas,
+            'taxa_acerto': round(self.ja_carregadas / self.consultadas, 3) if self.consultadas else 0.0,
+            'consultas_disco': self.consultas_disco,
+            'falsos_positivos': self.falsos_positivos,
+            'lotes_evitados': self.lotes_evitados,
+            'lotes': self.lotes,
+            'indexadas': self.contar(),
+            'filtro_kb': round(self._filtro.bytes_memoria() / 1024, 1),
+        }
+    
+    def fechar(self):
+        self._conn.close()
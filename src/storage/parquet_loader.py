@@ -0,0 +1,175 @@
+"""Destino local em Parquet, particionado pelo mês de data_emissao"""
+
+import glob
+import os
+import threading
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+import logging
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.storage.bigquery_loader import preparar_linhas
+from src.storage.sink import NfseSink
+
+logger = logging.getLogger(__name__)
+
+# Tipo do BigQuery -> tipo Arrow (NUMERIC com a precisão e escala do BigQuery)
+TIPOS_ARROW = {
+    'STRING': pa.string(),
+    'NUMERIC': pa.decimal128(38, 9),
+    'BIGNUMERIC': pa.decimal256(76, 38),
+    'FLOAT': pa.float64(),
+    'FLOAT64': pa.float64(),
+    'INTEGER': pa.int64(),
+    'INT64': pa.int64(),
+    'BOOLEAN': pa.bool_(),
+    'BOOL': pa.bool_(),
+    'DATE': pa.date32(),
+    'TIMESTAMP': pa.timestamp('us', tz='UTC'),
+    'DATETIME': pa.timestamp('us'),
+}
+
+# Partição das linhas sem data na coluna de partição
+SEM_DATA = 'sem_data'
+
+
+def _valor_arrow(valor, tipo):
+    if valor is None:
+        return None
+    if tipo in ('NUMERIC', 'BIGNUMERIC'):
+        return Decimal(str(valor))
+    if tipo == 'DATE':
+        return date.fromisoformat(valor[:10]) if isinstance(valor, str) else valor
+    if tipo in ('TIMESTAMP', 'DATETIME'):
+        momento = datetime.fromisoformat(valor) if isinstance(valor, str) else valor
+        if tipo == 'DATETIME':
+            return momento.replace(tzinfo=None)
+        # Sem fuso: tratado como UTC (como o BigQuery)
+        if momento.tzinfo is None:
+            return momento.replace(tzinfo=timezone.utc)
+        return momento.astimezone(timezone.utc)
+    if tipo in ('BOOLEAN', 'BOOL'):
+        return bool(valor)
+    if tipo in ('INTEGER', 'INT64'):
+        return int(valor)
+    if tipo in ('FLOAT', 'FLOAT64'):
+        return float(valor)
+    return valor if isinstance(valor, str) else str(valor)
+
+
+def _mes(valor) -> str:
+    """AAAA-MM de uma data/data-hora (texto ISO ou objeto)"""
+    if not valor:
+        return SEM_DATA
+    return valor[:7] if isinstance(valor, str) else valor.strftime('%Y-%m')
+
+
+class ParquetLoader(NfseSink):
+    """
+    Espelho local das tabelas em arquivos Parquet
+    
+    Cada tabela é um diretório com partições Hive pelo mês da coluna de
+    partição (ex.: nfse_campinas/data_emissao_mes=2024-05/part-....parquet),
+    legível por pyarrow.dataset, DuckDB ou uma tabela externa do BigQuery.
+    Cada chamada a mesclar grava um arquivo por mês presente no lote, só
+    com as chaves que o diretório ainda não tem; as chaves existentes são
+    lidas dos arquivos no primeiro uso e mantidas em memória.
+    """
+    
+    def __init__(self, diretorio: str = 'data/parquet', coluna_particao: str = 'data_emissao'):
+        """
+        Args:
+            diretorio: Raiz das tabelas
+            coluna_particao: Coluna cujo mês define a partição (tabelas sem
+                ela ficam sem partição)
+        """
+        self.diretorio = diretorio
+        self.coluna_particao = coluna_particao
+        self._lock = threading.Lock()
+        self._schemas = {}
+        self._chaves = {}
+        self.jobs = 0
+    
+    def _diretorio_tabela(self, table_id: str) -> str:
+        return os.path.join(self.diretorio, table_id.rsplit('.', 1)[-1])
+    
+    def garantir_tabela(self, table_id: str, schema: list) -> list:
+        """Cria o diretório da tabela e registra o schema (SchemaFields)"""
+        if table_id not in self._schemas:
+            os.makedirs(self._diretorio_tabela(table_id), exist_ok=True)
+            self._schemas[table_id] = list(schema)
+        return self._schemas[table_id]
+    
+    def _chaves_existentes(self, table_id: str, chave: str) -> set:
+        """Chaves já gravadas na tabela (lidas dos arquivos uma vez)"""
+        if (table_id, chave) not in self._chaves:
+            diretorio = self._diretorio_tabela(table_id)
+            chaves = set()
+            if glob.glob(os.path.join(diretorio, '**', '*.parquet'), recursive=True):
+                chaves.update(pq.read_table(diretorio, columns=[chave]).column(chave).to_pylist())
+            self._chaves[(table_id, chave)] = chaves
+        return self._chaves[(table_id, chave)]
+    
+    def mesclar(self, table_id: str, registros, chave: str) -> int:
+        """
+        Insere os registros cuja chave ainda não existe na tabela
+        
+        Returns:
+            Quantidade de linhas inseridas
+        """
+        schema = self._schemas[table_id]
+        linhas = preparar_linhas(registros, schema, chave)
+        if not linhas:
+            return 0
+        
+        tipos = [(campo.name, campo.field_type) for campo in schema]
+        schema_arrow = pa.schema([(nome, TIPOS_ARROW.get(tipo, pa.string())) for nome, tipo in tipos])
+        particionar = self.coluna_particao in dict(tipos)
+        
+        with self._lock:
+            existentes = self._chaves_existentes(table_id, chave)
+            novas = [linha for linha in linhas if linha[chave] not in existentes]
+            
+            particoes = {}
+            for linha in novas:
+                mes = _mes(linha.get(self.coluna_particao)) if particionar else None
+                particoes.setdefault(mes, []).append(linha)
+            
+            for mes, grupo in particoes.items():
+                diretorio = self._diretorio_tabela(table_id)
+                if mes is not None:
+                    diretorio = os.path.join(diretorio, f"{self.coluna_particao}_mes={mes}")
+                os.makedirs(diretorio, exist_ok=True)
+                
+                tabela = pa.Table.from_pylist(
+                    [{nome: _valor_arrow(linha[nome], tipo) for nome, tipo in tipos} for linha in grupo],
+                    schema=schema_arrow
+                )
+                # Arquivo aparece completo: leitores ignoram nomes iniciados por ponto
+                nome = f"part-{uuid.uuid4().hex}.parquet"
+                temporario = os.path.join(diretorio, f".{nome}.tmp")
+                pq.write_table(tabela, temporario)
+                os.replace(temporario, os.path.join(diretorio, nome))
+                self.jobs += 1
+            
+            existentes.update(linha[chave] for linha in novas)
+        
+        logger.info(
+            f"{table_id}: {len(novas)} inseridas de {len(linhas)} no lote "
+            f"({len(particoes)} arquivos Parquet, chave {chave})"
+        )
+        return len(novas)
+    
+    def iterar_chaves(self, table_id: str, chave: str):
+        """Valores distintos da chave nos arquivos da tabela (relidos; só a coluna é lida)"""
+        with self._lock:
+            self._chaves.pop((table_id, chave), None)
+            chaves = set(self._chaves_existentes(table_id, chave))
+        yield from chaves
+    
+    def ler(self, table_id: str, colunas: list = None):
+        """Tabela inteira (ou só as colunas pedidas) como pyarrow.Table, para conferência"""
+        return pq.read_table(self._diretorio_tabela(table_id), columns=colunas)
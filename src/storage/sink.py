@@ -0,0 +1,77 @@
+"""Destino das cargas de NFSe: interface comum e escolha pelo config.yaml"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+DESTINOS = ('bigquery', 'parquet', 'sqlite')
+
+
+class NfseSink:
+    """
+    Interface do destino das cargas (BigQuery, Parquet local ou SQLite)
+    
+    Tabelas são identificadas por projeto.dataset.tabela e descritas por
+    SchemaFields do BigQuery em todos os destinos, então o pipeline não
+    muda com o destino escolhido.
+    """
+    
+    def garantir_tabela(self, table_id: str, schema: list) -> list:
+        """
+        Cria a tabela com o schema se ela não existir
+        
+        Returns:
+            Schema da tabela existente (ou do recém-criado)
+        """
+        raise NotImplementedError
+    
+    def mesclar(self, table_id: str, registros, chave: str) -> int:
+        """
+        Insere os registros cuja chave ainda não existe na tabela
+        
+        Returns:
+            Quantidade de linhas inseridas
+        """
+        raise NotImplementedError
+    
+    def iterar_chaves(self, table_id: str, chave: str):
+        """
+        Valores distintos da chave já gravados (tabela inexistente: nenhum)
+        
+        Yields:
+            Um valor por registro carregado (ex.: hash_nfse)
+        """
+        raise NotImplementedError
+    
+    def fechar(self):
+        """Libera conexões e arquivos abertos"""
+
+
+def criar_sink(config: dict, client=None) -> NfseSink:
+    """
+    Monta o destino das cargas a partir do config.yaml
+    
+    Args:
+        config: Configuração completa (usa armazenamento, gcp e bigquery)
+        client: bigquery.Client já criado (só para o destino bigquery)
+    
+    Raises:
+        ValueError: Destino desconhecido
+    """
+    secao = config.get('armazenamento', {})
+    destino = secao.get('destino', 'bigquery')
+    
+    if destino == 'bigquery':
+        from src.storage.bigquery_loader import BigQueryLoader
+        sink = BigQueryLoader(config, client=client)
+    elif destino == 'parquet':
+        from src.storage.parquet_loader import ParquetLoader
+        sink = ParquetLoader(secao.get('diretorio_parquet', 'data/parquet'))
+    elif destino == 'sqlite':
+        from src.storage.sqlite_loader import SqliteLoader
+        sink = SqliteLoader(secao.get('caminho_sqlite', 'data/nfse.sqlite3'))
+    else:
+        raise ValueError(f"Destino de armazenamento desconhecido: {destino} (use {', '.join(DESTINOS)})")
+    
+    logger.info(f"Destino das cargas: {destino}")
+    return sink
@@ -0,0 +1,137 @@
+"""Equivalente local do BigQueryLoader em SQLite (desenvolvimento e testes offline)"""
+
+import os
+import sqlite3
+import threading
+import logging
+
+from src.storage.bigquery_loader import preparar_linhas
+from src.storage.sink import NfseSink
+
+logger = logging.getLogger(__name__)
+
+# Tipo do BigQuery -> afinidade SQLite (NUMERIC como texto para não perder exatidão)
+TIPOS_SQLITE = {
+    'STRING': 'TEXT',
+    'NUMERIC': 'TEXT',
+    'BIGNUMERIC': 'TEXT',
+    'FLOAT': 'REAL',
+    'FLOAT64': 'REAL',
+    'INTEGER': 'INTEGER',
+    'INT64': 'INTEGER',
+    'BOOLEAN': 'INTEGER',
+    'BOOL': 'INTEGER',
+}
+
+
+def _nome_tabela(table_id: str) -> str:
+    """projeto.dataset.tabela -> tabela"""
+    return table_id.rsplit('.', 1)[-1]
+
+
+def _valor_sqlite(valor, tipo):
+    if valor is None:
+        return None
+    if tipo in ('NUMERIC', 'BIGNUMERIC'):
+        return str(valor)
+    if isinstance(valor, (dict, list)):
+        return str(valor)
+    return valor
+
+
+class SqliteLoader(NfseSink):
+    """
+    Mesma interface de carga do BigQueryLoader (garantir_tabela, mesclar)
+    
+    O lote é gravado numa tabela temporária e entra no destino por um
+    único INSERT ... SELECT ... WHERE NOT EXISTS na chave, o equivalente
+    local do MERGE do BigQuery.
+    """
+    
+    def __init__(self, caminho: str = ':memory:'):
+        """
+        Args:
+            caminho: Arquivo SQLite (':memory:' para não persistir)
+        """
+        if caminho != ':memory:':
+            os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._schemas = {}
+        self._indices = set()
+        self.jobs = 0
+    
+    def garantir_tabela(self, table_id: str, schema: list) -> list:
+        """Cria a tabela com o schema (SchemaFields) se ela não existir"""
+        tabela = _nome_tabela(table_id)
+        if table_id not in self._schemas:
+            colunas = ', '.join(
+                f'"{campo.name}" {TIPOS_SQLITE.get(campo.field_type, "TEXT")}' for campo in schema
+            )
+            with self._lock, self._conn:
+                self._conn.execute(f'CREATE TABLE IF NOT EXISTS "{tabela}" ({colunas})')
+            self._schemas[table_id] = list(schema)
+        return self._schemas[table_id]
+    
+    def mesclar(self, table_id: str, registros, chave: str) -> int:
+        """
+        Insere os registros cuja chave ainda não existe na tabela
+        
+        Returns:
+            Quantidade de linhas inseridas
+        """
+        schema = self._schemas[table_id]
+        linhas = preparar_linhas(registros, schema, chave)
+        if not linhas:
+            return 0
+        
+        tabela = _nome_tabela(table_id)
+        nomes = [campo.name for campo in schema]
+        colunas = ', '.join(f'"{nome}"' for nome in nomes)
+        with self._lock, self._conn:
+            if (tabela, chave) not in self._indices:
+                self._conn.execute(f'CREATE INDEX IF NOT EXISTS "ix_{tabela}_{chave}" ON "{tabela}" ("{chave}")')
+                self._indices.add((tabela, chave))
+            
+            self._conn.execute(f'CREATE TEMP TABLE staging AS SELECT * FROM "{tabela}" WHERE 0')
+            try:
+                self._conn.executemany(
+                    f'INSERT INTO staging ({colunas}) VALUES ({", ".join("?" * len(nomes))})',
+                    [
+                        tuple(_valor_sqlite(linha[campo.name], campo.field_type) for campo in schema)
+                        for linha in linhas
+                    ]
+                )
+                cursor = self._conn.execute(
+                    f'INSERT INTO "{tabela}" ({colunas}) SELECT {colunas} FROM staging S '
+                    f'WHERE NOT EXISTS (SELECT 1 FROM "{tabela}" T WHERE T."{chave}" = S."{chave}")'
+                )
+                inseridas = cursor.rowcount
+            finally:
+                self._conn.execute('DROP TABLE temp.staging')
+            self.jobs += 2
+        
+        logger.info(f"{tabela}: {inseridas} inseridas de {len(linhas)} no lote (merge local por {chave})")
+        return inseridas
+    
+    def iterar_chaves(self, table_id: str, chave: str):
+        """Valores distintos da chave na tabela (lidos de uma vez, sob o lock)"""
+        tabela = _nome_tabela(table_id)
+        with self._lock:
+            existe = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (tabela,)
+            ).fetchone()
+            valores = [
+                linha[0] for linha in self._conn.execute(f'SELECT DISTINCT "{chave}" FROM "{tabela}"')
+            ] if existe else []
+        yield from valores
+    
+    def consultar(self, sql: str, parametros=()) -> list:
+        """Linhas de uma consulta (dicionários), para conferência"""
+        with self._lock:
+            cursor = self._conn.execute(sql, parametros)
+            nomes = [coluna[0] for coluna in cursor.description]
+            return [dict(zip(nomes, linha)) for linha in cursor.fetchall()]
+    
+    def fechar(self):
+        self._conn.close()
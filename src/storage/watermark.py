@@ -0,0 +1,118 @@
+"""Marca d'água (high-water mark) das cargas incrementais"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def parse_data_emissao(valor):
+    """
+    Converte DataEmissao da NFSe em datetime local sem fuso
+    
+    Args:
+        valor: Texto ISO (YYYY-MM-DD ou YYYY-MM-DDTHH:MM:SS[±HH:MM])
+        
+    Returns:
+        datetime, ou None se vazio/inválido
+    """
+    if not valor:
+        return None
+    try:
+        return datetime.fromisoformat(valor.strip()).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+class WatermarkStore:
+    """Interface do armazenamento de marca d'água por prestador"""
+    
+    def obter(self, prestador: str):
+        """Maior data_emissao já carregada do prestador (ou None)"""
+        raise NotImplementedError
+    
+    def registrar_carga(self, prestador: str, datas_emissao: list):
+        """Avança a marca d'água com as datas de emissão carregadas com sucesso"""
+        raise NotImplementedError
+    
+    def contar_carregadas(self, prestador: str, data_inicio: datetime, data_fim: datetime) -> int:
+        """NFSes já carregadas com emissão no intervalo (granularidade diária)"""
+        raise NotImplementedError
+
+
+class SqliteWatermarkStore(WatermarkStore):
+    """Marca d'água em SQLite local (um arquivo, seguro entre threads)"""
+    
+    def __init__(self, caminho: str = ':memory:', dias_retencao: int = 90):
+        """
+        Args:
+            caminho: Arquivo SQLite (':memory:' para não persistir)
+            dias_retencao: Dias de contagem diária mantidos para o relatório
+        """
+        if caminho != ':memory:':
+            os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        self.dias_retencao = dias_retencao
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS watermark (
+                prestador TEXT PRIMARY KEY,
+                data_emissao TEXT NOT NULL,
+                atualizado_em TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS carga_diaria (
+                prestador TEXT NOT NULL,
+                dia TEXT NOT NULL,
+                nfses INTEGER NOT NULL,
+                PRIMARY KEY (prestador, dia)
+            );
+        """)
+    
+    def obter(self, prestador: str):
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT data_emissao FROM watermark WHERE prestador = ?", (prestador,)
+            ).fetchone()
+        return datetime.fromisoformat(linha[0]) if linha else None
+    
+    def registrar_carga(self, prestador: str, datas_emissao: list):
+        atual = self.obter(prestador)
+        # Contagem diária apenas de notas além da marca (sobreposição já foi contada)
+        novas = [d for d in datas_emissao if d is not None and (atual is None or d > atual)]
+        if not novas:
+            return
+        
+        por_dia = {}
+        for data in novas:
+            dia = data.strftime('%Y-%m-%d')
+            por_dia[dia] = por_dia.get(dia, 0) + 1
+        limite = (datetime.now() - timedelta(days=self.dias_retencao)).strftime('%Y-%m-%d')
+        
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT INTO watermark (prestador, data_emissao, atualizado_em) VALUES (?, ?, ?)
+                   ON CONFLICT(prestador) DO UPDATE SET
+                       data_emissao = MAX(data_emissao, excluded.data_emissao),
+                       atualizado_em = excluded.atualizado_em""",
+                (prestador, max(novas).isoformat(), datetime.now().isoformat())
+            )
+            self._conn.executemany(
+                """INSERT INTO carga_diaria (prestador, dia, nfses) VALUES (?, ?, ?)
+                   ON CONFLICT(prestador, dia) DO UPDATE SET nfses = nfses + excluded.nfses""",
+                [(prestador, dia, quantidade) for dia, quantidade in por_dia.items()]
+            )
+            self._conn.execute("DELETE FROM carga_diaria WHERE dia < ?", (limite,))
+    
+    def contar_carregadas(self, prestador: str, data_inicio: datetime, data_fim: datetime) -> int:
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT COALESCE(SUM(nfses), 0) FROM carga_diaria WHERE prestador = ? AND dia >= ? AND dia < ?",
+                (prestador, data_inicio.strftime('%Y-%m-%d'), data_fim.strftime('%Y-%m-%d'))
+            ).fetchone()
+        return linha[0]
+    
+    def fechar(self):
+        self._conn.close()
@@ -1,5 +1,7 @@
 """Funções auxiliares e helpers"""
 
+import os
+import sys
 import yaml
 from pathlib import Path
 
@@ -8,6 +10,8 @@ def load_config(config_path: str) -> dict:
     """
     Carrega arquivo de configuração YAML
     
+    Referências ${VARIAVEL} são substituídas pelas variáveis de ambiente.
+    
     Args:
         config_path: Caminho do arquivo config.yaml
         
@@ -15,5 +19,28 @@ def load_config(config_path: str) -> dict:
         Dicionário com configurações
     """
     with open(config_path, 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f)
+        config = yaml.safe_load(os.path.expandvars(f.read()))
     return config
+
+
+def pico_memoria_mb():
+    """
+    Pico de memória residente (RSS) do processo
+    
+    Returns:
+        Pico em MB, ou None se a plataforma não expõe o dado (Windows)
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KB, macOS em bytes
+    if sys.platform == 'darwin':
+        return pico / (1024 * 1024)
+    return pico / 1024
+
+
+def formatar_memoria(megabytes) -> str:
+    """Formata valor de memória para log"""
+    return f"{megabytes:.1f} MB" if megabytes is not None else "n/d"
@@ -0,0 +1,159 @@
+"""Planejamento adaptativo de janelas de consulta NFSe"""
+
+import json
+import os
+import threading
+from datetime import datetime, time, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _mes(data) -> str:
+    return data.strftime('%Y-%m')
+
+
+def _dia(data):
+    """date de um date ou datetime"""
+    return data.date() if isinstance(data, datetime) else data
+
+
+def _dias_por_mes(data_inicio, data_fim) -> dict:
+    """Dias (inclusivos) de [data_inicio, data_fim] em cada mês"""
+    dias = {}
+    atual = _dia(data_inicio)
+    fim = _dia(data_fim)
+    while atual <= fim:
+        dias[_mes(atual)] = dias.get(_mes(atual), 0) + 1
+        atual += timedelta(days=1)
+    return dias
+
+
+class WindowPlanner:
+    """
+    Dimensiona janelas de consulta pela densidade aprendida de cada mês
+    
+    Meses densos (muitas notas por dia ou respostas lentas) recebem janelas
+    curtas; meses esparsos, janelas largas. Janelas que estouram o timeout
+    ou o limite de páginas limitam o tamanho seguro daquele mês. O
+    aprendizado é persistido em JSON para a próxima execução.
+    """
+    
+    def __init__(self, caminho_estado: str = None, dias_base: int = 7, dias_min: int = 1,
+                 dias_max: int = 31, alvo_nfses: int = 500, alvo_latencia: float = 10.0):
+        """
+        Args:
+            caminho_estado: Arquivo JSON com a densidade por mês (None = não persistir)
+            dias_base: Tamanho da janela em meses sem histórico
+            dias_min: Menor janela permitida
+            dias_max: Maior janela permitida
+            alvo_nfses: Notas desejadas por janela
+            alvo_latencia: Tempo de resposta desejado por janela (segundos)
+        """
+        self.caminho_estado = caminho_estado
+        self.dias_base = dias_base
+        self.dias_min = dias_min
+        self.dias_max = dias_max
+        self.alvo_nfses = alvo_nfses
+        self.alvo_latencia = alvo_latencia
+        self.meses = {}
+        self._lock = threading.Lock()
+        
+        if caminho_estado and os.path.exists(caminho_estado):
+            with open(caminho_estado, 'r', encoding='utf-8') as f:
+                self.meses = json.load(f)
+            logger.info(f"Densidade de {len(self.meses)} meses carregada de {caminho_estado}")
+    
+    def dias_para(self, data) -> int:
+        """Tamanho de janela recomendado a partir de uma data"""
+        estatistica = self.meses.get(_mes(data)) or self._mes_vizinho(_mes(data))
+        if not estatistica:
+            return self.dias_base
+        
+        dias = float(self.dias_max)
+        if estatistica.get('dias') and estatistica.get('nfses'):
+            densidade = estatistica['nfses'] / estatistica['dias']
+            dias = self.alvo_nfses / densidade
+        if estatistica.get('janelas') and estatistica.get('segundos'):
+            latencia_por_dia = estatistica['segundos'] / estatistica['dias']
+            if latencia_por_dia > 0:
+                dias = min(dias, self.alvo_latencia / latencia_por_dia)
+        if estatistica.get('dias_max_seguro'):
+            dias = min(dias, estatistica['dias_max_seguro'])
+        
+        return int(max(self.dias_min, min(self.dias_max, dias)))
+    
+    def _mes_vizinho(self, mes: str):
+        """Estatística do mês conhecido mais próximo (ou None)"""
+        if not self.meses:
+            return None
+        alvo = int(mes[:4]) * 12 + int(mes[5:7])
+        return min(
+            self.meses.values(),
+            key=lambda e: abs(int(e['mes'][:4]) * 12 + int(e['mes'][5:7]) - alvo)
+        )
+    
+    def planejar(self, data_inicio, data_fim) -> list:
+        """
+        Divide o período em janelas dimensionadas pela densidade de cada mês
+        
+        A consulta é por dia: os limites são levados para datas antes do
+        planejamento, então o dia de data_fim entra mesmo quando a hora de
+        data_fim é anterior à de data_inicio.
+        
+        Returns:
+            Lista de tuplas (inicio, fim), datas inclusivas; com datetimes, a
+            primeira começa em data_inicio, a última termina em data_fim e as
+            demais fronteiras ficam à meia-noite
+        """
+        janelas = []
+        atual = _dia(data_inicio)
+        fim = _dia(data_fim)
+        while atual <= fim:
+            fim_janela = min(atual + timedelta(days=self.dias_para(atual) - 1), fim)
+            janelas.append((atual, fim_janela))
+            atual = fim_janela + timedelta(days=1)
+        
+        if janelas and isinstance(data_inicio, datetime):
+            janelas = [(datetime.combine(inicio, time.min), datetime.combine(fim_janela, time.min))
+                       for inicio, fim_janela in janelas]
+            janelas[0] = (data_inicio, janelas[0][1])
+            janelas[-1] = (janelas[-1][0], data_fim)
+        return janelas
+    
+    def _estatistica(self, mes: str) -> dict:
+        return self.meses.setdefault(mes, {'mes': mes, 'nfses': 0, 'dias': 0, 'segundos': 0.0, 'janelas': 0})
+    
+    def registrar(self, data_inicio, data_fim, nfses: int, segundos: float):
+        """Registra o resultado de uma janela concluída"""
+        dias_por_mes = _dias_por_mes(data_inicio, data_fim)
+        total_dias = sum(dias_por_mes.values())
+        with self._lock:
+            for mes, dias in dias_por_mes.items():
+                estatistica = self._estatistica(mes)
+                proporcao = dias / total_dias
+                estatistica['nfses'] += nfses * proporcao
+                estatistica['dias'] += dias
+                estatistica['segundos'] += segundos * proporcao
+                estatistica['janelas'] += 1
+    
+    def registrar_estouro(self, data_inicio, data_fim):
+        """Registra janela que estourou timeout ou limite de páginas"""
+        dias = sum(_dias_por_mes(data_inicio, data_fim).values())
+        seguro = max(self.dias_min, dias // 2)
+        with self._lock:
+            for mes in _dias_por_mes(data_inicio, data_fim):
+                estatistica = self._estatistica(mes)
+                estatistica['dias_max_seguro'] = min(estatistica.get('dias_max_seguro') or seguro, seguro)
+    
+    def salvar(self):
+        """Persiste a densidade aprendida"""
+        if not self.caminho_estado:
+            return
+        os.makedirs(os.path.dirname(self.caminho_estado) or '.', exist_ok=True)
+        with self._lock:
+            conteudo = json.dumps(self.meses, indent=2, sort_keys=True)
+        temporario = f"{self.caminho_estado}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            f.write(conteudo)
+        os.replace(temporario, self.caminho_estado)
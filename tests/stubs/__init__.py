@@ -0,0 +1 @@
+"""Stubs offline (webservice ABRASF, certificados, situação cadastral) usados pelos testes e benchmarks"""
@@ -0,0 +1,309 @@
+"""Servidor ABRASF 2.03 local para benchmarks e testes offline"""
+
+import asyncio
+import gzip
+import re
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from aiohttp import web
+
+from tests.stubs.wsdl_stub import gerar_wsdl, gerar_xsd
+
+NAMESPACE_NFSE = 'http://www.betha.com.br/e-nota-contribuinte-ws'
+
+_RE_DATA_INICIAL = re.compile(rb'<DataInicial>([\d-]+)</DataInicial>')
+_RE_PAGINA = re.compile(rb'<Pagina>(\d+)</Pagina>')
+
+
+def gerar_comp_nfse(numero: int, data_emissao: str) -> str:
+    """
+    Gera um CompNfse sintético no layout ABRASF 2.03
+    
+    Args:
+        numero: Número sequencial da nota
+        data_emissao: Data de emissão (YYYY-MM-DD)
+        
+    Returns:
+        Fragmento XML do CompNfse
+    """
+    valor = 1000 + (numero % 997) * 3.17
+    return (
+        '<CompNfse><Nfse versao="2.03"><InfNfse>'
+        f'<Numero>{numero:015d}</Numero>'
+        f'<CodigoVerificacao>{numero % 999999999:09d}</CodigoVerificacao>'
+        f'<DataEmissao>{data_emissao}T10:00:00</DataEmissao>'
+        '<ValoresNfse>'
+        f'<BaseCalculo>{valor:.2f}</BaseCalculo><Aliquota>2.00</Aliquota>'
+        f'<ValorIss>{valor * 0.02:.2f}</ValorIss><ValorLiquidoNfse>{valor * 0.9:.2f}</ValorLiquidoNfse>'
+        '</ValoresNfse>'
+        '<PrestadorServico>'
+        '<IdentificacaoPrestador><CpfCnpj><Cnpj>10425636000139</Cnpj></CpfCnpj>'
+        '<InscricaoMunicipal>001557548</InscricaoMunicipal></IdentificacaoPrestador>'
+        '<RazaoSocial>Gonçalves e Silva Planejamento Empresarial Ltda</RazaoSocial>'
+        '<Endereco><Endereco>Rua Barão de Jaguara</Endereco><Numero>1000</Numero>'
+        '<Bairro>Centro</Bairro><CodigoMunicipio>3509502</CodigoMunicipio><Uf>SP</Uf>'
+        '<Cep>13015001</Cep></Endereco>'
+        '</PrestadorServico>'
+        '<OrgaoGerador><CodigoMunicipio>3509502</CodigoMunicipio><Uf>SP</Uf></OrgaoGerador>'
+        '<DeclaracaoPrestacaoServico><InfDeclaracaoPrestacaoServico>'
+        f'<Rps><IdentificacaoRps><Numero>{numero}</Numero><Serie>A</Serie><Tipo>1</Tipo></IdentificacaoRps>'
+        f'<DataEmissao>{data_emissao}</DataEmissao><Status>1</Status></Rps>'
+        f'<Competencia>{data_emissao}</Competencia>'
+        '<Servico><Valores>'
+        f'<ValorServicos>{valor:.2f}</ValorServicos><ValorDeducoes>0.00</ValorDeducoes>'
+        f'<ValorPis>{valor * 0.0065:.2f}</ValorPis><ValorCofins>{valor * 0.03:.2f}</ValorCofins>'
+        f'<ValorInss>0.00</ValorInss><ValorIr>{valor * 0.015:.2f}</ValorIr>'
+        f'<ValorCsll>{valor * 0.01:.2f}</ValorCsll><OutrasRetencoes>0.00</OutrasRetencoes>'
+        f'<ValorIss>{valor * 0.02:.2f}</ValorIss><Aliquota>2.00</Aliquota>'
+        '</Valores>'
+        '<IssRetido>2</IssRetido><ItemListaServico>17.01</ItemListaServico>'
+        '<CodigoCnae>7020400</CodigoCnae>'
+        '<Discriminacao>Consultoria em planejamento tributário</Discriminacao>'
+        '<CodigoMunicipio>3509502</CodigoMunicipio><ExigibilidadeISS>1</ExigibilidadeISS>'
+        '<MunicipioIncidencia>3509502</MunicipioIncidencia>'
+        '</Servico>'
+        '<Prestador><CpfCnpj><Cnpj>10425636000139</Cnpj></CpfCnpj>'
+        '<InscricaoMunicipal>001557548</InscricaoMunicipal></Prestador>'
+        '<TomadorServico>'
+        f'<IdentificacaoTomador><CpfCnpj><Cnpj>{11222333000100 + numero % 5000:014d}</Cnpj></CpfCnpj></IdentificacaoTomador>'
+        f'<RazaoSocial>Cliente {numero % 5000} Ltda</RazaoSocial>'
+        '<Endereco><Endereco>Av. Norte-Sul</Endereco><Numero>500</Numero><Bairro>Cambuí</Bairro>'
+        '<CodigoMunicipio>3509502</CodigoMunicipio><Uf>SP</Uf><Cep>13025320</Cep></Endereco>'
+        '</TomadorServico>'
+        '<OptanteSimplesNacional>2</OptanteSimplesNacional><IncentivoFiscal>2</IncentivoFiscal>'
+        '</InfDeclaracaoPrestacaoServico></DeclaracaoPrestacaoServico>'
+        '</InfNfse></Nfse></CompNfse>'
+    )
+
+
+def gerar_resposta_consulta(quantidade: int, primeiro_numero: int = 1,
+                            data_emissao: str = '2024-01-15', proxima_pagina: int = None) -> bytes:
+    """
+    Gera envelope SOAP de ConsultarNfseResposta com notas sintéticas
+    
+    Args:
+        quantidade: Número de CompNfse na resposta
+        primeiro_numero: Número da primeira nota
+        data_emissao: Data de emissão das notas (YYYY-MM-DD)
+        proxima_pagina: Página seguinte, se houver
+        
+    Returns:
+        Envelope SOAP em bytes (UTF-8)
+    """
+    notas = ''.join(
+        gerar_comp_nfse(numero, data_emissao)
+        for numero in range(primeiro_numero, primeiro_numero + quantidade)
+    )
+    if proxima_pagina is not None:
+        notas += f'<ProximaPagina>{proxima_pagina}</ProximaPagina>'
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+        f'<ConsultarNfseResposta xmlns="{NAMESPACE_NFSE}"><ListaNfse>{notas}</ListaNfse>'
+        '</ConsultarNfseResposta></soap:Body></soap:Envelope>'
+    ).encode('utf-8')
+
+
+def responder_consulta(corpo: bytes, notas_por_janela: int, notas_por_pagina: int = None) -> bytes:
+    """
+    Resposta de ConsultarNfse para o envelope recebido
+    
+    As notas são derivadas da DataInicial (mesma consulta, mesmas notas);
+    com notas_por_pagina, a resposta é paginada conforme <Pagina>.
+    """
+    match = _RE_DATA_INICIAL.search(corpo)
+    data_inicial = match.group(1).decode() if match else '2024-01-01'
+    primeiro_numero = date.fromisoformat(data_inicial).toordinal() * 1000
+    quantidade = notas_por_janela
+    proxima_pagina = None
+    
+    if notas_por_pagina:
+        match = _RE_PAGINA.search(corpo)
+        pagina = int(match.group(1)) if match else 1
+        inicio = (pagina - 1) * notas_por_pagina
+        quantidade = max(0, min(notas_por_pagina, notas_por_janela - inicio))
+        primeiro_numero += inicio
+        if inicio + quantidade < notas_por_janela:
+            proxima_pagina = pagina + 1
+    
+    return gerar_resposta_consulta(quantidade, primeiro_numero, data_inicial, proxima_pagina)
+
+
+class _AbrasfHandler(BaseHTTPRequestHandler):
+    """Responde ConsultarNfse com notas determinísticas por janela"""
+    
+    protocol_version = 'HTTP/1.1'
+    
+    def do_POST(self):
+        corpo = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        servidor = self.server
+        servidor.registrar_requisicao()
+        
+        if servidor.latencia:
+            time.sleep(servidor.latencia)
+        
+        resposta = responder_consulta(corpo, servidor.notas_por_janela, servidor.notas_por_pagina)
+        comprimir = servidor.gzip and 'gzip' in self.headers.get('Accept-Encoding', '')
+        if comprimir:
+            resposta = gzip.compress(resposta, compresslevel=1)
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml; charset=utf-8')
+        if comprimir:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(resposta)))
+        self.end_headers()
+        self.wfile.write(resposta)
+    
+    def do_GET(self):
+        servidor = self.server
+        servidor.registrar_download()
+        
+        if servidor.latencia_wsdl:
+            time.sleep(servidor.latencia_wsdl)
+        
+        if self.path.endswith('.xsd'):
+            resposta = gerar_xsd()
+        else:
+            resposta = gerar_wsdl(servidor.url)
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml; charset=utf-8')
+        self.send_header('Content-Length', str(len(resposta)))
+        self.end_headers()
+        self.wfile.write(resposta)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class ServidorAbrasfLocal(ThreadingHTTPServer):
+    """
+    Webservice ABRASF local com latência configurável e TLS opcional
+    
+    Uso:
+        with ServidorAbrasfLocal(latencia=0.2) as servidor:
+            url = servidor.url
+    """
+    
+    daemon_threads = True
+    
+    def __init__(self, latencia: float = 0.0, notas_por_janela: int = 50, contexto_ssl=None,
+                 notas_por_pagina: int = None, latencia_wsdl: float = 0.0, gzip: bool = False):
+        super().__init__(('127.0.0.1', 0), _AbrasfHandler)
+        self.latencia = latencia
+        self.gzip = gzip
+        self.latencia_wsdl = latencia_wsdl
+        self.downloads = 0
+        self.notas_por_janela = notas_por_janela
+        self.notas_por_pagina = notas_por_pagina
+        self.requisicoes = 0
+        self.conexoes = 0
+        if contexto_ssl is not None:
+            # Handshake na thread da conexão, não na thread que aceita
+            self.socket = contexto_ssl.wrap_socket(self.socket, server_side=True, do_handshake_on_connect=False)
+        self._lock = threading.Lock()
+        self._thread = None
+    
+    @property
+    def url(self) -> str:
+        esquema = 'https' if hasattr(self.socket, 'context') else 'http'
+        return f'{esquema}://127.0.0.1:{self.server_address[1]}/notafiscal-abrasfv203-ws/NotaFiscalSoap'
+    
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.conexoes += 1
+        super().process_request(request, client_address)
+    
+    def registrar_requisicao(self):
+        with self._lock:
+            self.requisicoes += 1
+    
+    def registrar_download(self):
+        with self._lock:
+            self.downloads += 1
+    
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+class ServidorAbrasfAsync:
+    """
+    Webservice ABRASF local em asyncio (aiohttp), sem thread por conexão
+    
+    Roda em um event loop próprio, em segundo plano; registra o pico de
+    requisições simultâneas em voo.
+    
+    Uso:
+        with ServidorAbrasfAsync(latencia=0.5) as servidor:
+            url = servidor.url
+    """
+    
+    def __init__(self, latencia: float = 0.0, notas_por_janela: int = 50, notas_por_pagina: int = None):
+        self.latencia = latencia
+        self.notas_por_janela = notas_por_janela
+        self.notas_por_pagina = notas_por_pagina
+        self.requisicoes = 0
+        self.em_voo = 0
+        self.pico_em_voo = 0
+        self.porta = None
+        self._loop = None
+        self._runner = None
+        self._thread = None
+    
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.porta}/notafiscal-abrasfv203-ws/NotaFiscalSoap'
+    
+    async def _consultar(self, request):
+        corpo = await request.read()
+        self.requisicoes += 1
+        self.em_voo += 1
+        self.pico_em_voo = max(self.pico_em_voo, self.em_voo)
+        try:
+            if self.latencia:
+                await asyncio.sleep(self.latencia)
+        finally:
+            self.em_voo -= 1
+        
+        resposta = responder_consulta(corpo, self.notas_por_janela, self.notas_por_pagina)
+        return web.Response(body=resposta, headers={'Content-Type': 'text/xml; charset=utf-8'})
+    
+    async def _iniciar(self):
+        app = web.Application()
+        app.router.add_post('/{caminho:.*}', self._consultar)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        self.porta = self._runner.addresses[0][1]
+    
+    def __enter__(self):
+        self._loop = asyncio.new_event_loop()
+        pronto = threading.Event()
+        
+        def executar():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self._iniciar())
+            pronto.set()
+            self._loop.run_forever()
+        
+        self._thread = threading.Thread(target=executar, daemon=True)
+        self._thread.start()
+        pronto.wait()
+        return self
+    
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
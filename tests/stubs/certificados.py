@@ -0,0 +1,90 @@
+"""Certificados autoassinados para servidor HTTPS local com TLS mútuo"""
+
+import os
+import ssl
+from datetime import datetime, timedelta
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.serialization import pkcs12
+from cryptography.x509.oid import NameOID
+
+SENHA_PFX_TESTE = 'senha-teste'
+
+
+def _emitir(nome, chave, emissor_nome, emissor_chave, ca=False, validade_dias=30, san=None):
+    agora = datetime.utcnow()
+    builder = (
+        x509.CertificateBuilder()
+        .subject_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, nome)]))
+        .issuer_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, emissor_nome)]))
+        .public_key(chave.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(agora + timedelta(days=min(validade_dias, 0) - 1))
+        .not_valid_after(agora + timedelta(days=validade_dias))
+        .add_extension(x509.BasicConstraints(ca=ca, path_length=None), critical=True)
+    )
+    if san:
+        builder = builder.add_extension(x509.SubjectAlternativeName(san), critical=False)
+    return builder.sign(emissor_chave, hashes.SHA256())
+
+
+def _gravar(caminho, dados):
+    with open(caminho, 'wb') as f:
+        f.write(dados)
+    return caminho
+
+
+def gerar_certificados(diretorio: str, validade_cliente_dias: int = 30) -> dict:
+    """
+    Gera CA, certificado de servidor (127.0.0.1) e certificado cliente .pfx
+    
+    Args:
+        diretorio: Diretório de saída
+        validade_cliente_dias: Validade do certificado cliente (negativo = vencido)
+        
+    Returns:
+        Dicionário com caminhos 'ca', 'servidor_cert', 'servidor_chave', 'cliente_pfx'
+        e a senha do .pfx em 'senha'
+    """
+    import ipaddress
+    
+    pem = serialization.Encoding.PEM
+    sem_senha = serialization.NoEncryption()
+    
+    chave_ca = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ca = _emitir('CA Teste NFSe', chave_ca, 'CA Teste NFSe', chave_ca, ca=True, validade_dias=365)
+    
+    chave_servidor = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    servidor = _emitir('127.0.0.1', chave_servidor, 'CA Teste NFSe', chave_ca,
+                       san=[x509.IPAddress(ipaddress.ip_address('127.0.0.1')), x509.DNSName('localhost')])
+    
+    chave_cliente = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    cliente = _emitir('EMPRESA TESTE:10425636000139', chave_cliente, 'CA Teste NFSe', chave_ca,
+                      validade_dias=validade_cliente_dias)
+    
+    pfx = pkcs12.serialize_key_and_certificates(
+        b'cliente', chave_cliente, cliente, [ca],
+        serialization.BestAvailableEncryption(SENHA_PFX_TESTE.encode())
+    )
+    
+    return {
+        'ca': _gravar(os.path.join(diretorio, 'ca.pem'), ca.public_bytes(pem)),
+        'servidor_cert': _gravar(os.path.join(diretorio, 'servidor.pem'), servidor.public_bytes(pem)),
+        'servidor_chave': _gravar(
+            os.path.join(diretorio, 'servidor.key'),
+            chave_servidor.private_bytes(pem, serialization.PrivateFormat.PKCS8, sem_senha)
+        ),
+        'cliente_pfx': _gravar(os.path.join(diretorio, 'cliente.pfx'), pfx),
+        'senha': SENHA_PFX_TESTE,
+    }
+
+
+def contexto_servidor_mtls(certificados: dict) -> ssl.SSLContext:
+    """SSLContext de servidor que exige certificado cliente emitido pela CA de teste"""
+    contexto = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    contexto.load_cert_chain(certificados['servidor_cert'], certificados['servidor_chave'])
+    contexto.load_verify_locations(certificados['ca'])
+    contexto.verify_mode = ssl.CERT_REQUIRED
+    return contexto
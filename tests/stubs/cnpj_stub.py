@@ -0,0 +1,112 @@
+"""Fonte de situação cadastral local (backend em memória e servidor HTTP) para benchmarks e testes"""
+
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.parsers.cnpj_lookup import CnpjBackend
+
+# Distribuição das situações sorteadas (determinística por CNPJ)
+SITUACOES = ('ATIVA',) * 7 + ('BAIXADA', 'BAIXADA', 'INAPTA', 'SUSPENSA', 'NAO_ENCONTRADO')
+
+
+def situacao_ficticia(cnpj: str) -> dict:
+    """Situação estável para o CNPJ (mesmo CNPJ, mesma resposta)"""
+    codigo = zlib.crc32(cnpj.encode())
+    situacao = SITUACOES[codigo % len(SITUACOES)]
+    if situacao == 'NAO_ENCONTRADO':
+        return {'situacao': situacao}
+    return {
+        'situacao': situacao,
+        'razao_social': f"EMPRESA {cnpj[:8]} LTDA",
+        'data_situacao': f"20{codigo % 20:02d}-01-01"
+    }
+
+
+class StubCnpjBackend(CnpjBackend):
+    """Backend em memória com latência simulada; conta chamadas e concorrência"""
+    
+    def __init__(self, latencia: float = 0.0, falhar: set = None):
+        """
+        Args:
+            latencia: Segundos por consulta (a consulta real leva 3-4 s)
+            falhar: CNPJs que levantam erro
+        """
+        self.latencia = latencia
+        self.falhar = set(falhar or ())
+        self._lock = threading.Lock()
+        self.chamadas = []
+        self.em_voo = 0
+        self.maximo_em_voo = 0
+    
+    def consultar(self, cnpj: str) -> dict:
+        with self._lock:
+            self.chamadas.append(cnpj)
+            self.em_voo += 1
+            self.maximo_em_voo = max(self.maximo_em_voo, self.em_voo)
+        try:
+            if self.latencia:
+                time.sleep(self.latencia)
+            if cnpj in self.falhar:
+                raise ConnectionError(f"Falha simulada para {cnpj}")
+            return situacao_ficticia(cnpj)
+        finally:
+            with self._lock:
+                self.em_voo -= 1
+
+
+class _CnpjHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Cabeçalhos e corpo saem em escritas separadas: sem Nagle para não somar o ACK atrasado
+    disable_nagle_algorithm = True
+    
+    def do_GET(self):
+        cnpj = self.path.rstrip('/').rsplit('/', 1)[-1]
+        if self.server.latencia:
+            time.sleep(self.server.latencia)
+        dados = situacao_ficticia(cnpj)
+        if dados['situacao'] == 'NAO_ENCONTRADO':
+            corpo, status = b'{"message": "CNPJ nao encontrado"}', 404
+        else:
+            # Campos no formato da BrasilAPI
+            corpo = json.dumps({
+                'cnpj': cnpj,
+                'razao_social': dados['razao_social'],
+                'descricao_situacao_cadastral': dados['situacao'].title(),
+                'data_situacao_cadastral': dados['data_situacao'],
+            }).encode()
+            status = 200
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+    
+    def log_message(self, *args):
+        pass
+
+
+class ServidorCnpjLocal(ThreadingHTTPServer):
+    """Servidor HTTP no formato da BrasilAPI (/api/cnpj/v1/{cnpj}) em thread própria"""
+    
+    daemon_threads = True
+    
+    def __init__(self, latencia: float = 0.0):
+        super().__init__(('127.0.0.1', 0), _CnpjHandler)
+        self.latencia = latencia
+        self._thread = None
+    
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/api/cnpj/v1/{{cnpj}}"
+    
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,92 @@
+"""WSDL e XSD sintéticos no formato do webservice ABRASF 2.03"""
+
+NAMESPACE_WSDL = 'http://nfse.abrasf.org.br'
+NAMESPACE_XSD = 'http://www.abrasf.org.br/nfse.xsd'
+
+OPERACOES = (
+    'ConsultarNfseServicoPrestado',
+    'ConsultarNfseServicoTomado',
+    'ConsultarNfsePorFaixa',
+    'ConsultarNfsePorRps',
+    'ConsultarLoteRps',
+    'RecepcionarLoteRps',
+    'RecepcionarLoteRpsSincrono',
+    'GerarNfse',
+    'CancelarNfse',
+    'SubstituirNfse',
+)
+
+
+def gerar_wsdl(endereco: str, local_xsd: str = 'nfse.xsd') -> bytes:
+    """
+    Gera WSDL document/literal com as operações ABRASF (nfseCabecMsg/nfseDadosMsg)
+    
+    Args:
+        endereco: URL do endpoint SOAP
+        local_xsd: schemaLocation do XSD importado (relativo ao WSDL)
+    """
+    elementos = ''.join(
+        f'<xsd:element name="{op}Request"><xsd:complexType><xsd:sequence>'
+        '<xsd:element name="nfseCabecMsg" type="xsd:string"/>'
+        '<xsd:element name="nfseDadosMsg" type="xsd:string"/>'
+        '</xsd:sequence></xsd:complexType></xsd:element>'
+        f'<xsd:element name="{op}Response"><xsd:complexType><xsd:sequence>'
+        '<xsd:element name="outputXML" type="xsd:string"/>'
+        '</xsd:sequence></xsd:complexType></xsd:element>'
+        for op in OPERACOES
+    )
+    mensagens = ''.join(
+        f'<message name="{op}Request"><part name="parameters" element="tns:{op}Request"/></message>'
+        f'<message name="{op}Response"><part name="parameters" element="tns:{op}Response"/></message>'
+        for op in OPERACOES
+    )
+    port_type = ''.join(
+        f'<operation name="{op}"><input message="tns:{op}Request"/><output message="tns:{op}Response"/></operation>'
+        for op in OPERACOES
+    )
+    binding = ''.join(
+        f'<operation name="{op}"><soap:operation soapAction="http://nfse.abrasf.org.br/{op}"/>'
+        '<input><soap:body use="literal"/></input><output><soap:body use="literal"/></output></operation>'
+        for op in OPERACOES
+    )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        f'<definitions xmlns="http://schemas.xmlsoap.org/wsdl/" xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/" '
+        f'xmlns:tns="{NAMESPACE_WSDL}" xmlns:xsd="http://www.w3.org/2001/XMLSchema" targetNamespace="{NAMESPACE_WSDL}">'
+        f'<types><xsd:schema targetNamespace="{NAMESPACE_WSDL}" elementFormDefault="qualified">'
+        f'<xsd:import namespace="{NAMESPACE_XSD}" schemaLocation="{local_xsd}"/>'
+        f'{elementos}</xsd:schema></types>'
+        f'{mensagens}<portType name="ConsultarNfse">{port_type}</portType>'
+        '<binding name="NfseSoapBinding" type="tns:ConsultarNfse">'
+        '<soap:binding style="document" transport="http://schemas.xmlsoap.org/soap/http"/>'
+        f'{binding}</binding>'
+        '<service name="NfseWSService"><port name="NfseSoapPort" binding="tns:NfseSoapBinding">'
+        f'<soap:address location="{endereco}"/></port></service></definitions>'
+    ).encode('utf-8')
+
+
+def gerar_xsd(tipos: int = 300) -> bytes:
+    """
+    Gera XSD com volume semelhante ao nfse.xsd ABRASF (tipos simples e complexos)
+    
+    Args:
+        tipos: Número de tipos complexos
+    """
+    simples = ''.join(
+        f'<xsd:simpleType name="tsTexto{i}"><xsd:restriction base="xsd:string">'
+        f'<xsd:minLength value="1"/><xsd:maxLength value="{10 + i}"/></xsd:restriction></xsd:simpleType>'
+        for i in range(tipos)
+    )
+    complexos = ''.join(
+        f'<xsd:complexType name="tcTipo{i}"><xsd:sequence>'
+        + ''.join(f'<xsd:element name="Campo{j}" type="tsTexto{(i + j) % tipos}" minOccurs="0"/>' for j in range(12))
+        + '</xsd:sequence></xsd:complexType>'
+        for i in range(tipos)
+    )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        f'<xsd:schema xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns="{NAMESPACE_XSD}" '
+        f'targetNamespace="{NAMESPACE_XSD}" elementFormDefault="qualified">'
+        f'{simples}{complexos}'
+        '<xsd:element name="CompNfse" type="tcTipo0"/></xsd:schema>'
+    ).encode('utf-8')
@@ -0,0 +1,52 @@
+"""Testes do cliente assíncrono NFSe"""
+
+import asyncio
+import time
+
+from tests.stubs.abrasf_stub import ServidorAbrasfAsync
+from src.api.async_client import AsyncNfseClient
+
+
+def _config(url, max_concorrencia):
+    return {
+        'cliente': {'cnpj': '10425636000139', 'inscricao_municipal': '001557548'},
+        'nfse': {'endpoint': url, 'max_concorrencia': max_concorrencia}
+    }
+
+
+def test_consultar_periodos_limita_concorrencia():
+    """Testa fan-out limitado pelo semáforo, com paginação e ordem preservada"""
+    periodos = [(f'2024-01-{dia:02d}', f'2024-01-{dia:02d}') for dia in range(1, 31)]
+    
+    async def cenario(url):
+        async with AsyncNfseClient(_config(url, max_concorrencia=10)) as client:
+            return await client.consultar_periodos(periodos)
+    
+    with ServidorAbrasfAsync(latencia=0.1, notas_por_janela=3, notas_por_pagina=2) as servidor:
+        inicio = time.perf_counter()
+        resultados = asyncio.run(cenario(servidor.url))
+        decorrido = time.perf_counter() - inicio
+    
+    assert [sum(xml.count('<CompNfse>') for xml in paginas) for paginas in resultados] == [3] * 30
+    assert f"{periodos[4][0]}T10:00:00" in resultados[4][0]
+    assert servidor.requisicoes == 60
+    assert servidor.pico_em_voo == 10
+    assert decorrido < 60 * 0.1
+
+
+def test_fechar_cancela_consultas_em_andamento():
+    """Testa cancelamento das consultas pendentes no encerramento"""
+    async def cenario(url):
+        client = await AsyncNfseClient(_config(url, max_concorrencia=5)).abrir()
+        consulta = asyncio.ensure_future(client.consultar_periodos([('2024-01-01', '2024-01-31')] * 10))
+        await asyncio.sleep(0.1)
+        inicio = time.perf_counter()
+        await client.fechar()
+        resultados = await consulta
+        return resultados, time.perf_counter() - inicio
+    
+    with ServidorAbrasfAsync(latencia=2) as servidor:
+        resultados, decorrido = asyncio.run(cenario(servidor.url))
+    
+    assert decorrido < 1
+    assert all(isinstance(r, asyncio.CancelledError) for r in resultados)
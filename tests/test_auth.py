@@ -0,0 +1,56 @@
+"""Testes do carregamento de certificado digital"""
+
+import os
+import stat
+
+import pytest
+
+from tests.stubs.certificados import gerar_certificados
+from src.api.auth import (
+    CertificadoExpiradoError,
+    arquivo_pem_temporario,
+    carregar_certificado,
+    limpar_cache_certificados,
+)
+
+
+@pytest.fixture(autouse=True)
+def _cache_limpo():
+    limpar_cache_certificados()
+    yield
+    limpar_cache_certificados()
+
+
+def test_carregar_certificado_decifra_uma_vez(tmp_path):
+    """Testa memoização do .pfx decifrado e validade reportada"""
+    certificados = gerar_certificados(str(tmp_path))
+    
+    primeiro = carregar_certificado(certificados['cliente_pfx'], certificados['senha'])
+    segundo = carregar_certificado(certificados['cliente_pfx'], certificados['senha'])
+    
+    assert primeiro is segundo
+    assert 28 < primeiro.dias_restantes() <= 30
+
+
+def test_certificado_vencido_falha_imediatamente(tmp_path):
+    """Testa fail-fast com certificado fora da validade"""
+    certificados = gerar_certificados(str(tmp_path), validade_cliente_dias=-2)
+    
+    with pytest.raises(CertificadoExpiradoError):
+        carregar_certificado(certificados['cliente_pfx'], certificados['senha'])
+    
+    certificado = carregar_certificado(certificados['cliente_pfx'], certificados['senha'], verificar_validade=False)
+    assert certificado.dias_restantes() < 0
+
+
+def test_arquivo_pem_temporario_privado(tmp_path):
+    """Testa PEM materializado com permissão 0600 e removido ao final"""
+    certificados = gerar_certificados(str(tmp_path))
+    certificado = carregar_certificado(certificados['cliente_pfx'], certificados['senha'])
+    
+    with arquivo_pem_temporario(certificado) as caminho:
+        assert stat.S_IMODE(os.stat(caminho).st_mode) == 0o600
+        with open(caminho, 'rb') as f:
+            assert b'PRIVATE KEY' in f.read()
+    
+    assert not os.path.exists(caminho)
@@ -1,9 +1,127 @@
 """Testes do BigQuery loader"""
 
+import io
+import json
+
+import pyarrow.parquet as pq
 import pytest
+from google.api_core.exceptions import NotFound
+
+from tests.stubs.abrasf_stub import gerar_resposta_consulta
+from src.parsers.xml_parser import NfseXmlParser
+from src.storage.bigquery_loader import BigQueryLoader
+
+
+class _Job:
+    def __init__(self, linhas_afetadas=None):
+        self.num_dml_affected_rows = linhas_afetadas
+    
+    def result(self):
+        return self
+
+
+class _JobCarga:
+    """Load job que só termina na terceira consulta"""
+    
+    def __init__(self, linhas):
+        self.job_id = 'job'
+        self.output_rows = linhas
+        self.error_result = None
+        self.errors = None
+        self.consultas = 0
+    
+    def done(self):
+        self.consultas += 1
+        return self.consultas >= 3
+    
+    def result(self):
+        return self
+
+
+class _ClienteRegistrador:
+    """Registra chamadas à API; tabela de destino ainda não existe"""
+    
+    def __init__(self):
+        self.chamadas = []
+        self.tabelas = {}
+    
+    def get_table(self, table_id):
+        if table_id not in self.tabelas:
+            raise NotFound(table_id)
+        return self.tabelas[table_id]
+    
+    def create_table(self, tabela):
+        self.chamadas.append(('create_table', tabela.table_id))
+        self.tabelas[f"{tabela.project}.{tabela.dataset_id}.{tabela.table_id}"] = tabela
+        return tabela
+    
+    def load_table_from_json(self, linhas, destino, job_config=None):
+        self.chamadas.append(('load', destino, len(linhas)))
+        return _Job()
+    
+    def load_table_from_file(self, arquivo, destino, size=None, job_config=None):
+        conteudo = arquivo.read()
+        assert len(conteudo) == size
+        if job_config.source_format == 'PARQUET':
+            linhas = pq.read_table(io.BytesIO(conteudo)).to_pylist()
+        else:
+            linhas = [json.loads(linha) for linha in conteudo.decode('utf-8').splitlines()]
+        self.chamadas.append(('load_file', destino, job_config.source_format, linhas))
+        return _JobCarga(len(linhas))
+    
+    def query(self, sql):
+        self.chamadas.append(('query', sql))
+        return _Job(linhas_afetadas=7)
+    
+    def delete_table(self, table_id, not_found_ok=False):
+        self.chamadas.append(('delete_table', table_id))
+
+
+@pytest.mark.parametrize('notas', [10, 5000])
+def test_mesclar_usa_staging_e_um_merge(notas):
+    """Testa jobs constantes (load + MERGE) por lote, lote deduplicado e staging removida"""
+    from scripts.nfse_campinas_integration import SCHEMA_NFSE_LEGADO
+    
+    cliente = _ClienteRegistrador()
+    loader = BigQueryLoader({}, client=cliente)
+    table_id = 'proj.raw.nfse_campinas'
+    registros = [
+        {'hash_nfse': f'h{i % (notas // 2)}', 'numero_nfse': str(i), 'data_emissao': '2024-01-15T10:00:00', 'extra': 1}
+        for i in range(notas)
+    ]
+    
+    loader.garantir_tabela(table_id, SCHEMA_NFSE_LEGADO)
+    assert loader.mesclar(table_id, registros, chave='hash_nfse') == 7
+    
+    operacoes = [c[0] for c in cliente.chamadas]
+    assert operacoes == ['create_table', 'create_table', 'load', 'query', 'delete_table']
+    staging = cliente.chamadas[2][1]
+    assert staging.startswith('proj.raw.nfse_campinas__staging_') and cliente.chamadas[4][1] == staging
+    assert cliente.chamadas[2][2] == notas // 2
+    sql = cliente.chamadas[3][1]
+    assert f'MERGE `{table_id}` T' in sql and f'USING `{staging}` S' in sql
+    assert 'ON T.`hash_nfse` = S.`hash_nfse`' in sql and 'WHEN NOT MATCHED' in sql
+    assert loader.jobs == 2
 
 
-def test_insert_nfse():
-    """Testa insert no BigQuery"""
-    # TODO: Implementar teste
-    pass
+@pytest.mark.parametrize('formato', ['parquet', 'ndjson'])
+def test_inserir_nfse_batch_um_load_job_por_grupo(formato):
+    """Testa um load job por lote_tamanho, arquivo legível com valores exatos e jobs consultados até terminar"""
+    nfses = NfseXmlParser().parse_nfse_response(gerar_resposta_consulta(25, data_emissao='2024-05-02'))
+    cliente = _ClienteRegistrador()
+    config = {'processamento': {'lote_tamanho': 10}, 'bigquery': {'jobs_simultaneos': 2, 'intervalo_consulta_segundos': 0}}
+    loader = BigQueryLoader(config, client=cliente)
+    
+    resumo = loader.inserir_nfse_batch(nfses, 'proj.raw.nfse_lote', formato=formato)
+    
+    cargas = [c for c in cliente.chamadas if c[0] == 'load_file']
+    assert [c[0] for c in cliente.chamadas] == ['create_table', 'load_file', 'load_file', 'load_file']
+    assert [len(c[3]) for c in cargas] == [10, 10, 5]
+    assert resumo['linhas'] == 25 and resumo['jobs'] == 3 and resumo['bytes'] > 0 and loader.jobs == 3
+    
+    primeira = cargas[0][3][0]
+    assert primeira['hash_nfse'] == nfses[0]['hash_nfse']
+    assert str(primeira['valor_servicos']) == str(nfses[0]['valor_servicos'])
+    tabela = cliente.tabelas['proj.raw.nfse_lote']
+    tipos = {campo.name: campo.field_type for campo in tabela.schema}
+    assert tipos['valor_servicos'] == 'NUMERIC' and tipos['data_emissao'] == 'TIMESTAMP'
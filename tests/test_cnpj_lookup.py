@@ -0,0 +1,80 @@
+"""Testes da consulta de situação cadastral com cache local"""
+
+import time
+
+import pytest
+
+from tests.stubs.cnpj_stub import ServidorCnpjLocal, StubCnpjBackend, situacao_ficticia
+from src.parsers.cnpj_lookup import CnpjStatusLookup, HttpCnpjBackend, SqliteCnpjCache
+from src.parsers.validators import calcular_dv_cnpj
+
+
+def _cnpjs(quantidade):
+    return [f"{i:012d}" + calcular_dv_cnpj(f"{i:012d}") for i in range(1, quantidade + 1)]
+
+
+def test_lote_deduplica_usa_cache_e_limita_concorrencia(tmp_path):
+    """Testa dedupe, inválidos locais, erro fora do cache, acertos no segundo lote, TTL e pool limitado"""
+    cnpjs = _cnpjs(30)
+    mascarado = f"{cnpjs[0][:2]}.{cnpjs[0][2:5]}.{cnpjs[0][5:8]}/{cnpjs[0][8:12]}-{cnpjs[0][12:]}"
+    backend = StubCnpjBackend(latencia=0.01, falhar={cnpjs[1]})
+    cache = SqliteCnpjCache(str(tmp_path / 'cnpj.sqlite3'))
+    consulta = CnpjStatusLookup(backend, cache, workers=3)
+    
+    resultado = consulta.consultar_lote(cnpjs + [mascarado, cnpjs[2], '11111111111111'])
+    
+    assert list(resultado)[:30] == cnpjs and len(resultado) == 31
+    assert sorted(backend.chamadas) == sorted(cnpjs)
+    assert backend.maximo_em_voo <= 3
+    assert resultado['11111111111111']['situacao'] == 'INVALIDO'
+    assert resultado[cnpjs[1]]['situacao'] == 'ERRO'
+    assert resultado[cnpjs[3]]['situacao'] == situacao_ficticia(cnpjs[3])['situacao']
+    assert resultado[cnpjs[3]]['fonte'] == 'remoto'
+    assert cache.contar() == 29
+    
+    backend.falhar.clear()
+    backend.chamadas.clear()
+    segundo = consulta.consultar_lote(cnpjs)
+    assert backend.chamadas == [cnpjs[1]]
+    assert segundo[cnpjs[3]]['fonte'] == 'cache'
+    assert segundo[cnpjs[3]]['razao_social'] == resultado[cnpjs[3]]['razao_social']
+    assert consulta.metricas() == {
+        'solicitados': 63, 'duplicados': 2, 'invalidos': 1, 'acertos_cache': 29,
+        'consultas_remotas': 31, 'erros': 1, 'taxa_acerto_cache': 0.483
+    }
+    
+    # Validade por situação: ATIVA 30 dias, NAO_ENCONTRADO 1 dia
+    daqui_2_dias = cache.obter_varios(cnpjs, agora=time.time() + 2 * 86400)
+    situacoes = {dados['situacao'] for dados in daqui_2_dias.values()}
+    assert 'ATIVA' in situacoes and 'NAO_ENCONTRADO' not in situacoes
+    assert any(situacao_ficticia(c)['situacao'] == 'NAO_ENCONTRADO' for c in cnpjs)
+    assert cache.obter_varios(cnpjs, agora=time.time() + 400 * 86400) == {}
+
+
+def test_consultar_um_cnpj():
+    """Testa consulta unitária com máscara, CNPJ inválido e entrada vazia (ValueError, sem StopIteration)"""
+    cnpj = _cnpjs(1)[0]
+    backend = StubCnpjBackend()
+    consulta = CnpjStatusLookup(backend)
+    
+    assert consulta.consultar(f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}")['cnpj'] == cnpj
+    assert consulta.consultar('ABC')['situacao'] == 'INVALIDO'
+    for vazio in (None, '', '  ', './-'):
+        with pytest.raises(ValueError):
+            consulta.consultar(vazio)
+    assert backend.chamadas == [cnpj]
+    assert consulta.metricas()['solicitados'] == 2
+
+
+def test_backend_http():
+    """Testa o backend HTTP no formato da BrasilAPI: situação normalizada e 404"""
+    cnpjs = _cnpjs(12)
+    with ServidorCnpjLocal() as servidor:
+        consulta = CnpjStatusLookup(HttpCnpjBackend(url=servidor.url), workers=2)
+        resultado = consulta.consultar_lote(cnpjs)
+    
+    for cnpj in cnpjs:
+        esperado = situacao_ficticia(cnpj)
+        assert resultado[cnpj]['situacao'] == esperado['situacao']
+        assert resultado[cnpj].get('razao_social') == esperado.get('razao_social')
+    assert consulta.metricas()['erros'] == 0
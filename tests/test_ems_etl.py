@@ -0,0 +1,24 @@
+"""Testes da validação de documentos no ETL das planilhas EMS"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('googleapiclient')
+pytest.importorskip('dotenv')
+
+from scripts.ems_etl_flexible import DataProcessor
+
+
+def test_coluna_numerica_de_documentos():
+    """Testa CNPJ/CPF lidos como número (read_excel) validados depois da limpeza"""
+    df = pd.DataFrame({
+        'CNPJ Fornecedor': [4252011000110.0, 10425636000139.0, np.nan, 10425636000138.0],
+        'CPF': [191, 52998224725, 52998224726, 191],
+    })
+    processador = DataProcessor()
+    
+    df = processador.validar_documentos(processador.clean_dataframe(df))
+    
+    assert df['CNPJ_Fornecedor_valido'].tolist() == [True, True, False, False]
+    assert df['CPF_valido'].tolist() == [True, True, False, True]
@@ -0,0 +1,60 @@
+"""Testes do índice local de hash_nfse"""
+
+import hashlib
+
+from tests.stubs.abrasf_stub import gerar_resposta_consulta
+from scripts.nfse_campinas_integration import NFSeCampinasIntegration
+from src.storage.hash_index import BloomFilter, HashNfseIndex
+from src.storage.sqlite_loader import SqliteLoader
+
+
+def _hashes(inicio, fim):
+    return [hashlib.sha256(str(i).encode()).hexdigest() for i in range(inicio, fim)]
+
+
+def test_indice_filtra_persiste_e_reconstroi(tmp_path):
+    """Testa filtro sem falsos negativos, confirmação no SQLite, crescimento, reabertura e reconstrução"""
+    filtro = BloomFilter(5000, 0.01)
+    filtro.adicionar(_hashes(0, 5000))
+    assert filtro.contem(_hashes(0, 5000)).all()
+    assert filtro.contem(_hashes(5000, 25000)).mean() < 0.02
+    
+    caminho = str(tmp_path / 'hash_nfse.sqlite3')
+    indice = HashNfseIndex(caminho, capacidade=100)
+    indice.registrar(_hashes(0, 300))
+    nfses = [{'hash_nfse': h} for h in _hashes(250, 350)] + [{'hash_nfse': None}]
+    
+    novas = indice.filtrar_novas(nfses)
+    
+    assert [n['hash_nfse'] for n in novas] == _hashes(300, 350) + [None]
+    assert indice.consultas_disco - indice.falsos_positivos == 50
+    assert indice.filtrar_novas([{'hash_nfse': h} for h in _hashes(0, 10)]) == []
+    assert indice.metricas()['ja_carregadas'] == 60 and indice.metricas()['lotes_evitados'] == 1
+    assert indice.metricas()['taxa_acerto'] == round(60 / 111, 3)
+    indice.fechar()
+    
+    reaberto = HashNfseIndex(caminho, capacidade=100)
+    assert reaberto.contar() == 300
+    assert len(reaberto.filtrar_novas([{'hash_nfse': h} for h in _hashes(290, 310)])) == 10
+    
+    assert reaberto.reconstruir(iter(_hashes(1000, 1200))) == 200
+    assert len(reaberto.filtrar_novas([{'hash_nfse': h} for h in _hashes(0, 300)])) == 300
+
+
+def test_integracao_pula_lote_ja_carregado_e_reconstroi_do_destino():
+    """Testa carga sem chamada ao destino quando o índice já tem todas as notas, e índice refeito pelo destino"""
+    loader = SqliteLoader()
+    integracao = NFSeCampinasIntegration(config={'CERT_PATH': None, 'DIRETORIO_ESTADO': None}, loader=loader)
+    nfses = integracao.parse_nfse_response(gerar_resposta_consulta(5))
+    
+    assert integracao.load_to_bigquery(nfses)
+    assert loader.jobs == 4
+    assert integracao.load_to_bigquery(nfses[::-1])
+    assert loader.jobs == 4
+    assert integracao.indice_hash.metricas()['lotes_evitados'] == 1
+    
+    # Índice perdido (outro diretório de estado): refeito a partir das chaves do destino
+    outra = NFSeCampinasIntegration(config={'CERT_PATH': None, 'DIRETORIO_ESTADO': None}, loader=loader)
+    assert outra.reconstruir_indice_hash() == 5
+    assert outra.load_to_bigquery(nfses)
+    assert loader.jobs == 4
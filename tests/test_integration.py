@@ -0,0 +1,302 @@
+"""Testes da integração NFSe Campinas (script)"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+import pytest
+import requests
+
+from tests.stubs.abrasf_stub import gerar_resposta_consulta
+from src.storage.sqlite_loader import SqliteLoader
+from src.storage.watermark import SqliteWatermarkStore
+from scripts.nfse_campinas_integration import (
+    NFSeCampinasIntegration, carregar_clientes, executar_clientes
+)
+
+
+class _IntegracaoFalsa(NFSeCampinasIntegration):
+    """Responde cada janela com atraso inverso à ordem e falha na terceira"""
+    
+    def requisitar_nfse_periodo(self, data_inicio, data_fim):
+        time.sleep((12 - data_inicio.month) * 0.005)
+        if data_inicio.month == 3:
+            raise RuntimeError("timeout simulado")
+        return [{'hash_nfse': data_inicio.strftime('%Y-%m-%d')}]
+
+
+@pytest.fixture
+def integracao():
+    return _IntegracaoFalsa(config={'CERT_PATH': None, 'DIRETORIO_ESTADO': None, 'CLIENTE_CNPJ': '10425636000139'})
+
+
+def test_consultar_janelas_paralelo_preserva_ordem(integracao):
+    """Testa mescla determinística e erros isolados por janela"""
+    janelas = [(datetime(2024, mes, 1), datetime(2024, mes, 28)) for mes in range(1, 7)]
+    
+    sequencial = integracao.consultar_janelas(janelas, workers=1)
+    paralelo = integracao.consultar_janelas(janelas, workers=4)
+    
+    assert [r['nfses'] for r in paralelo] == [r['nfses'] for r in sequencial]
+    assert [r['indice'] for r in paralelo] == list(range(6))
+    assert paralelo[2]['erro'] == "timeout simulado"
+    assert paralelo[2]['nfses'] == []
+    assert all(r['erro'] is None for i, r in enumerate(paralelo) if i != 2)
+
+
+def test_consultar_historico_carrega_em_lotes(integracao):
+    """Testa carga em lotes de lote_tamanho à medida que as janelas chegam"""
+    lotes = []
+    integracao.config['LOTE_TAMANHO'] = 2
+    integracao.load_to_bigquery = lambda nfses: lotes.append(list(nfses)) or True
+    
+    total = integracao.consultar_historico(meses_atras=6, workers=2)
+    
+    assert total == sum(len(lote) for lote in lotes)
+    assert all(len(lote) == 2 for lote in lotes[:-1])
+    assert 1 <= len(lotes[-1]) <= 2
+
+
+def test_consultar_historico_para_marca_dagua_na_primeira_falha(integracao):
+    """Testa janela e lote com falha: marca d'água parada antes deles e falhas no resumo"""
+    consultas = []
+    
+    def requisitar(data_inicio, data_fim):
+        consultas.append(data_inicio)
+        if len(consultas) == 3:
+            raise RuntimeError("janela perdida")
+        return [{'hash_nfse': str(len(consultas)), 'data_emissao': data_inicio.isoformat(timespec='seconds')}]
+    
+    lotes = []
+    integracao.requisitar_nfse_periodo = requisitar
+    integracao.config['LOTE_TAMANHO'] = 1
+    integracao.load_to_bigquery = lambda nfses: lotes.append(nfses) or len(lotes) != 4
+    
+    total = integracao.consultar_historico(meses_atras=6, workers=1)
+    
+    assert len(consultas) > 5
+    assert total == len(consultas) - 2
+    assert integracao.ultimo_historico == {
+        'janelas': len(consultas), 'janelas_com_erro': 1, 'janelas_com_quarentena': 0,
+        'notas_em_quarentena': 0, 'lotes_com_erro': 1, 'nfses_nao_carregadas': 1, 'falhas': 2
+    }
+    # Só as duas janelas antes da que falhou avançaram a marca
+    assert integracao.watermarks.obter('10425636000139') == consultas[1].replace(microsecond=0)
+
+
+def test_consultar_janela_divide_periodo_denso(integracao):
+    """Testa divisão recursiva de janela que estoura o timeout"""
+    consultas = []
+    
+    def requisitar(data_inicio, data_fim):
+        consultas.append((data_inicio, data_fim))
+        if (data_fim - data_inicio).days > 7:
+            raise requests.ReadTimeout("timeout simulado")
+        return [{'dia': data_inicio.day}]
+    
+    integracao.requisitar_nfse_periodo = requisitar
+    resultado = integracao.consultar_janela(0, datetime(2024, 1, 1), datetime(2024, 1, 31))
+    
+    assert resultado['erro'] is None
+    assert [n['dia'] for n in resultado['nfses']] == [1, 8, 16, 24]
+    assert integracao.planejador.meses['2024-01']['dias_max_seguro'] == 7
+
+
+def test_consultar_janela_nao_divide_em_timeout_de_conexao(integracao):
+    """Testa que servidor fora do ar (timeout de conexão) falha a janela sem dividi-la"""
+    consultas = []
+    
+    def requisitar(data_inicio, data_fim):
+        consultas.append((data_inicio, data_fim))
+        raise requests.ConnectTimeout("conexão não atendida")
+    
+    integracao.requisitar_nfse_periodo = requisitar
+    resultado = integracao.consultar_janela(0, datetime(2024, 1, 1), datetime(2024, 1, 31))
+    
+    assert len(consultas) == 1
+    assert resultado['erro'] == "conexão não atendida" and resultado['nfses'] == []
+    assert '2024-01' not in integracao.planejador.meses
+
+
+def test_consultar_janela_falha_com_resposta_mal_formada():
+    """Testa que XML truncado falha a janela em vez de virar período sem notas"""
+    class _Cliente:
+        def iterar_paginas(self, data_inicio, data_fim, stream=False):
+            yield gerar_resposta_consulta(2)
+            yield gerar_resposta_consulta(2)[:-40]
+    
+    integracao = NFSeCampinasIntegration(config={'CERT_PATH': None, 'DIRETORIO_ESTADO': None})
+    integracao._nfse_client = _Cliente()
+    resultado = integracao.consultar_janela(0, datetime(2024, 1, 1), datetime(2024, 1, 1))
+    
+    assert resultado['erro'] and resultado['nfses'] == []
+
+
+def test_consultar_incremento_parte_da_marca_dagua(integracao):
+    """Testa incremento a partir da marca d'água com relatório de re-consultas"""
+    from datetime import timedelta
+    agora = datetime.now()
+    emitidas = [agora - timedelta(hours=h) for h in (60, 50, 2)]
+    
+    def requisitar(data_inicio, data_fim):
+        return [{'data_emissao': d.isoformat(timespec='seconds')} for d in emitidas if data_inicio <= d <= data_fim]
+    
+    integracao.requisitar_nfse_periodo = requisitar
+    integracao.load_to_bigquery = lambda nfses: True
+    
+    assert integracao.consultar_incremento() == 3
+    assert integracao.ultimo_incremento['puladas'] == 0
+    
+    emitidas.append(agora - timedelta(hours=1))
+    assert integracao.consultar_incremento() == 2
+    assert integracao.ultimo_incremento['novas'] == 1
+    assert integracao.ultimo_incremento['reconsultadas'] == 1
+    assert integracao.ultimo_incremento['puladas'] == 2
+
+
+def test_consultar_incremento_registra_falhas(integracao):
+    """Testa janela com erro e carga com falha: falhas no relatório, nada carregado e marca d'água parada"""
+    from datetime import timedelta
+    emitida = datetime.now() - timedelta(hours=2)
+    
+    def requisitar(data_inicio, data_fim):
+        if data_inicio <= emitida <= data_fim:
+            return [{'hash_nfse': 'a', 'data_emissao': emitida.isoformat(timespec='seconds')}]
+        raise RuntimeError("janela perdida")
+    
+    integracao.requisitar_nfse_periodo = requisitar
+    integracao.load_to_bigquery = lambda nfses: False
+    
+    assert integracao.consultar_incremento() == 0
+    assert integracao.ultimo_incremento['falhas'] == integracao.ultimo_incremento['janelas_com_erro'] + 1
+    assert integracao.ultimo_incremento['lotes_com_erro'] == 1
+    assert integracao.watermarks.obter('10425636000139') is None
+
+
+def test_quarentena_no_xsd_segura_marca_dagua(tmp_path):
+    """Testa notas válidas carregadas e marca d'água parada enquanto a janela tem nota em quarentena"""
+    from datetime import timedelta
+    emitida = datetime.now() - timedelta(hours=2)
+    valida = gerar_resposta_consulta(3, data_emissao=emitida.strftime('%Y-%m-%d'))
+    respostas = [valida.replace(b'<Cnpj>10425636000139</Cnpj>', b'<Cnpj>10.425.636/0001-39</Cnpj>', 1), valida]
+    integracao = NFSeCampinasIntegration(config={
+        'CERT_PATH': None, 'DIRETORIO_ESTADO': None, 'CLIENTE_CNPJ': '10425636000139',
+        'VALIDACAO_XSD': True, 'DIRETORIO_QUARENTENA': str(tmp_path)
+    })
+    
+    def requisitar(data_inicio, data_fim):
+        if data_inicio <= emitida <= data_fim:
+            return integracao.parse_nfse_response(respostas[0])
+        return []
+    
+    integracao.requisitar_nfse_periodo = requisitar
+    integracao.load_to_bigquery = lambda nfses: True
+    
+    assert integracao.consultar_incremento() == 2
+    assert integracao.ultimo_incremento['janelas_com_quarentena'] == 1
+    assert integracao.ultimo_incremento['notas_em_quarentena'] == 1
+    assert integracao.ultimo_incremento['falhas'] == 1
+    assert integracao.watermarks.obter('10425636000139') is None
+    assert len(os.listdir(tmp_path / '10425636000139')) == 2
+    
+    # Nota corrigida na origem: a janela é consultada de novo e a marca avança
+    respostas.pop(0)
+    assert integracao.consultar_incremento() == 3
+    assert integracao.ultimo_incremento['falhas'] == 0
+    assert integracao.watermarks.obter('10425636000139') is not None
+
+
+def test_reprocessar_respostas_conta_so_lotes_carregados(tmp_path):
+    """Testa lote com falha fora do total e registrado em ultimo_reprocessamento"""
+    for i in range(3):
+        (tmp_path / f"resposta_{i}.xml").write_bytes(gerar_resposta_consulta(4, primeiro_numero=1 + 4 * i))
+    integracao = NFSeCampinasIntegration(config={'CERT_PATH': None, 'DIRETORIO_ESTADO': None, 'LOTE_TAMANHO': 5})
+    lotes = []
+    integracao.load_to_bigquery = lambda nfses: lotes.append(len(nfses)) or len(lotes) != 2
+    
+    total = integracao.reprocessar_respostas(str(tmp_path), workers=1)
+    
+    assert lotes == [5, 5, 2]
+    assert total == 7
+    assert integracao.ultimo_reprocessamento == {
+        'arquivos': 3, 'lotes_com_erro': 1, 'nfses_nao_carregadas': 5, 'falhas': 1
+    }
+
+
+def test_carregar_clientes_herda_certificado_e_usa_bloco_unico():
+    """Testa lista de clientes do config.yaml com fallback para o bloco cliente"""
+    nfse = {'certificado_path': 'padrao.pfx', 'certificado_senha': 'senha'}
+    
+    unico = carregar_clientes({'cliente': {'cnpj': '10425636000139', 'inscricao_municipal': '1'}, 'nfse': nfse})
+    varios = carregar_clientes({
+        'clientes': [
+            {'cnpj': '111', 'inscricao_municipal': '1'},
+            {'cnpj': '222', 'inscricao_municipal': '2', 'certificado_path': 'outro.pfx', 'max_concorrencia': 1}
+        ],
+        'nfse': nfse
+    })
+    
+    assert [c['cnpj'] for c in unico] == ['10425636000139']
+    assert [c['certificado_path'] for c in varios] == ['padrao.pfx', 'outro.pfx']
+    assert varios[1]['max_concorrencia'] == 1
+
+
+def test_executar_clientes_respeita_teto_global(monkeypatch):
+    """Testa clientes em paralelo sob teto global, com marca d'água por CNPJ"""
+    em_voo = []
+    pico = []
+    lock = threading.Lock()
+    
+    def requisitar(self, data_inicio, data_fim):
+        with lock:
+            em_voo.append(1)
+            pico.append(len(em_voo))
+        time.sleep(0.02)
+        with lock:
+            em_voo.pop()
+        return [{'hash_nfse': f"{self.config['CLIENTE_CNPJ']}-{data_inicio:%Y%m%d}",
+                 'data_emissao': data_fim.strftime('%Y-%m-%dT%H:%M:%S')}]
+    
+    monkeypatch.setattr(NFSeCampinasIntegration, 'requisitar_nfse_periodo', requisitar)
+    monkeypatch.setattr(NFSeCampinasIntegration, 'load_to_bigquery', lambda self, nfses: True)
+    clientes = [
+        {'nome': f'Cliente {i}', 'cnpj': f'{i}' * 14, 'inscricao_municipal': str(i),
+         'certificado_path': None, 'certificado_senha': None, 'max_concorrencia': 4}
+        for i in range(1, 4)
+    ]
+    
+    watermarks = SqliteWatermarkStore()
+    
+    resultados = executar_clientes(
+        clientes, modo='historico', meses=3, max_concorrencia_global=2,
+        config={'DIRETORIO_ESTADO': None, 'PERIODO_DIAS': 7}, watermarks=watermarks
+    )
+    
+    assert list(resultados) == [c['cnpj'] for c in clientes]
+    assert all(r['erro'] is None and r['nfses'] > 0 for r in resultados.values())
+    assert max(pico) == 2
+    # Marcas d'água no armazenamento compartilhado, uma por cliente
+    assert all(watermarks.obter(c['cnpj']) is not None for c in clientes)
+
+
+def test_load_to_bigquery_mescla_nfses_e_tributos_pela_chave():
+    """Testa staging + merge pela chave: repetidas no lote e em nova carga não duplicam"""
+    loader = SqliteLoader()
+    integracao = NFSeCampinasIntegration(config={'CERT_PATH': None, 'DIRETORIO_ESTADO': None}, loader=loader)
+    nfses = integracao.parse_nfse_response(gerar_resposta_consulta(3))
+    
+    assert integracao.load_to_bigquery(nfses + nfses[:1])
+    assert integracao.load_to_bigquery(nfses + integracao.parse_nfse_response(gerar_resposta_consulta(1, primeiro_numero=4)))
+    
+    carregadas = loader.consultar("SELECT hash_nfse, data_emissao FROM nfse_campinas")
+    tributos = loader.consultar("SELECT * FROM nf_tributos")
+    assert len(carregadas) == 4 and len({n['hash_nfse'] for n in carregadas}) == 4
+    assert carregadas[0]['data_emissao'] == '2024-01-15'
+    assert len(tributos) == 20 and len({t['id'] for t in tributos}) == 20
+    assert {t['tipo_tributo'] for t in tributos} == {'PIS', 'COFINS', 'IR', 'CSLL', 'ISS'}
+    assert all(t['hash_nfse'] in {n['hash_nfse'] for n in carregadas} for t in tributos)
+    iss = next(t for t in tributos if t['tipo_tributo'] == 'ISS')
+    assert iss['retido'] == 0 and iss['aliquota'] == '2.0'
+    # Dois jobs (staging + merge) por tabela e por carga, qualquer que seja o lote
+    assert loader.jobs == 8
@@ -0,0 +1,93 @@
+"""Testes da conversão exata de valores monetários"""
+
+from decimal import Decimal
+
+import pytest
+
+from tests.stubs.abrasf_stub import gerar_resposta_consulta
+from src.parsers.money import (
+    ValorMonetarioInvalido, conversor_float, inteiros_em_lote, parse_centavos, parse_decimal
+)
+from src.parsers.xml_parser import NfseXmlParser
+
+
+def test_formatos_aceitos_e_invalidos():
+    """Testa caminho rápido, formato brasileiro, casas a mais e textos inválidos"""
+    assert parse_centavos('1234.56') == 123456
+    assert parse_centavos('-0.05') == -5
+    assert parse_centavos('1.234,56') == 123456
+    assert parse_centavos('1.234.567') == 123456700
+    assert parse_centavos('12.5') == 1250
+    assert parse_centavos('3.1000') == 310
+    assert parse_centavos('  ') is None
+    assert parse_decimal('1.234,5') == Decimal('1234.50')
+    assert conversor_float(4)('2.0000') == 2.0
+    
+    for texto in ('1.005', '1.234', 'abc', '1e3', 'nan', '12,34.5'):
+        with pytest.raises(ValorMonetarioInvalido):
+            parse_centavos(texto)
+    
+    textos = ['1031.70', None, '1.234,56', 'abc', '0.001', '0.00'] * 1000
+    inteiros, nulos, invalidos = inteiros_em_lote(textos, bloco=512)
+    assert inteiros[:6].tolist() == [103170, 0, 123456, 0, 0, 0]
+    assert nulos[:6].tolist() == [False, True, False, True, True, False]
+    assert len(invalidos) == 2000
+    assert inteiros.tolist() == [parse_centavos(t) or 0 for t in ('1031.70', None, '1.234,56', None, None, '0.00') * 1000]
+
+
+def test_lote_e_escalar_aceitam_os_mesmos_textos():
+    """Testa notação científica, nan/inf, sublinhado e dígitos não ASCII rejeitados nos dois caminhos"""
+    textos = ['1e3', '10.00', '1E-2', 'nan', 'inf', '1_000.00', '\u0661\u0662.00', ' 7.50 ', '1.234,56', None, '+.5']
+    
+    def escalar(texto):
+        try:
+            return parse_centavos(texto), False
+        except ValorMonetarioInvalido:
+            return None, True
+    
+    esperado = [escalar(t) for t in textos]
+    for bloco in (1, 4, 4096):
+        inteiros, nulos, invalidos = inteiros_em_lote(textos, bloco=bloco)
+        lote = [(None if nulo else int(v), i in invalidos) for i, (v, nulo) in enumerate(zip(inteiros, nulos))]
+        assert lote == esperado
+    assert [i for i, (_, invalido) in enumerate(esperado) if invalido] == [0, 2, 3, 4, 5, 6]
+    with pytest.raises(ValorMonetarioInvalido):
+        conversor_float()('1_000.00')
+
+
+def test_lote_e_escalar_iguais_com_casas_a_mais_em_valores_grandes():
+    """Testa terceira casa em valores acima de R$1M, casas zeradas e limite de 15 dígitos nos dois caminhos"""
+    textos = ['1234567.891', '10000000.005', '99999999.999', '0.000000001', '1234567.89', '3.1000',
+              '9999999999999.99', '12345678901234.56', '-5000000.10', '123456789012.3456'] * 3
+    
+    def escalar(texto):
+        try:
+            return parse_centavos(texto)
+        except ValorMonetarioInvalido:
+            return 'invalido'
+    
+    for bloco in (1, 7, 4096):
+        inteiros, nulos, invalidos = inteiros_em_lote(textos, bloco=bloco)
+        lote = ['invalido' if i in invalidos else None if nulo else int(v)
+                for i, (v, nulo) in enumerate(zip(inteiros, nulos))]
+        assert lote == [escalar(t) for t in textos]
+    assert lote[:10] == ['invalido'] * 4 + [123456789, 310, 999999999999999, 1234567890123456, -500000010, 'invalido']
+
+
+def test_parser_mantem_invalido_nulo_e_conta():
+    """Testa valor malformado nulo (não zerado), contado por coluna, e modos centavos/decimal"""
+    xml = gerar_resposta_consulta(2).replace(b'<ValorDeducoes>0.00</ValorDeducoes>', b'<ValorDeducoes>1,0,0</ValorDeducoes>', 1)
+    
+    parser = NfseXmlParser()
+    nfses = parser.parse_nfse_response(xml)
+    
+    assert nfses[0]['valor_deducoes'] is None
+    assert nfses[1]['valor_deducoes'] == 0.0
+    assert parser.metricas() == {'valores_invalidos': 1, 'por_coluna': {'valor_deducoes': 1}}
+    
+    centavos = NfseXmlParser(monetario='centavos').parse_nfse_response(xml)
+    decimais = NfseXmlParser(monetario='decimal').parse_nfse_response(xml)
+    assert centavos[1]['valor_servicos'] == round(nfses[1]['valor_servicos'] * 100)
+    assert centavos[1]['aliquota'] == 20000
+    assert decimais[1]['valor_servicos'] == Decimal(centavos[1]['valor_servicos']).scaleb(-2)
+    assert centavos[1]['valor_inss'] == 0 and decimais[1]['valor_inss'] == 0
@@ -0,0 +1,75 @@
+"""Testes do lote colunar de NFSe"""
+
+import io
+import json
+
+import pyarrow as pa
+import pytest
+
+from tests.stubs.abrasf_stub import gerar_resposta_consulta
+from src.parsers.nfse_batch import NfseBatch
+from src.parsers.xml_parser import NfseXmlParser
+
+
+def _nfses(quantidade=5):
+    return NfseXmlParser().parse_nfse_response(gerar_resposta_consulta(quantidade, data_emissao='2024-05-02'))
+
+
+def test_lote_reconstroi_registros_e_compartilha_textos():
+    """Testa ida e volta dict -> colunas -> dict, com nulos e textos repetidos no dicionário"""
+    nfses = _nfses()
+    nfses[1]['iss_retido'] = None
+    nfses[2]['data_competencia'] = None
+    nfses[3]['valor_servicos'] = 1234567.89
+    
+    lote = NfseBatch.de_registros(nfses)
+    
+    assert len(lote) == 5
+    assert list(lote.iterar_registros()) == nfses
+    assert lote.valores('valor_servicos', valores_exatos=True)[3] == '1234567.89'
+    # UF e razão social do prestador guardadas uma vez, um código por nota
+    assert lote._dicionarios['prestador_uf'][0] == ['SP']
+    assert len(lote._dicionarios['prestador_razao_social'][0]) == 1
+    
+    with pytest.raises(ValueError, match='data_emissao'):
+        lote.adicionar(dict(nfses[0], data_emissao='02/05/2024'))
+    assert len(lote) == 5
+
+
+def test_lote_exporta_arrow_e_ndjson():
+    """Testa tipos Arrow (buffers do lote) e NDJSON com valores decimais exatos"""
+    lote = NfseBatch.de_registros(_nfses(3))
+    
+    tabela = lote.para_arrow()
+    
+    assert tabela.num_rows == 3
+    assert tabela.schema.field('valor_servicos').type == pa.decimal128(18, 2)
+    assert tabela.schema.field('aliquota').type == pa.decimal128(18, 4)
+    assert tabela.schema.field('data_competencia').type == pa.date32()
+    assert pa.types.is_dictionary(tabela.schema.field('tomador_uf').type)
+    assert tabela.column('data_competencia')[0].as_py().isoformat() == '2024-05-02'
+    assert str(tabela.column('valor_servicos')[0].as_py()) == f"{lote.valores('valor_servicos')[0]:.2f}"
+    # Datas sem cópia: o Arrow aponta para o buffer do array do lote
+    datas = lote._dados['data_competencia']
+    assert tabela.column('data_competencia').chunk(0).buffers()[1].address == datas.buffer_info()[0]
+    
+    saida = io.BytesIO()
+    lote.gravar_ndjson(saida)
+    linhas = [json.loads(linha) for linha in saida.getvalue().decode('utf-8').splitlines()]
+    assert len(linhas) == 3
+    assert linhas[0]['valor_servicos'] == lote.valores('valor_servicos', valores_exatos=True)[0]
+    assert linhas[0]['data_emissao'] == '2024-05-02T10:00:00-03:00'
+
+
+def test_data_hora_sem_fuso_e_hora_de_campinas():
+    """Testa instante UTC no Arrow e texto original de volta, com e sem fuso"""
+    nfses = _nfses(2)
+    nfses[0]['data_emissao'] = '2024-05-02T10:00:00'
+    nfses[1]['data_emissao'] = '2024-05-02T10:00:00+01:00'
+    
+    lote = NfseBatch.de_registros(nfses)
+    
+    instantes = [t.isoformat() for t in lote.para_arrow().column('data_emissao').to_pylist()]
+    assert instantes == ['2024-05-02T13:00:00+00:00', '2024-05-02T09:00:00+00:00']
+    assert [r['data_emissao'] for r in lote.iterar_registros()] == [n['data_emissao'] for n in nfses]
+    assert lote.valores('data_emissao', valores_exatos=True) == ['2024-05-02T10:00:00-03:00', '2024-05-02T10:00:00+01:00']
@@ -0,0 +1,118 @@
+"""Testes do cliente SOAP NFSe"""
+
+import gzip
+import time
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from tests.stubs.abrasf_stub import ServidorAbrasfLocal
+from tests.stubs.certificados import gerar_certificados, contexto_servidor_mtls
+from src.api.nfse_client import NfseClient, NAMESPACE_NFSE
+
+
+@pytest.fixture(scope='module')
+def certificados(tmp_path_factory):
+    return gerar_certificados(str(tmp_path_factory.mktemp('certificados')))
+
+
+def _config(url, certificados):
+    return {
+        'cliente': {'cnpj': '10425636000139', 'inscricao_municipal': '001557548'},
+        'nfse': {
+            'endpoint': url,
+            'certificado_path': certificados['cliente_pfx'],
+            'certificado_senha': certificados['senha'],
+            'ca_bundle': certificados['ca'],
+        }
+    }
+
+
+def test_consulta_mtls_reutiliza_conexao(certificados):
+    """Testa TLS mútuo com uma única conexão para várias consultas"""
+    contexto = contexto_servidor_mtls(certificados)
+    with ServidorAbrasfLocal(notas_por_janela=2, contexto_ssl=contexto) as servidor:
+        with NfseClient(_config(servidor.url, certificados)) as client:
+            respostas = [client.consultar_nfse_periodo('2024-01-01', '2024-01-31') for _ in range(3)]
+    
+    assert all('<CompNfse>' in xml for xml in respostas)
+    assert servidor.requisicoes == 3
+    assert servidor.conexoes == 1
+
+
+def test_iterar_paginas_segue_proxima_pagina():
+    """Testa consulta paginada até a última página, em ordem"""
+    config = {
+        'cliente': {'cnpj': '10425636000139', 'inscricao_municipal': '001557548'},
+        'nfse': {'endpoint': None}
+    }
+    with ServidorAbrasfLocal(notas_por_janela=25, notas_por_pagina=10) as servidor:
+        config['nfse']['endpoint'] = servidor.url
+        with NfseClient(config) as client:
+            paginas = list(client.iterar_paginas('2024-01-01', '2024-01-31'))
+    
+    assert servidor.requisicoes == 3
+    assert [xml.count('<CompNfse>') for xml in paginas] == [10, 10, 5]
+    assert [NfseClient.proxima_pagina(xml) for xml in paginas] == [2, 3, None]
+
+
+def test_wsdl_lazy_e_cache_offline(tmp_path):
+    """Testa WSDL carregado só no primeiro uso e servido do cache sem rede"""
+    config = {
+        'cliente': {'cnpj': '10425636000139', 'inscricao_municipal': '001557548'},
+        'nfse': {'endpoint': None, 'wsdl_cache': str(tmp_path / 'wsdl.sqlite3')}
+    }
+    with ServidorAbrasfLocal() as servidor:
+        config['nfse']['endpoint'] = servidor.url
+        client = NfseClient(config)
+        assert servidor.downloads == 0
+        
+        client.operacao('ConsultarNfseServicoPrestado')
+        assert servidor.downloads == 2
+    
+    # Servidor desligado: WSDL e XSD vêm do cache em disco
+    offline = NfseClient(config)
+    assert offline.operacao('ConsultarNfseServicoPrestado') is not None
+
+
+def test_iterar_paginas_stream_preserva_gzip(tmp_path):
+    """Testa corpo gzip gravado sem decodificar, em disco acima do limite, e lido pelo parser"""
+    config = {
+        'cliente': {'cnpj': '10425636000139', 'inscricao_municipal': '001557548'},
+        'nfse': {'endpoint': None, 'resposta_spool_mb': 0.001}
+    }
+    with ServidorAbrasfLocal(notas_por_janela=25, notas_por_pagina=10, gzip=True) as servidor:
+        config['nfse']['endpoint'] = servidor.url
+        with NfseClient(config) as client:
+            notas = []
+            for i, resposta in enumerate(client.iterar_paginas('2024-01-01', '2024-01-31', stream=True)):
+                assert resposta.comprimido
+                assert resposta.arquivo._rolled
+                resposta.salvar(str(tmp_path / f'p{i}.xml.gz'))
+                raiz = ET.parse(resposta.abrir()).getroot()
+                notas.append(len(raiz.findall(f'.//{{{NAMESPACE_NFSE}}}CompNfse')))
+    
+    assert notas == [10, 10, 5]
+    assert gzip.decompress((tmp_path / 'p2.xml.gz').read_bytes()).count(b'<CompNfse>') == 5
+
+
+def test_iterar_paginas_fecha_pagina_antecipada_ao_parar():
+    """Testa que break no meio da paginação fecha a resposta já requisitada da página seguinte"""
+    config = {
+        'cliente': {'cnpj': '10425636000139', 'inscricao_municipal': '001557548'},
+        'nfse': {'endpoint': None}
+    }
+    with ServidorAbrasfLocal(notas_por_janela=25, notas_por_pagina=10) as servidor:
+        config['nfse']['endpoint'] = servidor.url
+        with NfseClient(config) as client:
+            respostas = []
+            baixar = client.baixar_nfse_periodo
+            client.baixar_nfse_periodo = lambda *args: respostas.append(baixar(*args)) or respostas[-1]
+            
+            for resposta in client.iterar_paginas('2024-01-01', '2024-01-31', stream=True):
+                # Página 2 já em andamento ou baixada quando o chamador desiste
+                time.sleep(0.2)
+                break
+    
+    assert len(respostas) == 2
+    assert all(r.arquivo.closed for r in respostas)
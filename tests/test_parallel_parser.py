@@ -0,0 +1,46 @@
+"""Testes do parse paralelo de respostas arquivadas"""
+
+import gzip
+
+from tests.stubs.abrasf_stub import gerar_resposta_consulta
+from src.parsers.parallel_parser import ParallelNfseParser, listar_respostas
+from src.parsers.xml_parser import NfseXmlParser
+
+
+def _acervo(diretorio):
+    """Três respostas: uma grande (.xml), uma pequena (.xml) e uma .xml.gz"""
+    arquivos = {
+        'a_grande.xml': gerar_resposta_consulta(40, primeiro_numero=1, proxima_pagina=2),
+        'b_pequena.xml': gerar_resposta_consulta(3, primeiro_numero=100),
+        'c_comprimida.xml.gz': gzip.compress(gerar_resposta_consulta(7, primeiro_numero=200)),
+    }
+    for nome, conteudo in arquivos.items():
+        (diretorio / nome).write_bytes(conteudo)
+    return listar_respostas(str(diretorio))
+
+
+def test_parse_paralelo_divide_arquivo_e_preserva_ordem(tmp_path):
+    """Testa trechos em fronteiras de CompNfse e mesma ordem do parse sequencial"""
+    caminhos = _acervo(tmp_path)
+    sequencial = []
+    for caminho in caminhos:
+        with (gzip.open(caminho) if caminho.endswith('.gz') else open(caminho, 'rb')) as arquivo:
+            sequencial.extend(n['hash_nfse'] for n in NfseXmlParser().iterar_nfse(arquivo))
+    
+    parser = ParallelNfseParser(workers=2, bloco_bytes=20000)
+    tarefas = parser.planejar_tarefas(caminhos)
+    paralelo = [n['hash_nfse'] for n in parser.iterar_nfse(caminhos)]
+    
+    assert len(tarefas) > len(caminhos)
+    assert paralelo == sequencial
+    assert len(paralelo) == 50
+
+
+def test_parse_paralelo_sem_ordem_entrega_todas(tmp_path):
+    """Testa modo por conclusão com o mesmo conjunto de notas"""
+    caminhos = _acervo(tmp_path)
+    
+    notas = list(ParallelNfseParser(workers=2, bloco_bytes=20000).iterar_nfse(caminhos, ordenado=False))
+    
+    assert len({n['hash_nfse'] for n in notas}) == 50
+    assert all(n['prestador_cnpj'] == '10425636000139' for n in notas)
@@ -1,9 +1,66 @@
 """Testes do parser XML"""
 
+import io
+import json
+
 import pytest
 
+from tests.stubs.abrasf_stub import gerar_resposta_consulta
+from src.parsers.xml_parser import NfseXmlParser, CAMPOS_NFSE
+
+_TOMADOR_BAIRRO = 'DeclaracaoPrestacaoServico/InfDeclaracaoPrestacaoServico/TomadorServico/Endereco/Bairro'
+
 
 def test_parse_nfse_valida():
     """Testa parse de XML válido"""
-    # TODO: Implementar teste
-    pass
+    xml = gerar_resposta_consulta(3, primeiro_numero=10, data_emissao='2024-05-02', proxima_pagina=2)
+    
+    nfses = NfseXmlParser().parse_nfse_response(xml)
+    
+    assert [n['numero_nfse'] for n in nfses] == ['000000000000010', '000000000000011', '000000000000012']
+    assert nfses[0]['data_emissao'] == '2024-05-02T10:00:00'
+    assert nfses[0]['prestador_cnpj'] == '10425636000139'
+    assert nfses[0]['tomador_cnpj'] == '11222333000110'
+    assert nfses[0]['valor_servicos'] == pytest.approx(1031.70)
+    assert nfses[0]['item_lista_servico'] == '17.01'
+    assert len({n['hash_nfse'] for n in nfses}) == 3
+
+
+def test_iterar_nfse_libera_notas_processadas():
+    """Testa leitura de arquivo com a árvore podada a cada nota"""
+    xml = gerar_resposta_consulta(50)
+    parser = NfseXmlParser()
+    anteriores = []
+    
+    original = parser.extrair_nfse
+    
+    def extrair(comp_nfse, *args):
+        anteriores.append(comp_nfse.getparent().index(comp_nfse))
+        return original(comp_nfse, *args)
+    
+    parser.extrair_nfse = extrair
+    nfses = list(parser.iterar_nfse(io.BytesIO(xml)))
+    
+    assert len(nfses) == 50
+    # Notas já entregues saem da ListaNfse (resta no máximo a anterior, vazia)
+    assert max(anteriores) <= 1
+
+
+def test_mapeamento_cobre_schema_nf_emitidas():
+    """Testa extração em passagem única das colunas de nf_emitidas e coluna nova via mapeamento"""
+    with open('schemas/bigquery/nf_emitidas.json', encoding='utf-8') as arquivo:
+        colunas_schema = {coluna['name'] for coluna in json.load(arquivo)}
+    xml = gerar_resposta_consulta(1, primeiro_numero=7, data_emissao='2024-05-02')
+    campos = CAMPOS_NFSE + (('tomador_nome_bairro', _TOMADOR_BAIRRO, 'texto'),)
+    
+    nfse = NfseXmlParser(campos=campos).parse_nfse_response(xml)[0]
+    
+    ausentes = colunas_schema - set(nfse) - {'xml_original', 'url_nfse', 'data_atualizacao'}
+    assert not ausentes
+    assert nfse['tomador_cpf_cnpj'] == nfse['tomador_cnpj']
+    assert nfse['rps_numero'] == '7'
+    assert nfse['rps_data_emissao'] == '2024-05-02'
+    assert nfse['iss_retido'] is False
+    assert nfse['valor_iss_retido'] == 0.0
+    assert nfse['status_nfse'] == 'Normal'
+    assert nfse['tomador_nome_bairro'] == 'Cambuí'
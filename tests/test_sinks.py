@@ -0,0 +1,63 @@
+"""Testes dos destinos de carga (Parquet e SQLite locais, escolha pelo config)"""
+
+from decimal import Decimal
+
+import pytest
+
+from tests.stubs.abrasf_stub import gerar_resposta_consulta
+from scripts.nfse_campinas_integration import NFSeCampinasIntegration
+from src.storage.parquet_loader import ParquetLoader
+from src.storage.sink import criar_sink
+from src.storage.sqlite_loader import SqliteLoader
+
+
+def test_parquet_particiona_por_mes_e_nao_duplica(tmp_path):
+    """Testa partições por mês de data_emissao, valores exatos e chaves lidas de volta numa nova instância"""
+    integracao = NFSeCampinasIntegration(config={'CERT_PATH': None, 'DIRETORIO_ESTADO': None})
+    maio = integracao.parse_nfse_response(gerar_resposta_consulta(3, data_emissao='2024-05-02'))
+    junho = integracao.parse_nfse_response(gerar_resposta_consulta(2, data_emissao='2024-06-10', primeiro_numero=4))
+    integracao._loader = ParquetLoader(str(tmp_path))
+    
+    assert integracao.load_to_bigquery(maio + junho + maio[:1])
+    
+    particoes = sorted(p.name for p in (tmp_path / 'nfse_campinas').iterdir())
+    assert particoes == ['data_emissao_mes=2024-05', 'data_emissao_mes=2024-06']
+    assert (tmp_path / 'nf_tributos' / 'data_emissao_mes=2024-05').is_dir()
+    
+    # Outra instância no mesmo diretório: chaves já gravadas não entram de novo
+    novo = ParquetLoader(str(tmp_path))
+    integracao._loader = novo
+    integracao._tabela_tributos_ok = False
+    assert integracao.load_to_bigquery(maio + integracao.parse_nfse_response(
+        gerar_resposta_consulta(1, data_emissao='2024-06-11', primeiro_numero=6)
+    ))
+    assert novo.jobs == 2
+    
+    table_id = f"{integracao.config['PROJECT_ID']}.{integracao.config['DATASET_RAW']}.nfse_campinas"
+    tabela = novo.ler(table_id).to_pylist()
+    assert len(tabela) == 6 and len({linha['hash_nfse'] for linha in tabela}) == 6
+    primeira = next(linha for linha in tabela if linha['hash_nfse'] == maio[0]['hash_nfse'])
+    assert primeira['valor_servicos'] == Decimal(str(maio[0]['valor_servicos']))
+    assert primeira['data_emissao'].isoformat() == '2024-05-02'
+    assert sorted(novo.iterar_chaves(table_id, 'hash_nfse')) == sorted(linha['hash_nfse'] for linha in tabela)
+
+
+@pytest.mark.parametrize('destino, classe', [('parquet', ParquetLoader), ('sqlite', SqliteLoader)])
+def test_destino_escolhido_pelo_config(tmp_path, destino, classe):
+    """Testa criar_sink pelo config.yaml e a integração carregando no destino local"""
+    armazenamento = {
+        'destino': destino,
+        'diretorio_parquet': str(tmp_path / 'parquet'),
+        'caminho_sqlite': str(tmp_path / 'nfse.sqlite3')
+    }
+    integracao = NFSeCampinasIntegration(
+        config={'CERT_PATH': None, 'DIRETORIO_ESTADO': None, 'ARMAZENAMENTO': armazenamento}
+    )
+    nfses = integracao.parse_nfse_response(gerar_resposta_consulta(4))
+    
+    assert isinstance(integracao.loader, classe)
+    assert integracao._bq_client is None
+    assert integracao.load_to_bigquery(nfses)
+    
+    with pytest.raises(ValueError, match='duckdb'):
+        criar_sink({'armazenamento': {'destino': 'duckdb'}})
@@ -0,0 +1,123 @@
+"""Testes do controle de vazão do webservice NFSe"""
+
+import threading
+import time
+
+import pytest
+import requests
+
+from src.api.nfse_client import NfseClient
+from src.api.throttling import SqliteTokenBucket, CircuitBreaker, CircuitoAbertoError
+
+
+class _Resposta:
+    def __init__(self, status_code, text='', headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+
+def test_token_bucket_compartilhado_entre_instancias(tmp_path):
+    """Testa vazão única para dois limitadores no mesmo arquivo (processos distintos)"""
+    caminho = str(tmp_path / 'limite.sqlite3')
+    limitadores = [SqliteTokenBucket(caminho, taxa=20, capacidade=1) for _ in range(2)]
+    
+    inicio = time.perf_counter()
+    threads = [
+        threading.Thread(target=lambda l=limitador: [l.adquirir() for _ in range(5)])
+        for limitador in limitadores
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    decorrido = time.perf_counter() - inicio
+    
+    # 10 tokens a 20/s com rajada de 1: ~0.45s no mínimo
+    assert decorrido >= 0.4
+    assert sum(l.metricas()['adquiridos'] for l in limitadores) == 10
+    assert sum(l.metricas()['esperas'] for l in limitadores) >= 8
+
+
+def test_circuit_breaker_abre_e_testa_apos_pausa():
+    """Testa abertura após falhas seguidas e uma única consulta de teste na reabertura"""
+    circuito = CircuitBreaker(limiar_falhas=2, pausa_segundos=0.05)
+    
+    circuito.permitir()
+    circuito.registrar_falha()
+    circuito.registrar_falha()
+    with pytest.raises(CircuitoAbertoError):
+        circuito.permitir()
+    
+    time.sleep(0.06)
+    circuito.permitir()
+    with pytest.raises(CircuitoAbertoError):
+        circuito.permitir()
+    circuito.registrar_sucesso()
+    
+    assert circuito.estado == CircuitBreaker.FECHADO
+    assert circuito.metricas()['aberturas'] == 1
+    assert circuito.metricas()['rejeitadas'] == 2
+
+
+def _client(**nfse):
+    return NfseClient({
+        'cliente': {'cnpj': '10425636000139', 'inscricao_municipal': '001557548'},
+        'nfse': {'endpoint': 'http://127.0.0.1:9/ws', 'retry_base_segundos': 0.01, **nfse}
+    })
+
+
+def test_consulta_repete_429_e_5xx_ate_sucesso(monkeypatch):
+    """Testa novas tentativas com backoff em sobrecarga, sem abrir o circuito"""
+    respostas = [_Resposta(429, headers={'Retry-After': '0'}), _Resposta(503), _Resposta(200, '<ok/>')]
+    client = _client(retry_tentativas=3)
+    monkeypatch.setattr(client.session, 'post', lambda *a, **k: respostas.pop(0))
+    
+    assert client.consultar_nfse_periodo('2024-01-01', '2024-01-31') == '<ok/>'
+    assert client.metricas()['retry']['retries'] == 2
+    assert client.metricas()['circuito']['estado'] == CircuitBreaker.FECHADO
+
+
+def test_consulta_propaga_erro_e_circuito_suspende(monkeypatch):
+    """Testa erro propagado ao esgotar tentativas e falha imediata com circuito aberto"""
+    chamadas = []
+    
+    def post(*args, **kwargs):
+        chamadas.append(1)
+        raise requests.ConnectionError("conexão recusada")
+    
+    client = _client(retry_tentativas=2, circuito_falhas=2, circuito_pausa_segundos=60)
+    monkeypatch.setattr(client.session, 'post', post)
+    
+    with pytest.raises(requests.ConnectionError):
+        client.consultar_nfse_periodo('2024-01-01', '2024-01-31')
+    with pytest.raises(CircuitoAbertoError):
+        client.consultar_nfse_periodo('2024-02-01', '2024-02-28')
+    
+    assert len(chamadas) == 2
+    assert client.metricas()['retry']['esgotadas'] == 1
+
+
+def test_timeout_de_conexao_repete_e_abre_circuito_mas_leitura_nao(monkeypatch):
+    """Testa timeout de conexão como falha do servidor (retry + circuito) e timeout de leitura sem retry"""
+    erros = []
+    
+    def post(*args, **kwargs):
+        erros.append(1)
+        raise erro
+    
+    client = _client(retry_tentativas=3, circuito_falhas=3, circuito_pausa_segundos=60)
+    monkeypatch.setattr(client.session, 'post', post)
+    
+    erro = requests.ReadTimeout("leitura lenta")
+    with pytest.raises(requests.ReadTimeout):
+        client.consultar_nfse_periodo('2024-01-01', '2024-01-31')
+    assert len(erros) == 1
+    assert client.metricas()['circuito']['estado'] == CircuitBreaker.FECHADO
+    
+    erro = requests.ConnectTimeout("conexão não atendida")
+    with pytest.raises(requests.ConnectTimeout):
+        client.consultar_nfse_periodo('2024-01-01', '2024-01-31')
+    assert len(erros) == 4
+    assert client.metricas()['retry']['retries'] == 2
+    assert client.metricas()['circuito']['estado'] == CircuitBreaker.ABERTO
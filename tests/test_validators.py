@@ -0,0 +1,83 @@
+"""Testes da validação de CNPJ/CPF (escalar e em lote)"""
+
+import random
+import string
+
+import numpy as np
+import pandas as pd
+
+from src.parsers import validators
+from src.parsers.validators import (
+    calcular_dv_cnpj, validar_cnpj, validar_cnpj_lote, validar_cpf, validar_cpf_lote
+)
+
+
+def test_cnpj_numerico_alfanumerico_e_cpf():
+    """Testa máscara, CNPJ alfanumérico, dígito errado, repetidos, nulos e Series"""
+    cnpjs = ['10425636000139', '10.425.636/0001-39', '12.ABC.345/01DE-35', '12abc34501de35',
+             '12.ABC.345/01DE-36', '00000000000000', '1042563600013', None, '']
+    esperado = [True, True, True, True, False, False, False, False, False]
+    
+    assert [validar_cnpj(c) for c in cnpjs] == esperado
+    assert validar_cnpj_lote(cnpjs).tolist() == esperado
+    assert calcular_dv_cnpj('12ABC34501DE') == '35'
+    assert not validar_cnpj('12ABC34501DE35', alfanumerico=False)
+    assert validar_cnpj_lote(['12ABC34501DE35', '10425636000139'], alfanumerico=False).tolist() == [False, True]
+    
+    # Planilha lida como número: zeros à esquerda perdidos e NaN
+    serie = pd.Series([4252011000110.0, np.nan, 10425636000139.0], index=[7, 8, 9])
+    resultado = validar_cnpj_lote(serie)
+    assert resultado.index.tolist() == [7, 8, 9]
+    assert resultado.tolist() == [validar_cnpj('04252011000110'), False, True]
+    
+    cpfs = ['529.982.247-25', '52998224725', '52998224726', '111.111.111-11', 'abc']
+    assert validar_cpf_lote(cpfs).tolist() == [True, True, False, False, False]
+    assert [validar_cpf(c) for c in cpfs] == [True, True, False, False, False]
+
+
+def test_lote_igual_ao_escalar(monkeypatch):
+    """Testa o mesmo veredito do lote e do escalar em documentos aleatórios, entre blocos"""
+    monkeypatch.setattr(validators, 'BLOCO_VALIDACAO', 97)
+    aleatorio = random.Random(3)
+    alfabeto = string.digits + string.ascii_uppercase
+    
+    cnpjs = []
+    for i in range(2000):
+        raiz = ''.join(aleatorio.choice(alfabeto if i % 2 else string.digits) for _ in range(12))
+        cnpj = raiz + calcular_dv_cnpj(raiz)
+        # Algumas alterações: dígito, caractere inválido, máscara, minúsculas, tamanho
+        alteracao = aleatorio.randrange(6)
+        if alteracao == 1:
+            cnpj = cnpj[:-1] + str((int(cnpj[-1]) + 1) % 10)
+        elif alteracao == 2:
+            cnpj = cnpj[:5] + aleatorio.choice('@#é ') + cnpj[6:]
+        elif alteracao == 3:
+            cnpj = f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}"
+        elif alteracao == 4:
+            cnpj = cnpj.lower()
+        elif alteracao == 5:
+            cnpj = cnpj[:aleatorio.randrange(20)] + 'X' * aleatorio.randrange(3)
+        cnpjs.append(cnpj)
+    
+    lote = validar_cnpj_lote(np.array(cnpjs))
+    assert lote.tolist() == [validar_cnpj(c) for c in cnpjs]
+    assert 500 < lote.sum() < 2000
+    
+    cpfs = [f"{aleatorio.randrange(10 ** 11):011d}" for _ in range(2000)]
+    assert validar_cpf_lote(cpfs).tolist() == [validar_cpf(c) for c in cpfs]
+
+
+def test_mesmo_documento_em_qualquer_dtype():
+    """Testa inteiro, float, texto e texto '.0' (astype(str) de coluna numérica) com o mesmo veredito"""
+    formas = [191, 191.0, '191', '191.0', '00000000191', np.int64(191)]
+    esperado = validar_cpf('000.000.001-91')
+    assert esperado
+    assert [validar_cpf(f) for f in formas] == [esperado] * len(formas)
+    assert validar_cpf_lote(np.array(formas, dtype=object)).tolist() == [esperado] * len(formas)
+    assert validar_cpf_lote(pd.Series([191, None, 'abc'], dtype=object)).tolist() == [True, False, False]
+    
+    # Coluna lida como float e depois convertida para texto (clean_dataframe)
+    serie = pd.Series([4252011000110.0, np.nan, 10425636000139.0]).astype(str)
+    assert validar_cnpj_lote(serie).tolist() == [True, False, True]
+    assert [validar_cnpj(c) for c in serie] == [True, False, True]
+    assert not validar_cpf('191.5')
@@ -0,0 +1,52 @@
+"""Testes do planejamento adaptativo de janelas"""
+
+from datetime import datetime
+
+from src.utils.window_planner import WindowPlanner
+
+
+def test_planejar_sem_historico_usa_dias_base():
+    """Testa janelas de dias_base sem densidade conhecida"""
+    planner = WindowPlanner(dias_base=7)
+    janelas = planner.planejar(datetime(2024, 1, 1), datetime(2024, 1, 31))
+    
+    assert janelas[0] == (datetime(2024, 1, 1), datetime(2024, 1, 7))
+    assert len(janelas) == 5
+    assert janelas[-1][1] == datetime(2024, 1, 31)
+
+
+def test_planejar_inclui_ultimo_dia_com_horas_quebradas():
+    """Testa que o dia de data_fim entra mesmo com hora final anterior à inicial"""
+    diario = WindowPlanner(dias_base=1).planejar(datetime(2026, 10, 16, 21), datetime(2026, 10, 17, 6))
+    assert diario == [
+        (datetime(2026, 10, 16, 21), datetime(2026, 10, 16)),
+        (datetime(2026, 10, 17), datetime(2026, 10, 17, 6)),
+    ]
+    
+    semanal = WindowPlanner(dias_base=7).planejar(datetime(2026, 10, 1, 17), datetime(2026, 10, 8, 10))
+    assert [(i.date().day, f.date().day) for i, f in semanal] == [(1, 7), (8, 8)]
+    assert semanal[-1][1] == datetime(2026, 10, 8, 10)
+
+
+def test_densidade_aprendida_alarga_e_estreita(tmp_path):
+    """Testa janelas largas em meses esparsos e curtas em meses densos, persistidas"""
+    caminho = str(tmp_path / 'densidade.json')
+    planner = WindowPlanner(caminho, dias_base=7, dias_max=31, alvo_nfses=500)
+    planner.registrar(datetime(2024, 1, 1), datetime(2024, 1, 31), nfses=31, segundos=1.0)
+    planner.registrar(datetime(2024, 2, 1), datetime(2024, 2, 29), nfses=2900, segundos=2.0)
+    planner.salvar()
+    
+    proximo = WindowPlanner(caminho, dias_base=7, dias_max=31, alvo_nfses=500)
+    
+    assert proximo.dias_para(datetime(2024, 1, 10)) == 31
+    assert proximo.dias_para(datetime(2024, 2, 10)) == 5
+    # Mês desconhecido herda o vizinho mais próximo
+    assert proximo.dias_para(datetime(2024, 3, 10)) == 5
+
+
+def test_estouro_limita_tamanho_do_mes():
+    """Testa limite de tamanho após timeout no mês"""
+    planner = WindowPlanner(dias_base=30)
+    planner.registrar_estouro(datetime(2024, 5, 1), datetime(2024, 5, 30))
+    
+    assert planner.dias_para(datetime(2024, 5, 1)) == 15
@@ -0,0 +1,47 @@
+"""Testes da validação XSD das NFSe (amostragem e quarentena)"""
+
+import json
+import os
+
+from tests.stubs.abrasf_stub import gerar_resposta_consulta
+from src.parsers.xml_parser import NfseXmlParser
+from src.parsers.xsd_validator import NfseXsdValidator, carregar_schema
+
+
+def test_nota_invalida_vai_para_quarentena(tmp_path):
+    """Testa que só a nota reprovada fica fora do resultado, com XML e erros na quarentena"""
+    xml = gerar_resposta_consulta(3).replace(b'<Cnpj>10425636000139</Cnpj>', b'<Cnpj>10.425.636/0001-39</Cnpj>', 1)
+    validador = NfseXsdValidator(quarentena=str(tmp_path))
+    parser = NfseXmlParser(validador=validador)
+    
+    nfses = parser.parse_nfse_response(xml)
+    
+    assert [n['numero_nfse'] for n in nfses] == ['000000000000002', '000000000000003']
+    arquivos = sorted(os.listdir(tmp_path))
+    assert len(arquivos) == 2 and arquivos[0].startswith('000000000000001_')
+    with open(tmp_path / arquivos[0], encoding='utf-8') as arquivo:
+        relatorio = json.load(arquivo)
+    assert relatorio['numero_nfse'] == '000000000000001'
+    assert 'Cnpj' in relatorio['erros'][0]
+    assert b'10.425.636/0001-39' in (tmp_path / arquivos[1]).read_bytes()
+    assert parser.metricas()['xsd'] == {
+        'respostas': 1, 'respostas_validadas': 1, 'notas_validadas': 3, 'notas_em_quarentena': 1
+    }
+
+
+def test_amostragem(tmp_path):
+    """Testa uma resposta a cada N, fração com semente e schema compilado uma vez"""
+    xml = gerar_resposta_consulta(2).replace(b'<Cnpj>10425636000139</Cnpj>', b'<Cnpj>invalido</Cnpj>', 1)
+    parser = NfseXmlParser(validador=NfseXsdValidator(quarentena=str(tmp_path), amostra_cada=3))
+    
+    quantidades = [len(parser.parse_nfse_response(xml)) for _ in range(5)]
+    
+    # Respostas 1 e 4 validadas: a nota inválida só é barrada nelas
+    assert quantidades == [1, 2, 2, 1, 2]
+    assert parser.metricas()['xsd']['respostas_validadas'] == 2
+    
+    sorteios = [NfseXsdValidator(str(tmp_path), fracao=0.3, semente=7) for _ in range(2)]
+    resultados = [[v.sortear() for _ in range(200)] for v in sorteios]
+    assert resultados[0] == resultados[1]
+    assert 30 <= sum(resultados[0]) <= 90
+    assert sorteios[0].schema is sorteios[1].schema is carregar_schema()